@@ -0,0 +1,37 @@
+# pylint: disable=too-few-public-methods, broad-exception-caught
+"""Bounded concurrency helpers for the simulation."""
+
+import asyncio
+import os
+
+CONCURRENCY = int(os.getenv("SIM_CONCURRENCY", "50"))
+
+class Concurrency:
+    """Class to run simulation stages with a bounded number of requests in flight."""
+    @staticmethod
+    async def map(worker, items, limit: int = CONCURRENCY, timeout: float = None):
+        """
+        Await 'worker(item)' for every item with at most 'limit' calls in flight.
+
+        A fixed pool of 'limit' workers pulls items from a shared iterator, so only the
+        number of tasks (and calls) in flight is bounded. 'items' is still read into a list
+        and every result is kept until the end, so memory does grow with the number of
+        items. Results are returned in the order of
+        'items'; an exception raised by 'worker' is returned in place of its result.
+        If 'timeout' is set, a call that takes longer is cancelled and an
+        'asyncio.TimeoutError' is returned in its place.
+        """
+        items = list(items)
+        results = [None] * len(items)
+        indexes = iter(range(len(items)))
+
+        async def _worker():
+            for index in indexes:
+                try:
+                    results[index] = await asyncio.wait_for(worker(items[index]), timeout)
+                except Exception as e:
+                    results[index] = e
+
+        workers = max(1, min(limit, len(items)))
+        await asyncio.gather(*(_worker() for _ in range(workers)))
+        return results
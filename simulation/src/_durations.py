@@ -0,0 +1,60 @@
+# pylint: disable=too-few-public-methods
+"""Vectorized trip durations along the full route of every trip."""
+
+import os
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_SPEED = float(os.getenv("DEFAULT_SPEED", "20.0"))
+
+class Durations:
+    """
+    Class to compute how long the hivemind takes to move bikes along routes.
+
+    Routes are lists of (longitude, latitude) points. Their lengths are the haversine
+    distances summed over every segment, for all routes at once, and the duration is
+    that length at 'DEFAULT_SPEED' km/h, the speed that 'Main._run' gives the hivemind.
+    """
+    @staticmethod
+    def pack(linestrings):
+        """
+        Pack routes into a (number of points, 2) array and an array of offsets,
+        so that route i is 'coordinates[offsets[i]:offsets[i + 1]]', like
+        'Extract.Trip.routes_array' does for the routes of trips.
+        """
+        counts = np.fromiter(
+            (len(linestring) for linestring in linestrings), dtype=np.int64,
+            count=len(linestrings))
+        offsets = np.zeros(len(linestrings) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        coordinates = np.array(
+            [point for linestring in linestrings for point in linestring],
+            dtype=np.float64).reshape(-1, 2)
+        return coordinates, offsets
+
+    @staticmethod
+    def lengths(coordinates, offsets):
+        """Get the haversine length in kilometers of every packed route."""
+        lengths = np.zeros(len(offsets) - 1, dtype=np.float64)
+        if len(coordinates) < 2:
+            return lengths
+        longitudes, latitudes = np.radians(coordinates).T
+        a = (np.sin(np.diff(latitudes) / 2) ** 2
+             + np.cos(latitudes[:-1]) * np.cos(latitudes[1:])
+             * np.sin(np.diff(longitudes) / 2) ** 2)
+        segments = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+        travelled = np.concatenate(([0.0], np.cumsum(segments)))
+        starts, ends = offsets[:-1], offsets[1:] - 1
+        routes = ends > starts
+        lengths[routes] = travelled[ends[routes]] - travelled[starts[routes]]
+        return lengths
+
+    @staticmethod
+    def seconds(coordinates, offsets, speed_kmh: float = DEFAULT_SPEED):
+        """
+        Get the duration in seconds of every packed route, as an array, e.g. of the
+        routes from 'Extract.Trip.routes_array' or 'Durations.pack'.
+        """
+        if speed_kmh <= 0:
+            raise ValueError("The speed must be positive.")
+        return Durations.lengths(coordinates, offsets) / speed_kmh * 3600
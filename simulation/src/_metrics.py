@@ -0,0 +1,242 @@
+# pylint: disable=too-few-public-methods, broad-exception-caught
+"""Latency, throughput and error bookkeeping for the simulation."""
+
+import asyncio
+import json
+import math
+import os
+from contextlib import contextmanager
+from time import perf_counter, time
+import httpx
+
+LOGS_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "..", "logs"))
+METRICS_FILE = os.getenv("SIM_METRICS_FILE") or os.path.join(LOGS_DIR, "simulation_metrics.jsonl")
+METRICS_PORT = int(os.getenv("SIM_METRICS_PORT")) if os.getenv("SIM_METRICS_PORT") else None
+PERCENTS = (50, 90, 99)
+
+class Latencies:
+    """Collects request latencies (in seconds) and reports percentiles."""
+    def __init__(self):
+        self.samples = []
+
+    def record(self, seconds: float):
+        """Record the latency of a single request."""
+        self.samples.append(seconds)
+
+    def percentile(self, percent: float):
+        """Get the nearest-rank percentile in seconds, or None if nothing was recorded."""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        rank = max(1, math.ceil(percent / 100 * len(ordered)))
+        return ordered[rank - 1]
+
+    def summary(self, percents=PERCENTS):
+        """Get a one-line summary of the recorded latencies in milliseconds."""
+        if not self.samples:
+            return "no latencies recorded"
+        parts = [f"p{percent}={self.percentile(percent) * 1000:.1f}ms" for percent in percents]
+        parts.append(f"max={max(self.samples) * 1000:.1f}ms")
+        return ", ".join(parts)
+
+class Endpoint:
+    """Request count, error classes and latencies of one endpoint."""
+    def __init__(self, name: str):
+        self.name = name
+        self.requests = 0
+        self.errors = {}
+        self.latencies = Latencies()
+        self.first_start = None
+        self.last_end = None
+
+    def record(self, start: float, end: float, error: str = None):
+        """Record a request that ran from 'start' to 'end' (perf_counter seconds)."""
+        self.requests += 1
+        self.latencies.record(end - start)
+        if error is not None:
+            self.errors[error] = self.errors.get(error, 0) + 1
+        self.first_start = start if self.first_start is None else min(self.first_start, start)
+        self.last_end = end if self.last_end is None else max(self.last_end, end)
+
+    def merge(self, other):
+        """Add the requests of another 'Endpoint' (e.g. of another process) to this one."""
+        self.requests += other.requests
+        self.latencies.samples.extend(other.latencies.samples)
+        for error, count in other.errors.items():
+            self.errors[error] = self.errors.get(error, 0) + count
+        if other.first_start is not None:
+            # perf_counter is system-wide on Linux, so times of other processes compare.
+            self.first_start = min(
+                start for start in (self.first_start, other.first_start) if start is not None)
+            self.last_end = max(
+                end for end in (self.last_end, other.last_end) if end is not None)
+
+    @property
+    def throughput(self):
+        """Requests per second between the first request and the last response."""
+        if not self.requests or self.last_end <= self.first_start:
+            return 0.0
+        return self.requests / (self.last_end - self.first_start)
+
+    def to_dict(self):
+        """Get the endpoint as a JSON-serializable dictionary."""
+        latencies = {
+            f"p{percent}": self.latencies.percentile(percent) for percent in PERCENTS}
+        latencies["max"] = max(self.latencies.samples) if self.latencies.samples else None
+        return {
+            "endpoint": self.name,
+            "requests": self.requests,
+            "errors": dict(self.errors),
+            "throughput": self.throughput,
+            "latency_seconds": latencies,
+        }
+
+class Metrics:
+    """
+    Per-endpoint metrics of the outgoing requests and wall time per simulation phase.
+
+    Wrap every request in 'request(endpoint)' and every phase in 'phase(name)'.
+    The metrics can be printed ('print_report'), appended to a JSON lines file
+    ('export') and served in the Prometheus text format ('serve').
+    """
+    def __init__(self):
+        self.endpoints = {}
+        self.phases = {}
+        self.started_at = time()
+
+    def endpoint(self, name: str):
+        """Get (or create) the metrics of an endpoint."""
+        if name not in self.endpoints:
+            self.endpoints[name] = Endpoint(name)
+        return self.endpoints[name]
+
+    def merge(self, other):
+        """
+        Add the metrics of another run (e.g. a shard in another process) to these.
+        Phases ran concurrently, so a phase takes as long as its slowest run.
+        """
+        for name, endpoint in other.endpoints.items():
+            self.endpoint(name).merge(endpoint)
+        for name, seconds in other.phases.items():
+            self.phases[name] = max(self.phases.get(name, 0.0), seconds)
+
+    @staticmethod
+    def error_class(error: BaseException):
+        """Get the class of an error, with the status code for HTTP status errors."""
+        if isinstance(error, httpx.HTTPStatusError):
+            return f"HTTP {error.response.status_code}"
+        if isinstance(error, asyncio.CancelledError):
+            return "Cancelled"
+        return type(error).__name__
+
+    @contextmanager
+    def request(self, endpoint: str, start: float = None):
+        """
+        Time the request in the 'with' block and record it, failed or not.
+        If 'start' (perf_counter seconds) is given, the latency is measured from then
+        instead, e.g. from when the request was meant to be sent.
+        """
+        start = perf_counter() if start is None else start
+        try:
+            yield
+        except BaseException as e:
+            self.endpoint(endpoint).record(start, perf_counter(), Metrics.error_class(e))
+            raise
+        self.endpoint(endpoint).record(start, perf_counter())
+
+    @contextmanager
+    def phase(self, name: str):
+        """Record the wall time of the phase in the 'with' block."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + perf_counter() - start
+
+    def records(self):
+        """Get the metrics as a list of JSON-serializable records."""
+        records = [
+            {"type": "endpoint", "run": self.started_at, **endpoint.to_dict()}
+            for endpoint in self.endpoints.values()]
+        records.extend(
+            {"type": "phase", "run": self.started_at, "phase": name, "seconds": seconds}
+            for name, seconds in self.phases.items())
+        return records
+
+    def export(self, path: str = METRICS_FILE):
+        """
+        Append the metrics of this run to a JSON lines file. The default file is in the
+        logs folder, which is mounted into the simulation container.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as file:
+            for record in self.records():
+                file.write(json.dumps(record) + "\n")
+        print(f"Metrics written to {path}.")
+
+    def prometheus(self):
+        """Get the metrics in the Prometheus text exposition format."""
+        lines = [
+            "# TYPE simulation_requests_total counter",
+            *(f'simulation_requests_total{{endpoint="{name}"}} {endpoint.requests}'
+              for name, endpoint in self.endpoints.items()),
+            "# TYPE simulation_request_errors_total counter",
+            *(f'simulation_request_errors_total{{endpoint="{name}",error="{error}"}} {count}'
+              for name, endpoint in self.endpoints.items()
+              for error, count in endpoint.errors.items()),
+            "# TYPE simulation_request_duration_seconds summary",
+        ]
+        for name, endpoint in self.endpoints.items():
+            for percent in PERCENTS:
+                value = endpoint.latencies.percentile(percent)
+                if value is not None:
+                    lines.append(
+                        f'simulation_request_duration_seconds'
+                        f'{{endpoint="{name}",quantile="{percent / 100}"}} {value}')
+            lines.append(
+                f'simulation_request_duration_seconds_sum{{endpoint="{name}"}} '
+                f'{sum(endpoint.latencies.samples)}')
+            lines.append(
+                f'simulation_request_duration_seconds_count{{endpoint="{name}"}} '
+                f'{endpoint.requests}')
+        lines.append("# TYPE simulation_phase_seconds gauge")
+        lines.extend(
+            f'simulation_phase_seconds{{phase="{name}"}} {seconds}'
+            for name, seconds in self.phases.items())
+        return "\n".join(lines) + "\n"
+
+    async def serve(self, port: int = METRICS_PORT, host: str = "0.0.0.0"):
+        """
+        Serve the metrics in the Prometheus text format on 'port' (any path).
+        Returns the 'asyncio.Server'; close it when the run is over.
+        """
+        async def _handle(reader, writer):
+            try:
+                await reader.readuntil(b"\r\n\r\n")
+                body = self.prometheus().encode('utf-8')
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: text/plain; version=0.0.4\r\n"
+                    + f"Content-Length: {len(body)}\r\n".encode('utf-8')
+                    + b"Connection: close\r\n\r\n" + body)
+                await writer.drain()
+            except Exception:
+                pass
+            finally:
+                writer.close()
+
+        server = await asyncio.start_server(_handle, host, port)
+        print(f"Serving Prometheus metrics on port {port}.")
+        return server
+
+    def print_report(self):
+        """Print the requests, errors, throughput and latencies per endpoint and phase."""
+        print("Simulation metrics:")
+        for name, endpoint in self.endpoints.items():
+            errors = ", ".join(
+                f"{error}: {count}" for error, count in endpoint.errors.items()) or "none"
+            print(
+                f"  {name}: {endpoint.requests} requests, {endpoint.throughput:.1f} req/s, "
+                f"{endpoint.latencies.summary()}, errors: {errors}")
+        for name, seconds in self.phases.items():
+            print(f"  phase {name}: {seconds:.2f} seconds")
@@ -0,0 +1,139 @@
+# pylint: disable=too-few-public-methods, broad-exception-caught, too-many-instance-attributes, too-many-arguments, too-many-positional-arguments
+"""Open-loop load: trips arrive at a target rate, independent of how fast they complete."""
+
+import asyncio
+import os
+import random
+from collections import deque
+from time import perf_counter
+from ._plan import STARTED, MOVED, ENDED, FAILED
+
+RATE = float(os.getenv("SIM_RATE", "10.0"))
+DURATION = float(os.getenv("SIM_DURATION", "60.0"))
+ARRIVALS = os.getenv("SIM_ARRIVALS", "poisson")
+SEED = int(os.getenv("SIM_SEED")) if os.getenv("SIM_SEED") else None
+MARGIN = float(os.getenv("SIM_END_MARGIN", "10.0"))
+
+class OpenLoop:
+    """
+    Runs trips that arrive at 'rate' trips per second for 'duration' seconds.
+
+    Arrival times are fixed up front (a Poisson process, or evenly spaced with
+    'arrivals="constant"'), and every arrival runs its own start, move, wait and end,
+    however many trips are still in flight. To avoid coordinated omission, 'start' and
+    'end' are also recorded as '<step> (from intended start)', measured from when the
+    step was meant to begin (the arrival time and the due time) instead of when it
+    was sent. A trip of the plan is reused once it has ended (or failed to start); an
+    arrival for which no trip is free is dropped and counted.
+    """
+    def __init__(self, outgoing, rate: float = RATE,
+                 duration: float = DURATION, arrivals: str = ARRIVALS,
+                 seed: int = SEED, margin: float = MARGIN, move_timeout: float = None,
+                 tokens=None):
+        if rate <= 0:
+            raise ValueError("The arrival rate must be positive.")
+        if arrivals not in ("poisson", "constant"):
+            raise ValueError(f"Unknown arrival process '{arrivals}'.")
+        self.outgoing = outgoing
+        self.metrics = outgoing.metrics
+        self.rate = rate
+        self.duration = duration
+        self.arrivals = arrivals
+        self.random = random.Random(seed)
+        self.margin = margin
+        self.move_timeout = move_timeout
+        self.tokens = tokens
+        self.counts = {"arrived": 0, "dropped": 0, "completed": 0, "failed": 0}
+        self.max_lag = 0.0
+        self.elapsed = 0.0
+
+    def _interval(self):
+        """Get the time until the next arrival."""
+        if self.arrivals == "poisson":
+            return self.random.expovariate(self.rate)
+        return 1 / self.rate
+
+    def _token(self, user_id, token):
+        """Get a current token of a user from 'tokens' if given, else the planned one."""
+        return self.tokens.token(user_id) if self.tokens is not None else token
+
+    async def _trip(self, plan, index, arrival):
+        """
+        Start, move, wait for and end trip 'index' of the plan, updating its state.
+        Returns whether the trip can be planned again (no trip is left open).
+        """
+        user_id, bike_id, token = plan.user_ids[index], plan.bike_ids[index], plan.tokens[index]
+        metrics = self.metrics
+        started = False
+        try:
+            with metrics.request("start (from intended start)", start=arrival):
+                response_json = await self.outgoing.trips.start_trip(
+                    user_id=user_id, bike_id=bike_id, token=self._token(user_id, token))
+            plan.trip_ids[index] = response_json['data']['id']
+            plan.mark(index, STARTED)
+            started = True
+            await asyncio.wait_for(
+                self.outgoing.bikes.move(
+                    bike_id=bike_id, position_or_linestring=plan.linestrings[index]),
+                self.move_timeout)
+            plan.mark(index, MOVED)
+            due = perf_counter() + plan.durations[index] + self.margin
+            await asyncio.sleep(max(0.0, due - perf_counter()))
+            with metrics.request("end (from intended start)", start=due):
+                await self.outgoing.trips.end_trip(
+                    user_id=user_id, bike_id=bike_id, trip_id=plan.trip_ids[index],
+                    token=self._token(user_id, token))
+            plan.mark(index, ENDED)
+            self.counts["completed"] += 1
+            return True
+        except Exception as e:
+            print(f"Open-loop trip for user {user_id} on bike {bike_id} failed: {e!r}")
+            plan.mark(index, FAILED)
+            self.counts["failed"] += 1
+            return not started
+
+    async def run(self, plan):
+        """
+        Run the arrivals on the trips of a 'TripPlan' (with its 'durations' set),
+        then wait for every trip in flight, and return the counts.
+        """
+        free = deque(range(len(plan)))
+        tasks = set()
+
+        async def _run_trip(index, arrival):
+            if await self._trip(plan, index, arrival):
+                free.append(index)
+
+        print(
+            f"Open loop: {self.arrivals} arrivals at {self.rate} trips/s "
+            f"for {self.duration} seconds.")
+        start_time = perf_counter()
+        arrival = start_time + self._interval()
+        while arrival - start_time <= self.duration:
+            await asyncio.sleep(max(0.0, arrival - perf_counter()))
+            self.max_lag = max(self.max_lag, perf_counter() - arrival)
+            self.counts["arrived"] += 1
+            if not free:
+                self.counts["dropped"] += 1
+            else:
+                task = asyncio.create_task(_run_trip(free.popleft(), arrival))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            arrival += self._interval()
+        print(f"Open loop: arrivals done, waiting for {len(tasks)} trips in flight.")
+        if tasks:
+            await asyncio.gather(*tasks)
+        self.elapsed = perf_counter() - start_time
+        return self.counts
+
+    def print_report(self):
+        """Print the arrivals, outcomes and achieved rates."""
+        counts = self.counts
+        print("Open-loop report:")
+        print(
+            f"  arrived: {counts['arrived']} ({counts['arrived'] / self.duration:.2f}/s "
+            f"offered, target {self.rate}/s), dropped (no free trip): {counts['dropped']}")
+        print(
+            f"  completed: {counts['completed']}, failed: {counts['failed']}, "
+            f"in {self.elapsed:.2f} seconds")
+        print(f"  max arrival lag: {self.max_lag * 1000:.1f}ms")
@@ -1,22 +1,51 @@
-# pylint: disable=import-error, no-name-in-module, too-few-public-methods
+# pylint: disable=import-error, no-name-in-module, too-few-public-methods, too-many-instance-attributes, too-many-arguments, too-many-positional-arguments
 """Outgoing requests to backend and hivemind."""
 
-import json
+import os
 from typing import Union, List
 import httpx
 from src.utils.settings import Settings
+from ._metrics import Metrics
+from ._recording import Recorder
 
 def _url(url, endpoint):
     """Concatenate url and endpoint."""
     return f'{url.rstrip("/")}/{endpoint.lstrip("/")}'
 
+def _http2_available():
+    """Check if the optional 'h2' package needed for HTTP/2 is installed."""
+    try:
+        import h2 # pylint: disable=import-outside-toplevel, unused-import
+        return True
+    except ImportError:
+        return False
+
 BACKEND_URL = 'http://api:8000/'
 HIVEMIND_URL = 'http://bike_hivemind:8001/'
+MAX_CONNECTIONS = int(os.getenv("SIM_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("SIM_MAX_KEEPALIVE_CONNECTIONS", "100"))
+KEEPALIVE_EXPIRY = float(os.getenv("SIM_KEEPALIVE_EXPIRY", "30.0"))
+HTTP2 = os.getenv("SIM_HTTP2", "false").lower() == "true"
+TIMEOUT = float(os.getenv("SIM_TIMEOUT", "20.0"))
 
 class Outgoing:
-    """Outgoing requests to backend and hivemind."""
-    def __init__(self, token: str):
+    """
+    Outgoing requests to backend and hivemind.
+
+    Owns one long-lived, pooled client per upstream. Use as an async context manager
+    (or call 'aclose') so that the pooled connections are closed when the run ends.
+    Every request is recorded in 'metrics', per endpoint, and in 'recorder' if it
+    has a file. 'transport' replaces the network transport of both clients (e.g. an
+    'httpx.MockTransport' in tests).
+    """
+    def __init__(self, token: str, http2: bool = HTTP2,
+                 max_connections: int = MAX_CONNECTIONS,
+                 max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS,
+                 metrics: Metrics = None, recorder: Recorder = None,
+                 transport: httpx.AsyncBaseTransport = None):
         self.endpoints = Settings.Endpoints()
+        self.metrics = metrics or Metrics()
+        self.recorder = recorder or Recorder(None)
         self.backend_url = BACKEND_URL
         self.hivemind_url = HIVEMIND_URL
         self.token = token
@@ -24,15 +53,46 @@ class Outgoing:
             'Content-Type': 'application/json',
             'Authorization': f'Bearer {self.token}',
         }
-        self.trips = Trips(self.backend_url, self.headers)
-        self.bikes = Bikes(self.hivemind_url, self.headers)
+        if http2 and not _http2_available():
+            print("HTTP/2 requested but 'h2' is not installed, falling back to HTTP/1.1.")
+            http2 = False
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=KEEPALIVE_EXPIRY)
+        self.backend_client = httpx.AsyncClient(
+            base_url=self.backend_url, limits=limits, http2=http2, timeout=TIMEOUT,
+            transport=transport)
+        self.hivemind_client = httpx.AsyncClient(
+            base_url=self.hivemind_url, limits=limits, http2=http2, timeout=TIMEOUT,
+            transport=transport)
+        self.trips = Trips(
+            self.backend_url, self.headers, self.backend_client, self.metrics, self.recorder)
+        self.bikes = Bikes(
+            self.hivemind_url, self.headers, self.hivemind_client, self.metrics, self.recorder)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close the pooled clients and the recording."""
+        await self.backend_client.aclose()
+        await self.hivemind_client.aclose()
+        self.recorder.close()
 
 class Trips:
     """Outgoing requests to backend for trips."""
-    def __init__(self, backend_url, headers):
+    def __init__(self, backend_url, headers, client: httpx.AsyncClient,
+                 metrics: Metrics = None, recorder: Recorder = None):
         self.endpoints = Settings.Endpoints()
         self.backend_url = backend_url
         self.headers = headers
+        self.client = client
+        self.metrics = metrics or Metrics()
+        self.recorder = recorder or Recorder(None)
 
     async def start_trip(self, user_id: int, bike_id: int, token: str):
         """Start a trip for a user on a bike."""
@@ -40,18 +100,23 @@ class Trips:
         payload = {
             "bike_id": bike_id
         }
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(url, headers={
+        try:
+            with self.metrics.request("POST /v1/trips/"), self.recorder.request(
+                    "start_trip", "POST /v1/trips/",
+                    {"user_id": user_id, "bike_id": bike_id}) as record:
+                response = await self.client.post(url, headers={
                             'Content-Type': 'application/json',
                             'Authorization': f'Bearer {token}',
-                }, data=json.dumps(payload))
+                }, json=payload)
+                record["status"] = response.status_code
                 response.raise_for_status()
-                print(f"Succesfully started trip for user {user_id} on bike {bike_id}")
-                return response.json()
-            except httpx.RequestError as e:
-                print(f"Failed to start trip for url: {url}")
-                raise httpx.RequestError(f"Failed to start trip: {e}") from e
+                response_json = response.json()
+                record["id"] = response_json.get('data', {}).get('id')
+            print(f"Succesfully started trip for user {user_id} on bike {bike_id}")
+            return response_json
+        except httpx.RequestError as e:
+            print(f"Failed to start trip for url: {url}")
+            raise httpx.RequestError(f"Failed to start trip: {e}") from e
 
     async def end_trip(self, user_id: int, bike_id: int, trip_id: int, token: str):
         """End a trip for a user on a bike."""
@@ -59,25 +124,32 @@ class Trips:
         payload = {
             "bike_id": bike_id
         }
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.patch(url, headers={
+        try:
+            with self.metrics.request("PATCH /v1/trips/{trip_id}"), self.recorder.request(
+                    "end_trip", "PATCH /v1/trips/{trip_id}",
+                    {"user_id": user_id, "bike_id": bike_id, "trip_id": trip_id}) as record:
+                response = await self.client.patch(url, headers={
                             'Content-Type': 'application/json',
                             'Authorization': f'Bearer {token}',
-                }, data=json.dumps(payload))
+                }, json=payload)
+                record["status"] = response.status_code
                 response.raise_for_status()
-                print(f"Succesfully ended trip for user {user_id} on bike {bike_id}")
-                return response.json()
-            except httpx.RequestError as e:
-                print(f"Failed to end trip for url: {url}")
-                raise httpx.RequestError(f"Failed to end trip: {e}") from e
+            print(f"Succesfully ended trip for user {user_id} on bike {bike_id}")
+            return response.json()
+        except httpx.RequestError as e:
+            print(f"Failed to end trip for url: {url}")
+            raise httpx.RequestError(f"Failed to end trip: {e}") from e
 
 class Bikes:
     """Outgoing requests to hivemind for bikes."""
-    def __init__(self, hivemind_url, headers):
+    def __init__(self, hivemind_url, headers, client: httpx.AsyncClient,
+                 metrics: Metrics = None, recorder: Recorder = None):
         self.endpoints = Settings.Endpoints()
         self.hivemind_url = hivemind_url
         self.headers = headers
+        self.client = client
+        self.metrics = metrics or Metrics()
+        self.recorder = recorder or Recorder(None)
 
     async def move(self, bike_id: int, position_or_linestring: Union[tuple, List[tuple]]):
         """Move a bike to a position or along a linestring."""
@@ -85,14 +157,17 @@ class Bikes:
         payload = {
             "position_or_linestring": position_or_linestring
         }
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
+        try:
+            arguments = {"bike_id": bike_id, "position_or_linestring": position_or_linestring}
+            with self.metrics.request("POST /move"), self.recorder.request(
+                    "move", "POST /move", arguments) as record:
+                response = await self.client.post(
                     url, params={"bike_id": bike_id},
-                    headers=self.headers, data=json.dumps(payload))
+                    headers=self.headers, json=payload)
+                record["status"] = response.status_code
                 response.raise_for_status()
-                print(f"Succesfully moved bike {bike_id}")
-                return response.json()
-            except httpx.RequestError as e:
-                print(f"Failed to move bike for url: {url}")
-                raise httpx.RequestError(f"Failed to move bike: {e}") from e
+            print(f"Succesfully moved bike {bike_id}")
+            return response.json()
+        except httpx.RequestError as e:
+            print(f"Failed to move bike for url: {url}")
+            raise httpx.RequestError(f"Failed to move bike: {e}") from e
@@ -0,0 +1,55 @@
+# pylint: disable=too-few-public-methods, too-many-instance-attributes, too-many-arguments, too-many-positional-arguments
+"""Columnar store of the trips planned for a simulation run."""
+
+import numpy as np
+
+PLANNED = 0
+STARTED = 1
+MOVED = 2
+ENDED = 3
+FAILED = 4
+STATES = {PLANNED: "planned", STARTED: "started", MOVED: "moved", ENDED: "ended", FAILED: "failed"}
+
+class TripPlan:
+    """
+    The planned trips of a run as parallel arrays, one entry per trip.
+
+    Phases pass trip indexes around instead of copying (user_id, token, bike_id,
+    trip_id, linestring) tuples, and update 'trip_ids', 'durations' and 'states' in
+    place. 'trip_ids' starts out as the ids of the loaded trips whose routes are
+    ridden and holds the id generated by the backend once a trip is started.
+    """
+    __slots__ = (
+        "user_ids", "tokens", "bike_ids", "trip_ids", "linestrings", "durations", "states")
+
+    def __init__(self, user_ids, tokens, bike_ids, trip_ids, linestrings, durations=None):
+        count = len(user_ids)
+        if not count == len(tokens) == len(bike_ids) == len(trip_ids) == len(linestrings):
+            raise ValueError("All columns of a trip plan must have the same length.")
+        if durations is not None and len(durations) != count:
+            raise ValueError("All columns of a trip plan must have the same length.")
+        self.user_ids = list(user_ids)
+        self.tokens = list(tokens)
+        self.bike_ids = list(bike_ids)
+        self.trip_ids = list(trip_ids)
+        self.linestrings = list(linestrings)
+        self.durations = (
+            np.zeros(count, dtype=np.float64) if durations is None
+            else np.array(durations, dtype=np.float64))
+        self.states = np.full(count, PLANNED, dtype=np.int8)
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def indexes(self, state: int):
+        """Get the indexes of the trips in 'state', in plan order."""
+        return np.flatnonzero(self.states == state).tolist()
+
+    def mark(self, indexes, state: int):
+        """Set the state of one trip or a list of trips."""
+        self.states[indexes] = state
+
+    def counts(self):
+        """Get the number of trips per state."""
+        counts = np.bincount(self.states, minlength=len(STATES))
+        return {name: int(counts[state]) for state, name in STATES.items()}
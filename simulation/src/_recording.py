@@ -0,0 +1,247 @@
+# pylint: disable=too-few-public-methods, broad-exception-caught, too-many-instance-attributes, no-member, too-many-arguments, too-many-positional-arguments
+"""Record the outgoing requests of a simulation and replay them later."""
+
+import asyncio
+import json
+import os
+from contextlib import contextmanager
+from time import perf_counter, time
+import httpx
+from ._metrics import Latencies
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+RECORD_FILE = os.getenv("SIM_RECORD_FILE") or None
+REPLAY_FILE = os.getenv("SIM_REPLAY_FILE") or None
+REPLAY_SPEED = float(os.getenv("SIM_REPLAY_SPEED", "1.0"))
+REPLAY_RUN = int(os.getenv("SIM_REPLAY_RUN", "-1")) # -1 for the last recording in the file
+
+def _dumps(record):
+    """Serialize a record to one compact line."""
+    if orjson is not None:
+        return orjson.dumps(record) + b"\n"
+    return json.dumps(record, separators=(',', ':')).encode('utf-8') + b"\n"
+
+def _loads(line):
+    """Deserialize a record."""
+    return orjson.loads(line) if orjson is not None else json.loads(line)
+
+def _header():
+    """Get the line that starts a new recording (run) in a file."""
+    return _dumps({"run": time()})
+
+def _runs(lines):
+    """
+    Split the lines of a file into its recordings (runs), each a list of records.
+    Records before the first run header (older files) make up a run of their own.
+    """
+    runs = []
+    for line in lines:
+        if not line.strip():
+            continue
+        record = _loads(line)
+        if "run" in record:
+            runs.append([])
+        elif runs:
+            runs[-1].append(record)
+        else:
+            runs.append([record])
+    return runs
+
+class Recorder:
+    """
+    Appends every outgoing request to a JSON lines file as soon as it is done.
+
+    A record holds the call (e.g. 'start_trip') with its arguments, the endpoint,
+    the wall-clock time it was sent at, its status code (None without a response),
+    its latency and, for started trips, the trip id the backend generated. Tokens are
+    not recorded. Every 'Recorder' starts a new run in the file with a header line, and
+    every record is written with a single unbuffered append. Shards in
+    other processes record to files of their own ('Recorder.shard_path'), which are
+    merged into one recording afterwards. Without a 'path' nothing is recorded.
+    """
+    def __init__(self, path: str = RECORD_FILE):
+        self.path = path
+        self.file = open(path, 'ab', buffering=0) if path else None # pylint: disable=consider-using-with
+        if path:
+            self.file.write(_header())
+            print(f"Recording outgoing requests to {path}.")
+
+    @contextmanager
+    def request(self, call: str, endpoint: str, arguments: dict):
+        """
+        Record the request in the 'with' block, failed or not.
+        The block can set 'status' and 'id' on the yielded record.
+        """
+        record = {"t": time(), "call": call, "endpoint": endpoint, "args": arguments,
+                  "status": None, "latency": None, "id": None}
+        start = perf_counter()
+        try:
+            yield record
+        except httpx.HTTPStatusError as e:
+            record["status"] = e.response.status_code
+            raise
+        finally:
+            record["latency"] = perf_counter() - start
+            if self.file is not None:
+                self.file.write(_dumps(record))
+
+    def close(self):
+        """Close the file."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    @staticmethod
+    def shard_path(path, index):
+        """Get the file a shard records to, next to 'path' (None if 'path' is None)."""
+        return f"{path}.{index}" if path else None
+
+    @staticmethod
+    def merge(path, shards):
+        """
+        Append the recordings of the first 'shards' shards to 'path', as one run, and
+        delete them. Only the last run of every shard file is kept, and missing shard
+        files (e.g. of shards that failed to start) are skipped.
+        """
+        if not path:
+            return
+        with open(path, 'ab') as file:
+            file.write(_header())
+            for index in range(shards):
+                shard_path = Recorder.shard_path(path, index)
+                if not os.path.exists(shard_path):
+                    continue
+                with open(shard_path, 'rb') as shard_file:
+                    runs = _runs(shard_file)
+                file.writelines(_dumps(record) for record in (runs[-1] if runs else []))
+                os.remove(shard_path)
+
+class Replay:
+    """
+    Re-issues recorded requests through 'Outgoing', without loading any data first.
+
+    Only one run of the file is replayed, the last one by default ('run' is an index
+    into the runs of the file, like a list index). Its requests are sent at their
+    recorded offsets from the first request, divided by
+    'speed', and counted as 'outcome changed' if they failed where the recording
+    succeeded or the other way around. Trips are ended with the id the backend
+    generates for them now, so an 'end_trip' waits for the 'start_trip' that generated
+    its recorded id and is skipped if that start failed. Tokens are taken from a
+    'TokenPool'.
+    """
+    def __init__(self, outgoing, tokens, path: str = REPLAY_FILE, speed: float = REPLAY_SPEED,
+                 run: int = REPLAY_RUN):
+        if speed <= 0:
+            raise ValueError("The replay speed must be positive.")
+        self.outgoing = outgoing
+        self.tokens = tokens
+        self.path = path
+        self.speed = speed
+        self.records = self.load(path, run)
+        self.counts = {"sent": 0, "failed": 0, "skipped": 0, "outcome changed": 0}
+        self.latencies = {}
+        self._trip_ids = {}
+
+    @staticmethod
+    def load(path, run=-1):
+        """
+        Load the records of one run of a recording (the last by default), in the order
+        they were sent, without the 'end_trip's of trips whose start is not in the run.
+        """
+        with open(path, 'rb') as file:
+            runs = _runs(file)
+        if not runs:
+            return []
+        try:
+            records = runs[run]
+        except IndexError as e:
+            raise ValueError(f"There is no run {run} in {path}, only {len(runs)}.") from e
+        started = {record["id"] for record in records if record["call"] == "start_trip"}
+        records = [
+            record for record in records
+            if record["call"] != "end_trip" or record["args"]["trip_id"] in started]
+        return sorted(records, key=lambda record: record["t"])
+
+    def _trip_id(self, recorded_id):
+        """Get the future of the trip id generated now for a recorded trip id."""
+        if recorded_id not in self._trip_ids:
+            self._trip_ids[recorded_id] = asyncio.get_running_loop().create_future()
+        return self._trip_ids[recorded_id]
+
+    async def _send(self, record):
+        """Send one recorded request, raising if it fails. Returns whether it was sent."""
+        arguments = record["args"]
+        trips, bikes = self.outgoing.trips, self.outgoing.bikes
+        if record["call"] == "start_trip":
+            future = self._trip_id(record["id"]) if record["id"] is not None else None
+            try:
+                response_json = await trips.start_trip(
+                    user_id=arguments["user_id"], bike_id=arguments["bike_id"],
+                    token=self.tokens.token(arguments["user_id"]))
+            except Exception:
+                if future is not None and not future.done():
+                    future.set_result(None)
+                raise
+            if future is not None and not future.done():
+                future.set_result(response_json['data']['id'])
+        elif record["call"] == "move":
+            await bikes.move(
+                bike_id=arguments["bike_id"],
+                position_or_linestring=arguments["position_or_linestring"])
+        elif record["call"] == "end_trip":
+            trip_id = await self._trip_id(arguments["trip_id"])
+            if trip_id is None:
+                return False
+            await trips.end_trip(
+                user_id=arguments["user_id"], bike_id=arguments["bike_id"],
+                trip_id=trip_id, token=self.tokens.token(arguments["user_id"]))
+        else:
+            raise ValueError(f"Unknown recorded call '{record['call']}'.")
+        return True
+
+    async def _replay(self, record, due):
+        """Send a recorded request at its due time and compare it with the recording."""
+        await asyncio.sleep(max(0.0, due - perf_counter()))
+        start = perf_counter()
+        try:
+            if not await self._send(record):
+                self.counts["skipped"] += 1
+                return
+            replayed_ok = True
+        except Exception as e:
+            print(f"Replayed {record['call']} failed: {e!r}")
+            replayed_ok = False
+            self.counts["failed"] += 1
+        self.counts["sent"] += 1
+        latencies = self.latencies.setdefault(record["endpoint"], (Latencies(), Latencies()))
+        if record["latency"] is not None:
+            latencies[0].record(record["latency"])
+        latencies[1].record(perf_counter() - start)
+        recorded_ok = record["status"] is not None and record["status"] < 400
+        if recorded_ok != replayed_ok:
+            self.counts["outcome changed"] += 1
+
+    async def run(self):
+        """Replay every record and return the counts."""
+        if not self.records:
+            print(f"Nothing to replay in {self.path}.")
+            return self.counts
+        first = self.records[0]["t"]
+        start_time = perf_counter()
+        print(f"Replaying {len(self.records)} requests from {self.path} at {self.speed}x speed.")
+        await asyncio.gather(*(
+            self._replay(record, start_time + (record["t"] - first) / self.speed)
+            for record in self.records))
+        return self.counts
+
+    def print_report(self):
+        """Print the outcome of the replay and the recorded and replayed latencies."""
+        print("Replay report:")
+        print("  " + ", ".join(f"{outcome}: {count}" for outcome, count in self.counts.items()))
+        for endpoint, (recorded, replayed) in self.latencies.items():
+            print(f"  {endpoint}: recorded {recorded.summary()}")
+            print(f"  {endpoint}: replayed {replayed.summary()}")
@@ -0,0 +1,78 @@
+# pylint: disable=broad-exception-caught, too-many-instance-attributes, too-many-arguments, too-many-positional-arguments
+"""Event-driven scheduler that ends simulated trips when they are due."""
+
+import asyncio
+import heapq
+import itertools
+import os
+from ._concurrency import CONCURRENCY
+
+MAX_ATTEMPTS = int(os.getenv("SIM_END_MAX_ATTEMPTS", "5"))
+BACKOFF = float(os.getenv("SIM_END_BACKOFF", "1.0"))
+MAX_BACKOFF = float(os.getenv("SIM_END_MAX_BACKOFF", "30.0"))
+
+class TripEndScheduler:
+    """
+    Ends trips as soon as they are due.
+
+    Trips are kept in a min-heap keyed on their due time, so the scheduler only looks
+    at the head of the heap instead of rescanning every trip. A failed attempt is pushed
+    back onto the heap with exponential backoff until 'max_attempts' is reached.
+    """
+    def __init__(self, end_trip, concurrency: int = CONCURRENCY,
+                 max_attempts: int = MAX_ATTEMPTS, backoff: float = BACKOFF,
+                 max_backoff: float = MAX_BACKOFF):
+        self.end_trip = end_trip
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.ended = []
+        self.failed = []
+        self._heap = []
+        self._sequence = itertools.count()
+        self._start_time = None
+
+    def schedule(self, trip, delay: float, attempt: int = 0):
+        """Schedule 'trip' to be ended 'delay' seconds after the scheduler started."""
+        if self._start_time is None:
+            self._start_time = asyncio.get_running_loop().time()
+        heapq.heappush(self._heap, (self._start_time + delay, next(self._sequence), attempt, trip))
+
+    def _retry(self, trip, attempt):
+        """Push a failed trip back onto the heap with exponential backoff."""
+        delay = min(self.backoff * 2 ** attempt, self.max_backoff)
+        due_time = asyncio.get_running_loop().time() + delay
+        heapq.heappush(self._heap, (due_time, next(self._sequence), attempt + 1, trip))
+
+    async def _end(self, trip, attempt, semaphore):
+        """End a single trip, rescheduling it on failure."""
+        async with semaphore:
+            try:
+                await self.end_trip(trip)
+                self.ended.append(trip)
+            except Exception as e:
+                if attempt + 1 < self.max_attempts:
+                    print(f"Failed to end trip (attempt {attempt + 1}), retrying: {e}")
+                    self._retry(trip, attempt)
+                else:
+                    print(f"Failed to end trip after {attempt + 1} attempts: {e}")
+                    self.failed.append(trip)
+
+    async def run(self):
+        """Run until every scheduled trip has been ended or has run out of attempts."""
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        pending = set()
+        while self._heap or pending:
+            now = loop.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, _, attempt, trip = heapq.heappop(self._heap)
+                pending.add(asyncio.create_task(self._end(trip, attempt, semaphore)))
+            timeout = self._heap[0][0] - now if self._heap else None
+            if pending:
+                _, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            else:
+                await asyncio.sleep(timeout)
+        return self.ended, self.failed
@@ -0,0 +1,49 @@
+# pylint: disable=too-few-public-methods
+"""Sharding of simulation trips across worker processes."""
+
+import asyncio
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+SHARDS = int(os.getenv("SIM_SHARDS", "1"))
+
+def _run(worker, columns, shards, index):
+    """Run an async shard worker on its own event loop (in a worker process)."""
+    return asyncio.run(worker(columns, shards, index))
+
+class Shards:
+    """
+    Class to run the trips of a simulation in several processes.
+
+    The trips are split into contiguous shards of columns, and every shard runs in its
+    own process, with its own event loop, so that token minting, JSON handling and
+    route parsing do not compete with the network I/O of the other shards.
+    """
+    @staticmethod
+    def split(columns, shards: int):
+        """Split equally long columns into at most 'shards' non-empty shards of columns."""
+        count = len(columns[0]) if columns else 0
+        size = max(1, math.ceil(count / max(1, shards)))
+        return [
+            tuple(column[start:start + size] for column in columns)
+            for start in range(0, count, size)]
+
+    @staticmethod
+    async def run(worker, columns, shards: int = SHARDS):
+        """
+        Run 'await worker(shard_columns, number_of_shards, shard_index)' for every shard
+        in its own process. 'worker' must be a module-level async function (or a partial
+        of one), and its result picklable.
+        Returns the results in shard order, with a raised exception in place of its result.
+        """
+        parts = Shards.split(columns, shards)
+        if not parts:
+            return []
+        print(f"Running {sum(len(part[0]) for part in parts)} trips in {len(parts)} shards.")
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=len(parts)) as executor:
+            return await asyncio.gather(
+                *(loop.run_in_executor(executor, _run, worker, part, len(parts), index)
+                  for index, part in enumerate(parts)),
+                return_exceptions=True)
@@ -0,0 +1,85 @@
+# pylint: disable=too-few-public-methods, too-many-arguments, too-many-positional-arguments
+"""Pool of user tokens for the simulation, minted once and reused until they expire."""
+
+import asyncio
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from time import time
+import jwt
+
+TOKEN_TTL = float(os.getenv("SIM_TOKEN_TTL")) if os.getenv("SIM_TOKEN_TTL") else None
+REFRESH_MARGIN = float(os.getenv("SIM_TOKEN_REFRESH_MARGIN", "60.0"))
+PROCESS_THRESHOLD = int(os.getenv("SIM_TOKEN_PROCESS_THRESHOLD", "5000"))
+PROCESSES = int(os.getenv("SIM_TOKEN_PROCESSES", str(os.cpu_count() or 1)))
+
+def _claims(user_id, ttl, now):
+    """Get the claims of a user token."""
+    claims = {"sub": user_id, "scopes": ["user"]}
+    if ttl is not None:
+        claims["exp"] = int(now + ttl)
+    return claims
+
+def _encode(user_ids, secret, ttl, now):
+    """Encode the tokens of several users (runs in a worker process for large sets)."""
+    return [jwt.encode(_claims(user_id, ttl, now), secret, "HS256") for user_id in user_ids]
+
+class TokenPool:
+    """
+    Tokens of simulated users, keyed by user id.
+
+    A token is minted the first time it is asked for and then reused, across phases
+    and simulation iterations, until it is within 'margin' seconds of its expiry
+    (tokens without a 'ttl' never expire). Large sets of missing tokens are minted
+    in a process pool, in 'processes' chunks, so they do not stall the event loop.
+    """
+    def __init__(self, secret: str, ttl: float = TOKEN_TTL, margin: float = REFRESH_MARGIN,
+                 process_threshold: int = PROCESS_THRESHOLD, processes: int = PROCESSES):
+        self.secret = secret
+        self.ttl = ttl
+        self.margin = margin
+        self.process_threshold = process_threshold
+        self.processes = max(1, processes)
+        self.tokens = {}
+
+    def _is_valid(self, user_id, now):
+        """Check if the pooled token of a user can still be used."""
+        entry = self.tokens.get(user_id)
+        if entry is None:
+            return False
+        _, expires_at = entry
+        return expires_at is None or expires_at - self.margin > now
+
+    def _store(self, user_ids, tokens, now):
+        """Store freshly minted tokens."""
+        expires_at = None if self.ttl is None else now + self.ttl
+        for user_id, token in zip(user_ids, tokens):
+            self.tokens[user_id] = (token, expires_at)
+
+    def token(self, user_id):
+        """Get the token of one user, minting it if it is missing or about to expire."""
+        now = time()
+        if not self._is_valid(user_id, now):
+            self._store([user_id], _encode([user_id], self.secret, self.ttl, now), now)
+        return self.tokens[user_id][0]
+
+    async def get(self, user_ids):
+        """Get the tokens of several users, in order, minting the missing ones in bulk."""
+        now = time()
+        missing = list(dict.fromkeys(
+            user_id for user_id in user_ids if not self._is_valid(user_id, now)))
+        if len(missing) >= self.process_threshold and self.processes > 1:
+            size = math.ceil(len(missing) / self.processes)
+            chunks = [missing[index:index + size] for index in range(0, len(missing), size)]
+            loop = asyncio.get_running_loop()
+            with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+                results = await asyncio.gather(*(
+                    loop.run_in_executor(executor, _encode, chunk, self.secret, self.ttl, now)
+                    for chunk in chunks))
+            tokens = [token for result in results for token in result]
+        else:
+            tokens = _encode(missing, self.secret, self.ttl, now)
+        self._store(missing, tokens, now)
+        if missing:
+            print(f"Minted {len(missing)} tokens, reused {len(user_ids) - len(missing)}.")
+        return [self.tokens[user_id][0] for user_id in user_ids]
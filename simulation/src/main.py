@@ -4,241 +4,274 @@
 import asyncio
 import os
 from time import time
-import jwt
-from shapely.geometry import Point
 from src.data.get import Get
 from src.utils.extract import Extract
+from src.utils.readiness import Readiness
 from ._outgoing import Outgoing
+from ._concurrency import Concurrency, CONCURRENCY
+from ._metrics import Metrics, METRICS_FILE, METRICS_PORT
+from ._open_loop import OpenLoop, RATE, MARGIN
+from ._durations import Durations
+from ._tokens import TokenPool
+from ._plan import TripPlan, PLANNED, STARTED, MOVED, ENDED, FAILED
+from ._scheduler import TripEndScheduler
+from ._shards import Shards, SHARDS
+from ._recording import Recorder, Replay, RECORD_FILE, REPLAY_FILE
 
 TOKEN = os.getenv("TOKEN")
 LIMIT = os.getenv("BIKE_LIMIT")
 JWT_SECRET = os.getenv("JWT_SECRET")
 TRIPS_LIMIT = int(os.getenv("TRIPS_LIMIT"))
+PAGE_SIZE = int(os.getenv("SIM_PAGE_SIZE", "1000"))
+CACHE_TTL = float(os.getenv("SIM_CACHE_TTL")) if os.getenv("SIM_CACHE_TTL") else None
+CACHE_REFRESH = os.getenv("SIM_CACHE_REFRESH", "false").lower() == "true"
+MOVE_CONCURRENCY = int(os.getenv("SIM_MOVE_CONCURRENCY", str(CONCURRENCY)))
+MOVE_TIMEOUT = float(os.getenv("SIM_MOVE_TIMEOUT", "10.0"))
+MODE = os.getenv("SIM_MODE", "closed")
+
+async def load(metrics):
+    """
+    Load the data of a run and pair users, bikes and routes into unique trips
+    where no 'user_id', 'bike_id', or 'trip' repeats, at most TRIPS_LIMIT of them.
+    Returns the (user_ids, bike_ids, trip_ids, linestrings, durations) columns of those
+    trips, with the durations of the routes computed from the packed route coordinates.
+    """
+    get = Get(cache_ttl=CACHE_TTL)
+    with metrics.phase("load"):
+        bundle = await get.load(
+            collections=('bikes', 'users', 'trips'), limit=LIMIT, page_size=PAGE_SIZE, refresh=CACHE_REFRESH)
+    for collection, seconds in bundle.timings.items():
+        print(f"Loaded {collection} in {seconds:.2f} seconds.")
+
+    available_bikes = Extract.Bikes.available(bundle.bikes)
+    bike_ids = Extract.Bike.ids(available_bikes)
+    positions = Extract.Bike.positions(available_bikes)
+    assert len(bike_ids) > 0, "No bikes available, after extraction, all are probably false."
+
+    assert len(bike_ids) == len(positions), \
+        f"Length of bike_ids: {len(bike_ids)} != Length of positions: {len(positions)}"
+
+    user_ids = Extract.User.ids(bundle.users)
+
+    trip_ids = Extract.Trip.ids(bundle.trips)
+    coordinates, offsets = Extract.Trip.routes_array(bundle.trips)
+    linestrings = Extract.Trip.routes_to_list(coordinates, offsets)
+    durations = Durations.seconds(coordinates, offsets)
+    assert len(trip_ids) == len(linestrings), \
+        f"Length of trip_ids: {len(trip_ids)} != Length of trip_linestrings: {len(linestrings)}"
+
+    bike_count = len(bike_ids)
+    print(f"Number of bikes: {bike_count}")
+    user_count = len(user_ids)
+    print(f"Number of users: {user_count}")
+    trip_count = len(trip_ids)
+    print(f"Number of trips: {trip_count}")
+
+    max_trips = min(len(user_ids), len(bike_ids), len(trip_ids))
+    print(f"Number of unique trips: {max_trips}")
+    trip_count = min(max_trips, TRIPS_LIMIT)
+    return (user_ids[:trip_count], bike_ids[:trip_count],
+            trip_ids[:trip_count], linestrings[:trip_count], durations[:trip_count])
+
+async def run_plan(outgoing, columns, tokens, rate=RATE):
+    """
+    Run the trips of the (user_ids, bike_ids, trip_ids, linestrings, durations) 'columns'
+    and return the number of trips per outcome.
+    """
+    metrics = outgoing.metrics
+    user_ids, bike_ids, trip_ids, linestrings, durations = columns
+    with metrics.phase("tokens"):
+        plan = TripPlan(
+            user_ids, await tokens.get(user_ids), bike_ids, trip_ids, linestrings, durations)
+
+    if MODE == "open":
+        open_loop = OpenLoop(outgoing, rate=rate, tokens=tokens, move_timeout=MOVE_TIMEOUT)
+        with metrics.phase("open loop"):
+            counts = await open_loop.run(plan)
+        open_loop.print_report()
+        assert counts["completed"] > 0, "No open-loop trips completed successfully."
+        return counts
+
+    print(f"Simulating: {TRIPS_LIMIT} trips with concurrency {CONCURRENCY}")
+
+    async def start_trips(plan):
+        """Start trips for users on bikes, with at most CONCURRENCY requests in flight."""
+        async def _start_trip(index):
+            """Start a single trip and store the trip id generated by the backend."""
+            user_id, bike_id = plan.user_ids[index], plan.bike_ids[index]
+            print(f"Attempting to start trip for user {user_id} on bike {bike_id}")
+            response_json = await outgoing.trips.start_trip(
+                token=plan.tokens[index], bike_id=bike_id, user_id=user_id)
+            plan.trip_ids[index] = response_json['data']['id']
+
+        indexes = plan.indexes(PLANNED)
+        results = await Concurrency.map(_start_trip, indexes, limit=CONCURRENCY)
+        for index, result in zip(indexes, results):
+            if isinstance(result, Exception):
+                print(f"Failed to start trip for {plan.user_ids[index]} on {plan.bike_ids[index]}: {result}")
+                plan.mark(index, FAILED)
+            else:
+                plan.mark(index, STARTED)
+        successful_start_trips = len(plan.indexes(STARTED))
+        return successful_start_trips, len(indexes) - successful_start_trips
+
+    with metrics.phase("start"):
+        successful_start_trips, unsuccessful_start_trips = await start_trips(plan)
+    print(f"Successfully started {successful_start_trips} trips.")
+    print(f"Failed to start {unsuccessful_start_trips} trips.")
+    if successful_start_trips == 0:
+        print("No trips started successfully.")
+    else:
+        print(
+            f"Percentage of successful trips: "
+                f"{successful_start_trips / (successful_start_trips + unsuccessful_start_trips) * 100}%")
+    assert successful_start_trips > 0, "No trips started successfully."
+
+    async def move_bikes(plan):
+        """Move bikes along linestrings, with at most MOVE_CONCURRENCY requests in flight."""
+        async def _move_bike(index):
+            """Move a single bike (its latency is recorded by 'outgoing.metrics')."""
+            bike_id = plan.bike_ids[index]
+            print(f"Attempting to move bike {bike_id} with user {plan.user_ids[index]}")
+            await outgoing.bikes.move(bike_id=bike_id, position_or_linestring=plan.linestrings[index])
+
+        indexes = plan.indexes(STARTED)
+        results = await Concurrency.map(
+            _move_bike, indexes, limit=MOVE_CONCURRENCY, timeout=MOVE_TIMEOUT)
+        for index, result in zip(indexes, results):
+            if isinstance(result, Exception):
+                print(f"Failed to move bike {plan.bike_ids[index]} with user {plan.user_ids[index]}: {result!r}")
+                plan.mark(index, FAILED)
+            else:
+                plan.mark(index, MOVED)
+        successful_move_bikes = len(plan.indexes(MOVED))
+        return successful_move_bikes, len(indexes) - successful_move_bikes
+
+    with metrics.phase("move"):
+        successful_move_bikes, unsuccessful_move_bikes = await move_bikes(plan)
+    print(f"Successfully moved {successful_move_bikes} bikes.")
+    print(f"Failed to move {unsuccessful_move_bikes} bikes.")
+    print(
+        f"Percentage of successful bikes moved: "
+            f"{successful_move_bikes / (successful_move_bikes + unsuccessful_move_bikes) * 100}%")
+    print(f"Move latency: {metrics.endpoint('POST /move').latencies.summary()}")
+    assert successful_move_bikes > 0, "No bikes moved successfully."
+
+    moved_indexes = plan.indexes(MOVED)
+
+    async def end_trip(index):
+        """End a single trip for a user on a bike."""
+        user_id, bike_id = plan.user_ids[index], plan.bike_ids[index]
+        print(f"Attempting to end trip for user {user_id} on bike {bike_id}")
+        await outgoing.trips.end_trip(
+            user_id=user_id, bike_id=bike_id, trip_id=plan.trip_ids[index],
+            token=tokens.token(user_id))
+
+    async def manage_trip_endings(moved_indexes):
+        """End every trip as soon as its duration (plus MARGIN seconds) has passed."""
+        start_time = time()
+        scheduler = TripEndScheduler(end_trip)
+        for index in moved_indexes:
+            scheduler.schedule(index, delay=plan.durations[index] + MARGIN)
+        print(f"Scheduled {len(moved_indexes)} trips to end.")
+
+        ended_indexes, failed_indexes = await scheduler.run()
+        plan.mark(ended_indexes, ENDED)
+        plan.mark(failed_indexes, FAILED)
+        total_time = int(time() - start_time)
+        print(f"Successfully ended {len(ended_indexes)} trips.")
+        print(f"Failed to end {len(failed_indexes)} trips.")
+        print(
+            f"Percentage of successful trips: "
+                f"{len(ended_indexes) / len(moved_indexes) * 100}%")
+        assert len(ended_indexes) > 0, \
+            f"No trips ended successfully after {total_time} seconds."
+        print(f"Ended {len(ended_indexes)} trips successfully after {total_time} seconds.")
+
+    with metrics.phase("end"):
+        await manage_trip_endings(moved_indexes)
+    print(f"Trips by state: {plan.counts()}")
+    return plan.counts()
+
+async def simulate(outgoing, tokens=None):
+    """
+    Simulate one run of trips against the backend and hivemind.
+    'tokens' is a 'TokenPool' to reuse user tokens from earlier runs.
+    """
+    columns = await load(outgoing.metrics)
+    return await run_plan(outgoing, columns, tokens or TokenPool(JWT_SECRET))
+
+async def run_shard(columns, shards, index):
+    """
+    Run one shard of the trips in a worker process, with its own event loop,
+    client pool, tokens and recording file, and return its metrics and counts.
+    """
+    metrics = Metrics()
+    recorder = Recorder(Recorder.shard_path(RECORD_FILE, index))
+    async with Outgoing(token=TOKEN, metrics=metrics, recorder=recorder) as outgoing:
+        counts = await run_plan(outgoing, columns, TokenPool(JWT_SECRET), rate=RATE / shards)
+    return metrics, counts
+
+async def simulate_sharded(metrics, shards=SHARDS):
+    """
+    Load the trips once, run them in 'shards' worker processes and merge
+    their metrics into 'metrics'. Returns the number of trips per outcome.
+    """
+    columns = await load(metrics)
+    results = await Shards.run(run_shard, columns, shards)
+    Recorder.merge(RECORD_FILE, len(results))
+    counts = {}
+    for index, result in enumerate(results):
+        if isinstance(result, BaseException):
+            print(f"Shard {index} failed: {result!r}")
+            continue
+        shard_metrics, shard_counts = result
+        print(f"Shard {index}: {shard_counts}")
+        metrics.merge(shard_metrics)
+        for outcome, count in shard_counts.items():
+            counts[outcome] = counts.get(outcome, 0) + count
+    print(f"All shards: {counts}")
+    assert any(not isinstance(result, BaseException) for result in results), "All shards failed."
+    return counts
+
+async def replay(metrics, tokens):
+    """Replay the requests recorded in REPLAY_FILE instead of loading data and planning trips."""
+    async with Outgoing(
+            token=TOKEN, metrics=metrics, recorder=Recorder(RECORD_FILE)) as outgoing:
+        with metrics.phase("replay"):
+            replayed = Replay(outgoing, tokens)
+            counts = await replayed.run()
+    replayed.print_report()
+    assert counts["sent"] > 0, "No recorded requests were replayed."
+    return counts
 
 async def main():
     """Main function to simulate the full application."""
     end_condition = False
+    tokens = TokenPool(JWT_SECRET)
     while not end_condition:
         print("Welcome to the Matrix.")
+        await Readiness.wait(Readiness.Probes.stack(inside_network=True))
         sim_start_time = int(time())
 
-        get = Get()
-        outgoing = Outgoing(token=TOKEN)
-        bikes = await get.bikes(save_to_json=False, limit=LIMIT)
-
-        bikes = Extract.Bikes.available(bikes)
-        assert len(bikes) > 0, "No bikes available, after extraction, all are probably false."
-        bike_ids = Extract.Bike.ids(bikes)
-        positions = Extract.Bike.positions(bikes)
-
-        assert len(bike_ids) == len(positions), \
-            f"Length of bike_ids: {len(bike_ids)} != Length of positions: {len(positions)}" + \
-                f"example bike: {bikes[0]}"
-
-        users = await get.users(save_to_json=False, limit=LIMIT)
-        user_ids = Extract.User.ids(users)
-
-        trips = await get.trips(save_to_json=False, limit=LIMIT)
-
-        bike_count = len(bike_ids)
-        print(f"Number of bikes: {bike_count}")
-        user_count = len(user_ids)
-        print(f"Number of users: {user_count}")
-        trip_count = len(trips)
-        print(f"Number of trips: {trip_count}")
-
-        def generate_unique_trips(user_ids, bike_ids, trips):
-            """
-            Generate unique (user_id, bike_id, trip_id, linestring) trips 
-            where no 'user_id', 'bike_id', or 'trip' repeats.
-            """
-            trip_ids = Extract.Trip.ids(trips)
-            linestrings = Extract.Trip.routes(trips)
-            assert len(trip_ids) == len(linestrings), \
-                f"Length of trip_ids: {len(trip_ids)} != Length of trip_linestrings: {len(linestrings)}"
-
-            max_trips = min(len(user_ids), len(bike_ids), len(trip_ids))
-
-            trips = []
-            for trip_index in range(max_trips):
-                token = jwt.encode({"sub": user_ids[trip_index], "scopes": ["user"]}, JWT_SECRET, "HS256")
-                user_id = user_ids[trip_index]
-                bike_id = bike_ids[trip_index]
-                trip_id = trip_ids[trip_index]
-                linestring = linestrings[trip_index]
-                trips.append((user_id, token, bike_id, trip_id, linestring))
-            return trips
-
-        unique_trips = generate_unique_trips(user_ids, bike_ids, trips)
-        print(f"Number of unique trips: {len(list(unique_trips))}")
-
-        print(f"Simulating: {TRIPS_LIMIT} trips")
-        unique_trips = unique_trips[:TRIPS_LIMIT]
-
-        async def start_trips(unique_trips):
-            """Start trips for users on bikes."""
-            successful_start_trips = 0
-            unsuccessful_start_trips = 0
-            started_trips = []
-            for user_id, token, bike_id, trip_id, linestring in unique_trips:
-                print(f"Attempting to start trip for user {user_id} on bike {bike_id}")
-                try:
-                    response_json = await outgoing.trips.start_trip(token=token, bike_id=bike_id, user_id=user_id)
-                    generated_trip_id = response_json['data']['id']
-                    successful_start_trips += 1
-                    started_trips.append((user_id, token, bike_id, generated_trip_id, linestring))
-                    await asyncio.sleep(0.001)
-                except Exception as e:
-                    print(f"Failed to start trip for {user_id} on {bike_id}: {e}")
-                    unsuccessful_start_trips += 1
-            return successful_start_trips, unsuccessful_start_trips, started_trips
-
-        successful_start_trips, unsuccessful_start_trips, started_trips = await start_trips(unique_trips)
-        print(f"Successfully started {successful_start_trips} trips.")
-        print(f"Failed to start {unsuccessful_start_trips} trips.")
-        if successful_start_trips == 0:
-            print("No trips started successfully.")
-        else:
-            print(
-                f"Percentage of successful trips: "
-                    f"{successful_start_trips / (successful_start_trips + unsuccessful_start_trips) * 100}%")
-        assert successful_start_trips > 0, "No trips started successfully."
-
-        async def move_bikes(started_trips):
-            """Move bikes along linestrings."""
-            successful_move_bikes = 0
-            unsuccessful_move_bikes = 0
-            moved_trips = []
-            for user_id, token, bike_id, trip_id, linestring in started_trips:
-                print(f"Attempting to move bike {bike_id} with user {user_id}")
-                try:
-                    await outgoing.bikes.move(bike_id=bike_id, position_or_linestring=linestring)
-                    successful_move_bikes += 1
-                    moved_trips.append((user_id, token, bike_id, trip_id, linestring))
-                    await asyncio.sleep(0.001)
-                except Exception as e:
-                    print(f"Failed to move bike {bike_id} with user {user_id}: {e}")
-                    unsuccessful_move_bikes += 1
-            return successful_move_bikes, unsuccessful_move_bikes, moved_trips
-
-        successful_move_bikes, unsuccessful_move_bikes, moved_trips = await move_bikes(started_trips)
-        print(f"Successfully moved {successful_move_bikes} bikes.")
-        print(f"Failed to move {unsuccessful_move_bikes} bikes.")
-        print(
-            f"Percentage of successful bikes moved: "
-                f"{successful_move_bikes / (successful_move_bikes + unsuccessful_move_bikes) * 100}%")
-        assert successful_move_bikes > 0, "No bikes moved successfully."
-
-        def get_moved_trips_with_duration(moved_trips):
-            """Get moved trips with duration in seconds."""
-            def _get_distance_in_km(linestring):
-                """Get distance in kilometers from linestring."""
-                def _convert_to_kilometers(distance):
-                    """Convert distance to kilometers."""
-                    return distance / 1000
-                start_point = Point(linestring[0])
-                end_point = Point(linestring[-1])
-                distance = start_point.distance(end_point)
-                return _convert_to_kilometers(distance)
-
-            def _get_duration_in_seconds(distance_in_km, speed_in_kmh):
-                """Get duration in seconds."""
-                return (distance_in_km / speed_in_kmh) * 3600
-
-            def _sort_trips_by_ascending_duration(trips_with_duration):
-                """Sort trips by ascending duration."""
-                return sorted(trips_with_duration, key=lambda x: x[-1])
-
-            moved_trips_with_duration = []
-            for user_id, token, bike_id, trip_id, linestring in moved_trips:
-                distance_in_km = _get_distance_in_km(linestring)
-                speed_in_kmh = 1000 # NOTE: We are hardcoding this? xD
-                duration_in_seconds = _get_duration_in_seconds(distance_in_km, speed_in_kmh)
-                moved_trips_with_duration.append(
-                    (user_id, token, bike_id, trip_id, linestring, duration_in_seconds))
-            return _sort_trips_by_ascending_duration(moved_trips_with_duration)
-
-        sorted_moved_trips = get_moved_trips_with_duration(moved_trips)
-
-        async def end_trips(moved_trips):
-            """End trips for users on bikes."""
-            successful_end_trips = 0
-            unsuccessful_end_trips = 0
-            ended_trips = []
-            for user_id, token, bike_id, trip_id, linestring, duration in moved_trips:
-                print(f"Attempting to end trip for user {user_id} on bike {bike_id}")
-                try:
-                    await outgoing.trips.end_trip(user_id=user_id, bike_id=bike_id, trip_id=trip_id, token=token)
-                    successful_end_trips += 1
-                    ended_trips.append((user_id, token, bike_id, trip_id, linestring, duration))
-                    # NOTE: ended_trips.append((user_id, bike_id, trip_id, linestring))
-                    # NOTE: I changed this line, if something breaks, it could be this.
-                    await asyncio.sleep(0.001)
-                except Exception as e:
-                    print(f"Failed to end trip for user {user_id} on bike {bike_id}: {e}")
-                    unsuccessful_end_trips += 1
-            return successful_end_trips, unsuccessful_end_trips, ended_trips
-
-        def _filter_trips_by_duration(moved_trips, elapsed_seconds):
-            """Filter trips by duration."""
-            trips_to_end_now = [trip for trip in moved_trips if trip[-1] <= elapsed_seconds]
-            remaining_trips = [trip for trip in moved_trips if trip[-1] > elapsed_seconds]
-            return trips_to_end_now, remaining_trips
-
-        async def manage_trip_endings(moved_trips):
-            """Manage the ending of trips."""
-            start_time = time()
-            active_trip_count = len(moved_trips)
-            ended_trip_count = 0
-            allowed_attempts = 12
-            sleep_period = 20
-            total_attempts = 0
-            margin_of_error = 10
-
-            failed_trips = []
-
-            while ended_trip_count < active_trip_count and allowed_attempts > 0:
-                elapsed_seconds = int(time() - start_time)
-                print(f"Elapsed time: {elapsed_seconds} seconds.")
-
-                moved_trips_with_margin = [
-                    (user_id, token, bike_id, trip_id, linestring, duration + margin_of_error) \
-                        for user_id, token, bike_id, trip_id, linestring, duration in moved_trips]
-                moved_trips_with_margin.extend(failed_trips)
-                failed_trips = []
-                trips_to_end_now, remaining_trips = _filter_trips_by_duration(moved_trips_with_margin, elapsed_seconds)
-                if not trips_to_end_now:
-                    print(f"No trips ready to end at {elapsed_seconds} seconds.")
-                else:
-                    print(f"Attempting to end {len(trips_to_end_now)} trips at {elapsed_seconds} seconds.")
-                    successful_end_trips, unsuccessful_end_trips, ended_trips = await end_trips(trips_to_end_now)
-                    print(f"Successfully ended {successful_end_trips} trips.")
-                    print(f"Failed to end {unsuccessful_end_trips} trips.")
-                    ended_trip_count += successful_end_trips
-                    print(
-                        f"Percentage of successful trips: "
-                            f"{successful_end_trips / (successful_end_trips + unsuccessful_end_trips) * 100}%")
-                    failed_trips.extend([trip for trip in trips_to_end_now if trip not in ended_trips])
-
-                allowed_attempts -= 1
-                total_attempts += 1
-
-                if remaining_trips or failed_trips:
-                    print(
-                        f"Remaining trips: "
-                            f"{len(remaining_trips) + len(failed_trips)}. Waiting {sleep_period} seconds for next attempt.")
-                    await asyncio.sleep(sleep_period)
-                else:
-                    print("All trips have been ended.")
-                    break
-
-            total_time = sleep_period * total_attempts
-            assert ended_trip_count > 0, \
-                f"No trips ended successfully after {total_time} seconds and {total_attempts} attempts."
-            print(f"Ended {ended_trip_count} trips successfully after "
-                  f"{total_time} seconds and {total_attempts} attempts.")
-
-        await manage_trip_endings(sorted_moved_trips)
+        metrics = Metrics()
+        server = await metrics.serve(METRICS_PORT) if METRICS_PORT else None
+        try:
+            if REPLAY_FILE:
+                await replay(metrics, tokens)
+            elif SHARDS > 1:
+                await simulate_sharded(metrics, SHARDS)
+            else:
+                async with Outgoing(
+                        token=TOKEN, metrics=metrics, recorder=Recorder(RECORD_FILE)) as outgoing:
+                    await simulate(outgoing, tokens)
+        finally:
+            metrics.print_report()
+            if METRICS_FILE:
+                metrics.export(METRICS_FILE)
+            if server is not None:
+                server.close()
+                await server.wait_closed()
 
         end_condition = True
         sim_elapsed_time = int(time() - sim_start_time)
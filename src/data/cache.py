@@ -0,0 +1,75 @@
+# pylint: disable=too-many-arguments, too-many-positional-arguments
+"""This module contains the Cache class that stores snapshots of backend API responses on disk."""
+
+import hashlib
+import json
+import os
+import time
+from ..utils.file import File
+
+class Cache:
+    """
+    On-disk snapshot cache for backend API responses.
+
+    Each snapshot is keyed by url and query parameters and stores the response data
+    together with the 'ETag' and 'Last-Modified' headers needed to revalidate it.
+    The modification time of the snapshot file is the time it was last confirmed fresh.
+    """
+    def __init__(self, folder, ttl):
+        self.folder = folder
+        self.ttl = ttl
+
+    @staticmethod
+    def key(url, params):
+        """Get the cache key of a url and its query parameters."""
+        identity = json.dumps({"url": url, "params": params}, sort_keys=True, default=str)
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+    def _filename(self, url, params):
+        """Get the filename of the snapshot of a url and its query parameters."""
+        return f"{Cache.key(url, params)}.json"
+
+    def _path(self, url, params):
+        """Get the path of the snapshot file of a url and its query parameters."""
+        return os.path.join(self.folder, self._filename(url, params))
+
+    def read(self, url, params):
+        """Read a snapshot, or return None if there is none (or it is unreadable)."""
+        path = self._path(url, params)
+        if not os.path.exists(path):
+            return None
+        try:
+            snapshot = File.Load.from_json(self.folder, self._filename(url, params))
+            snapshot['fetched_at'] = os.path.getmtime(path)
+            return snapshot
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, snapshot):
+        """Check if a snapshot is younger than the time to live."""
+        return time.time() - snapshot['fetched_at'] < self.ttl
+
+    def write(self, url, params, data, etag=None, last_modified=None):
+        """Write a snapshot atomically, replacing any previous one."""
+        snapshot = {
+            "url": url,
+            "params": params,
+            "etag": etag,
+            "last_modified": last_modified,
+            "data": data,
+        }
+        File.Save.to_json(snapshot, self.folder, self._filename(url, params), compact=True)
+
+    def touch(self, url, params):
+        """Mark a snapshot as fresh again after the backend confirmed it is unchanged."""
+        os.utime(self._path(url, params))
+
+    @staticmethod
+    def conditional_headers(snapshot):
+        """Get the headers to revalidate a snapshot with, if it has any validators."""
+        headers = {}
+        if snapshot.get('etag'):
+            headers['If-None-Match'] = snapshot['etag']
+        if snapshot.get('last_modified'):
+            headers['If-Modified-Since'] = snapshot['last_modified']
+        return headers
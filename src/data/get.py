@@ -1,8 +1,16 @@
+# pylint: disable=too-many-arguments, too-many-positional-arguments, too-many-locals
 """This module contains the Get class that is responsible for fetching data from the backend API."""
 
+import asyncio
+import os
+from dataclasses import dataclass, field
+from time import perf_counter
 import httpx
 from ..utils.settings import Settings
 from ..utils.file import File
+from .cache import Cache
+
+PAGE_SIZE = 1000
 
 def _url(url, endpoint):
     """Concatenate url and endpoint."""
@@ -12,65 +20,195 @@ def _extract_data_from_response_json(data):
     """Extracts the 'data' key from the response.json() that has JSON:API formatting."""
     return data['data']
 
+@dataclass
+class Bundle:
+    """Collections fetched together by 'Get.load', with the seconds each one took."""
+    bikes: list = field(default_factory=list)
+    users: list = field(default_factory=list)
+    trips: list = field(default_factory=list)
+    zones: list = field(default_factory=list)
+    zone_types: list = field(default_factory=list)
+    timings: dict[str, float] = field(default_factory=dict)
+
 class Get:
-    """Get data from the backend API."""
-    def __init__(self):
+    """
+    Get data from the backend API.
+
+    If 'cache_ttl' (in seconds) is set, every page is kept as an on-disk snapshot in
+    the data folder. Snapshots younger than 'cache_ttl' are used without a request,
+    older ones are revalidated with 'If-None-Match'/'If-Modified-Since' (when the backend
+    sent an 'ETag'/'Last-Modified') and fetched again in full otherwise.
+    Pass 'refresh=True' to a getter to ignore the snapshots.
+    """
+    def __init__(self, cache_ttl=None):
         self.endpoints = Settings.Endpoints()
         self.url = self.endpoints.backend_url
         self.token = Settings.Endpoints.token
         self.data_folder = Settings.Directory.data
+        self.cache = None
+        if cache_ttl is not None:
+            self.cache = Cache(folder=os.path.join(self.data_folder, 'cache'), ttl=cache_ttl)
         self.headers = {
             'Content-Type': 'application/json',
             'Authorization': f'Bearer {self.token}',
         }
 
-    async def _get_data(self, url, filename, save_to_json, limit=9999):
-        """Generic method to GET data asynchronously."""
-        async with httpx.AsyncClient() as client:
+    def _collection(self, collection):
+        """Get the url and query parameters of a collection."""
+        collections = {
+            'bikes': (self.endpoints.Bikes.get_all, {}),
+            'trips': (self.endpoints.Trips.get_all, {}),
+            'users': (self.endpoints.Users.get_all, {"is_eligable": True}),
+            'zones': (self.endpoints.Zones.get_all, {}),
+            'zone_types': (self.endpoints.Zones.get_types, {}),
+        }
+        if collection not in collections:
+            raise ValueError(f"Unknown collection: {collection}")
+        endpoint, params = collections[collection]
+        return _url(self.url, endpoint), params
+
+    async def _get_page(self, client, url, params, refresh=False):
+        """GET a single page of data asynchronously, through the snapshot cache if enabled."""
+        snapshot = None
+        if self.cache is not None and not refresh:
+            snapshot = await asyncio.to_thread(self.cache.read, url, params)
+        if snapshot is not None and self.cache.is_fresh(snapshot):
+            return snapshot['data']
+        headers = self.headers
+        if snapshot is not None:
+            headers = {**self.headers, **Cache.conditional_headers(snapshot)}
+        response = await client.get(url, params=params, headers=headers, timeout=20.0)
+        if snapshot is not None and response.status_code == 304:
+            self.cache.touch(url, params)
+            return snapshot['data']
+        response.raise_for_status()
+        data = _extract_data_from_response_json(response.json())
+        if self.cache is not None:
+            await asyncio.to_thread(
+                self.cache.write, url, params, data, response.headers.get('ETag'),
+                response.headers.get('Last-Modified'))
+        return data
+
+    async def pages(self, collection, limit=None, page_size=PAGE_SIZE, prefetch=True,
+                    client=None, refresh=False):
+        """
+        Get a collection from the backend API page by page, as an async generator.
+
+        Args:
+            collection (str):
+                One of 'bikes', 'trips', 'users', 'zones' or 'zone_types'.
+            limit (int, optional):
+                The maximum number of items to get in total. Defaults to None (no limit).
+            page_size (int, optional):
+                The number of items to request per page.
+            prefetch (bool, optional):
+                Whether to request the next page while the current one is being consumed.
+            client (httpx.AsyncClient, optional):
+                A client to reuse. Defaults to a temporary client.
+            refresh (bool, optional):
+                Whether to ignore cached snapshots and fetch every page again.
+        """
+        if client is None:
+            async with httpx.AsyncClient() as client: # pylint: disable=redefined-argument-from-local
+                async for page in self.pages(
+                        collection, limit, page_size, prefetch, client, refresh):
+                    yield page
+            return
+        url, params = self._collection(collection)
+        remaining = int(limit) if limit is not None else None
+
+        def _request(offset):
+            size = page_size if remaining is None else min(page_size, remaining)
+            page_params = {**params, "limit": size, "offset": offset}
+            return asyncio.ensure_future(self._get_page(client, url, page_params, refresh))
+
+        offset = 0
+        next_page = _request(offset) if remaining != 0 else None
+        previous_first_item = None
+        try:
+            while next_page is not None:
+                page = await next_page
+                next_page = None
+                if page and previous_first_item is not None and page[0] == previous_first_item:
+                    print(f"Backend ignored 'offset' for {collection}, stopping pagination.")
+                    break
+                previous_first_item = page[0] if page else None
+                offset += len(page)
+                if remaining is not None:
+                    remaining -= len(page)
+                has_more = len(page) >= page_size and remaining != 0
+                if has_more and prefetch:
+                    next_page = _request(offset)
+                if page:
+                    yield page
+                if has_more and not prefetch:
+                    next_page = _request(offset)
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
+    async def _collect(self, collection, limit=9999, page_size=PAGE_SIZE, client=None,
+                       refresh=False):
+        """Collect all pages of a collection into one list."""
+        result = []
+        async for page in self.pages(
+                collection, limit=limit, page_size=page_size, client=client, refresh=refresh):
+            result.extend(page)
+        return result
+
+    async def _get_data(self, collection, filename, save_to_json, limit=9999, refresh=False):
+        """Generic method to GET all pages of a collection asynchronously."""
+        try:
+            result = await self._collect(collection, limit=limit, refresh=refresh)
+            if save_to_json:
+                await File.Save.to_json_async(
+                    data=result, folder=self.data_folder, filename=filename)
+            return result
+        except httpx.RequestError as e:
+            raise httpx.RequestError(f"Failed to request {filename[:-5]}: {e}") from e
+
+    async def load(self, collections=('bikes', 'users', 'trips'), limit=9999,
+                   page_size=PAGE_SIZE, save_to_json=False, refresh=False):
+        """
+        Get several collections concurrently over one shared client.
+
+        Returns a 'Bundle' with one list per requested collection and the number of
+        seconds each collection took to fetch in 'Bundle.timings'.
+        """
+        bundle = Bundle()
+
+        async def _load(collection, client):
+            start_time = perf_counter()
             try:
-                response = await client.get(
-                    url, params={"limit": limit}, headers=self.headers, timeout=20.0)
-                response.raise_for_status()
-                result = _extract_data_from_response_json(response.json())
-                if save_to_json:
-                    await File.Save.to_json(data=result, folder=self.data_folder, filename=filename)
-                return result
+                result = await self._collect(collection, limit, page_size, client, refresh)
             except httpx.RequestError as e:
-                raise httpx.RequestError(f"Failed to request {filename[:-5]}: {e}") from e
+                raise httpx.RequestError(f"Failed to request {collection}: {e}") from e
+            bundle.timings[collection] = perf_counter() - start_time
+            setattr(bundle, collection, result)
+            if save_to_json:
+                await File.Save.to_json_async(
+                    data=result, folder=self.data_folder, filename=f"{collection}.json")
 
-    async def bikes(self, save_to_json=True, limit=9999):
+        async with httpx.AsyncClient() as client:
+            await asyncio.gather(*(_load(collection, client) for collection in collections))
+        return bundle
+
+    async def bikes(self, save_to_json=True, limit=9999, refresh=False):
         """Get all bikes from the backend API."""
-        url = _url(self.url, self.endpoints.Bikes.get_all)
-        return await self._get_data(url, 'bikes.json', save_to_json, limit)
+        return await self._get_data('bikes', 'bikes.json', save_to_json, limit, refresh)
 
-    async def trips(self, save_to_json=True, limit=9999):
+    async def trips(self, save_to_json=True, limit=9999, refresh=False):
         """Get all trips from the backend API."""
-        url = _url(self.url, self.endpoints.Trips.get_all)
-        return await self._get_data(url, 'trips.json', save_to_json, limit)
+        return await self._get_data('trips', 'trips.json', save_to_json, limit, refresh)
 
-    async def users(self, save_to_json=True, limit=9999):
+    async def users(self, save_to_json=True, limit=9999, refresh=False):
         """Get all users from the backend API."""
-        url = _url(self.url, self.endpoints.Users.get_all)
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    url, params={"limit": limit, "is_eligable": True},
-                    headers=self.headers, timeout=20.0)
-                response.raise_for_status()
-                result = _extract_data_from_response_json(response.json())
-                if save_to_json:
-                    await File.Save.to_json(
-                        data=result, folder=self.data_folder, filename="users.json")
-                return result
-            except httpx.RequestError as e:
-                raise httpx.RequestError(f"Failed to request: {e}") from e
+        return await self._get_data('users', 'users.json', save_to_json, limit, refresh)
 
-    async def zones(self, save_to_json=True, limit=9999):
+    async def zones(self, save_to_json=True, limit=9999, refresh=False):
         """Get all zones from the backend API."""
-        url = _url(self.url, self.endpoints.Zones.get_all)
-        return await self._get_data(url, 'zones.json', save_to_json, limit)
+        return await self._get_data('zones', 'zones.json', save_to_json, limit, refresh)
 
-    async def zone_types(self, save_to_json=True, limit=9999):
+    async def zone_types(self, save_to_json=True, limit=9999, refresh=False):
         """Get all zone types from the backend API."""
-        url = _url(self.url, self.endpoints.Zones.get_types)
-        return await self._get_data(url, 'zone_types.json', save_to_json, limit)
+        return await self._get_data('zone_types', 'zone_types.json', save_to_json, limit, refresh)
@@ -64,14 +64,13 @@ class Main:
             self.repositories.submodules.get.all()
 
     def _use_local_repositories(self):
-        """Pull repositories to the local repositories folder."""
+        """Pull repositories to the local repositories folder, all at once."""
         os.environ["REPOSITORIES_DIRECTORY"] = Settings.Directory.local_repositories
-        self.repositories.local.get.backend(
-            branch=self.backend_branch, commit=self.backend_commit)
-        self.repositories.local.get.frontend(
-            branch=self.frontend_branch, commit=self.frontend_commit)
-        self.repositories.local.get.bike(
-            branch=self.bike_branch, commit=self.bike_commit)
+        self.repositories.local.get.all(refs={
+            "backend": (self.backend_branch, self.backend_commit),
+            "frontend": (self.frontend_branch, self.frontend_commit),
+            "bike": (self.bike_branch, self.bike_commit),
+        }, force=False)
 
     def _setup_master(self, simulation=False, rebuild=False):
         """Setup the master repository."""
@@ -92,20 +91,24 @@ class Main:
     def _run(self, simulation=True, simulation_speed_factor=1.0,
              rebuild=False, open_chrome_tabs=False, bike_limit=9999
              ):
-        """Helper method for running the master repository."""
-        if simulation_speed_factor == 1.0 or (bike_limit == 9999 or bike_limit is None):
-            Docker.Compose.Environment.reset(simulation=False)
-        if bike_limit == 9999 or bike_limit is None:
-            Docker.Compose.Environment.reset(simulation=True)
+        """
+        Helper method for running the master repository.
+        Both Docker Compose files are reset first, so the hivemind and the simulation
+        always run at the same speed, with the same bike limit.
+        """
+        Docker.Compose.Environment.reset(simulation=False)
+        Docker.Compose.Environment.reset(simulation=True)
+        overrides = {}
         if simulation_speed_factor != 1.0:
             default_speed_kmh = 20.0
             simulation_speed_kmh = default_speed_kmh * simulation_speed_factor
-            Docker.Compose.Environment.set(
-                BIKE_SERVICE_NAME, "DEFAULT_SPEED",
-                int(simulation_speed_kmh))
+            for service in (BIKE_SERVICE_NAME, SIMULATION_SERVICE_NAME):
+                overrides.setdefault(service, {})["DEFAULT_SPEED"] = int(simulation_speed_kmh)
         if bike_limit != 9999 and bike_limit is not None:
-            Docker.Compose.Environment.set(BIKE_SERVICE_NAME, "BIKE_LIMIT", bike_limit)
-            Docker.Compose.Environment.set(SIMULATION_SERVICE_NAME, "BIKE_LIMIT", bike_limit)
+            overrides.setdefault(BIKE_SERVICE_NAME, {})["BIKE_LIMIT"] = bike_limit
+            overrides.setdefault(SIMULATION_SERVICE_NAME, {})["BIKE_LIMIT"] = bike_limit
+        if overrides:
+            Docker.Compose.Environment.set_many(overrides)
 
         self._setup_master(simulation, rebuild)
 
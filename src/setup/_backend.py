@@ -65,10 +65,9 @@ class Backend:
 
         @staticmethod
         def _clear():
-            """Clear the backend Docker container."""
-            Docker.Container.delete(DATABASE_CONTAINER)
-            Docker.Container.delete(DATABASE_ADMINER_CONTAINER)
-            Docker.Container.delete(BACKEND_CONTAINER)
+            """Clear the backend Docker containers (all at once)."""
+            Docker.Container.delete_all(
+                [DATABASE_CONTAINER, DATABASE_ADMINER_CONTAINER, BACKEND_CONTAINER])
 
     @staticmethod
     def _setup():
@@ -1,10 +1,14 @@
 # pylint: disable=too-few-public-methods
 """Module to manage the setup of the environment for the master repository."""
 
+import functools
 import os
 from ._environment import Environment
 from ..utils.docker import Docker
 from ..utils.directory import Directory
+from ..utils.fingerprint import Fingerprint, INPUT_FILENAMES
+from ..utils.readiness import Readiness
+from ..utils.steps import Steps
 
 REPO_DIR = Directory.root()
 FRONTEND_DIR = Directory.Repo.frontend()
@@ -14,6 +18,7 @@ BACKEND_CONTAINER = os.getenv("BACKEND_CONTAINER", 'api')
 BIKE_CONTAINER = os.getenv("BIKE_CONTAINER", 'bike_hivemind')
 SIMULATION_CONTAINER = os.getenv("SIMULATION_CONTAINER", 'simulation')
 DOCKER_COMPOSE_FILENAMES = ['docker-compose.yml', 'docker-compose.simulation.yml']
+NPM_BUILD = 'frontend (npm)'
 
 class Master:
     """Class to manage the setup of the master repository."""
@@ -21,30 +26,98 @@ class Master:
         """Class to manage the Docker setup of the master repository."""
         @staticmethod
         def clear(simulation=False):
-            """Clear the Docker containers."""
-            Docker.Container.delete(DATABASE_CONTAINER)
-            Docker.Container.delete(DATABASE_ADMINER_CONTAINER)
-            Docker.Container.delete(BACKEND_CONTAINER)
-            Docker.Container.delete(BIKE_CONTAINER)
+            """Clear the Docker containers (all at once)."""
+            containers = [
+                DATABASE_CONTAINER, DATABASE_ADMINER_CONTAINER, BACKEND_CONTAINER, BIKE_CONTAINER]
             if simulation:
-                Docker.Container.delete(SIMULATION_CONTAINER)
+                containers.append(SIMULATION_CONTAINER)
+            Docker.Container.delete_all(containers)
 
         @staticmethod
-        def build(simulation=False, rebuild=False):
-            """Build the Docker containers."""
-            Docker.Compose.build(FRONTEND_DIR, npm=True, reinstall=rebuild)
-            if not rebuild:
-                return
-            if not simulation:
-                Docker.Compose.build(REPO_DIR)
-            if simulation:
-                Docker.Compose.Combined.build(REPO_DIR, filenames=DOCKER_COMPOSE_FILENAMES)
+        def _filenames(simulation=False):
+            """Get the Docker Compose files of the setup."""
+            return DOCKER_COMPOSE_FILENAMES if simulation else DOCKER_COMPOSE_FILENAMES[:1]
+
+        @staticmethod
+        def services(simulation=False):
+            """Get the names of the services whose Docker images are built from source."""
+            return list(Docker.Compose.builds(REPO_DIR, Master.Docker._filenames(simulation)))
+
+        @staticmethod
+        def frontend_services(simulation=False):
+            """
+            Get the names of the services whose Docker images are built from the frontend
+            repository, so from the output of the npm build.
+            """
+            frontend = os.path.basename(os.path.normpath(FRONTEND_DIR))
+            return [
+                name for name, (context, _) in Docker.Compose.builds(
+                    REPO_DIR, Master.Docker._filenames(simulation)).items()
+                if os.path.basename(os.path.normpath(context)) == frontend]
 
         @staticmethod
-        def up(simulation=False):
-            """Start the Docker containers."""
+        def _inputs(simulation=False, services=None):
+            """Get the fingerprint inputs of the images of 'services' (default all)."""
+            return {
+                name: Fingerprint.inputs(context, (dockerfile, *INPUT_FILENAMES))
+                for name, (context, dockerfile)
+                in Docker.Compose.builds(REPO_DIR, Master.Docker._filenames(simulation)).items()
+                if services is None or name in services}
+
+        @staticmethod
+        def build_frontend(rebuild=False, force=False, fingerprint=None):
+            """Run the npm build of the frontend, unless its inputs are unchanged."""
+            fingerprint = fingerprint or Fingerprint()
+            npm_inputs = Fingerprint.inputs(FRONTEND_DIR)
+            if fingerprint.check(
+                    NPM_BUILD, npm_inputs, force, output=os.path.join(FRONTEND_DIR, 'build')):
+                if Docker.Compose.build(FRONTEND_DIR, npm=True, reinstall=rebuild):
+                    fingerprint.update(NPM_BUILD, npm_inputs)
+
+        @staticmethod
+        def build_services(simulation=False, services=None, force=False, fingerprint=None):
+            """Build the Docker images of 'services' (default all) whose inputs changed."""
+            fingerprint = fingerprint or Fingerprint()
+            filenames = Master.Docker._filenames(simulation)
+            inputs = Master.Docker._inputs(simulation, services)
+            changed = [name for name in inputs if fingerprint.check(name, inputs[name], force)]
+            built = True
+            if changed and not simulation:
+                built = Docker.Compose.build(REPO_DIR, services=changed)
+            if changed and simulation:
+                Docker.Compose.Combined.build(
+                    REPO_DIR, filenames=filenames, services=changed, wait=True)
+            if built:
+                for name in changed:
+                    fingerprint.update(name, inputs[name])
+
+        @staticmethod
+        def build(simulation=False, rebuild=False, force=False):
+            """
+            Build the frontend and, if 'rebuild' is set, the Docker images.
+            Builds whose inputs are unchanged since their last successful build are skipped
+            (unless 'force' is set), followed by a report of what was rebuilt and why.
+            """
+            fingerprint = Fingerprint()
+            Master.Docker.build_frontend(rebuild, force, fingerprint)
+            if rebuild:
+                Master.Docker.build_services(simulation, force=force, fingerprint=fingerprint)
+            fingerprint.print_report()
+
+        @staticmethod
+        def up(simulation=False, fingerprint=None):
+            """
+            Start the Docker containers.
+            Images are only rebuilt on start if the inputs of a service changed since its
+            last successful build.
+            """
             if not simulation:
-                Docker.Compose.up(REPO_DIR)
+                fingerprint = fingerprint or Fingerprint()
+                inputs = Master.Docker._inputs(simulation)
+                changed = [name for name in inputs if fingerprint.changes(name, inputs[name]) != []]
+                Docker.Compose.up(REPO_DIR, build=bool(changed))
+                for name in changed:
+                    fingerprint.update(name, inputs[name])
             if simulation:
                 Docker.Compose.Combined.up(REPO_DIR, filenames=DOCKER_COMPOSE_FILENAMES)
 
@@ -72,23 +145,77 @@ class Master:
             if simulation:
                 Docker.Compose.Combined.logs(REPO_DIR, filenames=DOCKER_COMPOSE_FILENAMES)
 
+        @staticmethod
+        def wait():
+            """
+            Wait until the api, the bike hivemind and the database are ready.
+            Returns the seconds until each service was ready.
+            """
+            seconds = Readiness.wait_sync(Readiness.Probes.stack())
+            print("Time to ready:")
+            for service, service_seconds in seconds.items():
+                print(f"  {service}: {service_seconds:.2f}s")
+            return seconds
+
         @staticmethod
         def restart(simulation=False, rebuild=False):
-            """Restart the Docker containers."""
+            """Restart the Docker containers and wait until they are ready."""
             Master.Docker.down(simulation)
             Master.Docker.clear(simulation)
             Master.Docker.build(simulation, rebuild)
             Master.Docker.up(simulation)
+            Master.Docker.wait()
             Master.Docker.status(simulation)
-            Master.Docker.logs(simulation)
 
     @staticmethod
     def setup(simulation=False, rebuild=False, start_docker_desktop=False):
-        """Setup the master repository."""
+        """
+        Setup the master repository.
+
+        The setup steps run as a dependency graph (see 'Steps'), so independent steps,
+        like the frontend build and the image build of every service, run concurrently.
+        Ends with a report of what was rebuilt and the timing of every step.
+        """
+        fingerprint = Fingerprint()
+        steps = Steps()
+        docker = ()
         if start_docker_desktop:
-            Docker.Desktop.start()
-        Environment.Files.generate()
-        Master.Docker.restart(simulation, rebuild)
+            steps.add("docker desktop", Docker.Desktop.start)
+            docker = ("docker desktop",)
+
+        def _stop():
+            Master.Docker.down(simulation)
+            Master.Docker.clear(simulation)
+
+        steps.add("env files", Environment.Files.generate)
+        steps.add("stop containers", _stop, after=docker)
+        steps.add(
+            "npm build",
+            functools.partial(Master.Docker.build_frontend, rebuild, False, fingerprint),
+            after=("env files",))
+        builds = ["npm build"]
+        if rebuild:
+            frontend_services = Master.Docker.frontend_services(simulation)
+            for service in Master.Docker.services(simulation):
+                npm = ("npm build",) if service in frontend_services else ()
+                steps.add(
+                    f"image {service}",
+                    functools.partial(
+                        Master.Docker.build_services, simulation, [service], False, fingerprint),
+                    after=("env files", *docker, *npm))
+                builds.append(f"image {service}")
+        steps.add(
+            "up", functools.partial(Master.Docker.up, simulation, fingerprint),
+            after=("stop containers", *builds))
+        steps.add("wait for services", Master.Docker.wait, after=("up",))
+        steps.add(
+            "status", functools.partial(Master.Docker.status, simulation),
+            after=("wait for services",))
+        try:
+            steps.run()
+        finally:
+            fingerprint.print_report()
+            steps.print_report()
 
 # NOTE: Commented out as to not affect coverage.
 if __name__ == "__main__": # pragma: no cover
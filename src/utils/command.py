@@ -1,8 +1,14 @@
-# pylint: disable=too-many-arguments, too-many-positional-arguments, too-few-public-methods
+# pylint: disable=too-many-arguments, too-many-positional-arguments, too-few-public-methods, too-many-branches, broad-exception-caught
 """Module to run subprocess commands."""
 
+import asyncio
 import subprocess
 import sys
+from dataclasses import dataclass, field
+from time import perf_counter
+from .output import Output
+
+STREAM_LIMIT = 2 ** 20
 
 class Command:
     """Class to run subprocess commands."""
@@ -31,10 +37,15 @@ class Command:
                 Whether to raise an exception if the command fails.
             stream_output (bool, optional): 
                 Whether to stream the output to the console.
+            return_output (bool, optional):
+                Whether to capture the output and return it (stripped, as a string).
             inherit_environment (bool, optional):
                 Whether to inherit the current environment variables.
             **kwargs:
                 Additional keyword arguments to pass to subprocess.
+
+        If the calling thread is capturing its output (see 'Output.capture'),
+        the command's output is captured and printed into that thread's buffer.
         """
         try:
             print(f"Running command: {' '.join(command)}")
@@ -50,23 +61,214 @@ class Command:
             if return_output:
                 stdout = subprocess.PIPE
                 stderr = subprocess.PIPE
+            fire_and_forget = asynchronous and not raise_exception
+            if Output.capturing() and not return_output and not fire_and_forget:
+                stdout = subprocess.PIPE
+                stderr = subprocess.STDOUT
 
+            if stdout is subprocess.PIPE and not return_output:
+                Command._stream(command, directory, raise_exception, env, **kwargs)
+                print("Command executed successfully.\n")
+                return None
+            if stdout is subprocess.PIPE:
+                result = subprocess.run(
+                    command, cwd=directory, check=raise_exception, stdout=stdout,
+                    stderr=stderr, env=env, **kwargs)
+                output = (result.stdout or b'').decode('utf-8', errors='replace')
+                if not return_output:
+                    print(output, end='')
+                print("Command executed successfully.\n")
+                return output.strip() if return_output else None
             if asynchronous and raise_exception:
                 subprocess.check_call(
                     command, cwd=directory, stdout=stdout, stderr=stderr, env=env, **kwargs)
             if asynchronous and not raise_exception:
                 subprocess.Popen( # pylint: disable=consider-using-with
                     command, cwd=directory, stdout=stdout, stderr=stderr, env=env, **kwargs)
-            if not asynchronous and not raise_exception:
-                subprocess.run(
-                    command, cwd=directory, check=raise_exception, stdout=stdout,
-                    stderr=stderr, env=env, **kwargs)
-            if not asynchronous and raise_exception:
+            if not asynchronous:
                 subprocess.run(
                     command, cwd=directory, check=raise_exception, stdout=stdout,
                     stderr=stderr, env=env, **kwargs)
             print("Command executed successfully.\n")
+            return None
         except subprocess.CalledProcessError as e:
+            for output in (e.stdout, e.stderr):
+                if output:
+                    print(output.decode('utf-8', errors='replace'), end='')
             print(f"Error: Command '{' '.join(command)}' failed with exit code {e.returncode}")
             if raise_exception:
                 sys.exit(1)
+            return None
+
+    @staticmethod
+    def _stream(command, directory, raise_exception, env, **kwargs):
+        """
+        Run a command and print its output line by line as it arrives, so a thread that
+        is capturing its output gets every line when it is printed, not when it is done.
+        """
+        with subprocess.Popen(
+                command, cwd=directory, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                env=env, **kwargs) as process:
+            for line in process.stdout:
+                print(line.decode('utf-8', errors='replace'), end='')
+        if raise_exception and process.returncode:
+            raise subprocess.CalledProcessError(process.returncode, command)
+
+    @dataclass
+    class Result:
+        """The outcome of a command run by 'Command.Async'."""
+        command: list
+        returncode: int | None = None
+        stdout: str = ''
+        stderr: str = ''
+        seconds: float = 0.0
+        timed_out: bool = False
+
+        @property
+        def ok(self):
+            """Whether the command exited with exit code 0."""
+            return self.returncode == 0 and not self.timed_out
+
+        def check(self):
+            """Raise a 'subprocess.CalledProcessError' if the command failed."""
+            if not self.ok:
+                raise subprocess.CalledProcessError(
+                    -1 if self.returncode is None else self.returncode,
+                    self.command, self.stdout, self.stderr)
+            return self
+
+    @dataclass
+    class Job:
+        """A named command for 'Command.Async.group'."""
+        name: str
+        command: list
+        directory: str = None
+        timeout: float = None
+        kwargs: dict = field(default_factory=dict)
+
+    class Async:
+        """
+        Class to run subprocess commands with asyncio.
+
+        Unlike 'Command.run', commands never exit the program: every command returns a
+        'Command.Result' with its exit code, output and wall time, and failures are up
+        to the caller (see 'Command.Result.check').
+
+        Used where independent commands can overlap (readiness probes, the git state of
+        build fingerprints, container cleanup). Setup steps that have to run one after
+        the other keep using 'Command.run'.
+        """
+        @staticmethod
+        async def _read(stream, lines, prefix, stream_output, target):
+            """Collect the lines of a stream, printing them (prefixed) as they arrive."""
+            while True:
+                line = await stream.readline()
+                if not line:
+                    return
+                text = line.decode('utf-8', errors='replace')
+                lines.append(text)
+                if stream_output:
+                    print(f"[{prefix}] {text}" if prefix else text, end='', file=target)
+
+        @staticmethod
+        async def run(
+            command: list,
+            directory: str = None,
+            timeout: float = None,
+            prefix: str = None,
+            stream_output: bool = True,
+            **kwargs
+            ):
+            """
+            Run a command asynchronously and return a 'Command.Result'.
+
+            Args:
+                command (list):
+                    The command to run.
+                directory (str, optional):
+                    The directory to run the command in.
+                timeout (float, optional):
+                    Seconds after which the command is killed ('Result.timed_out' is set).
+                prefix (str, optional):
+                    A prefix for every streamed line of output, e.g. the name of the job.
+                stream_output (bool, optional):
+                    Whether to print the output while the command runs.
+                **kwargs:
+                    Additional keyword arguments to pass to asyncio.create_subprocess_exec.
+
+            If the calling task is cancelled, the command is killed before re-raising.
+            """
+            result = Command.Result(command=command)
+            stdout, stderr = [], []
+            start_time = perf_counter()
+            process = await asyncio.create_subprocess_exec(
+                *command, cwd=directory, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                limit=STREAM_LIMIT, **kwargs)
+            readers = asyncio.gather(
+                Command.Async._read(process.stdout, stdout, prefix, stream_output, sys.stdout),
+                Command.Async._read(process.stderr, stderr, prefix, stream_output, sys.stderr))
+            try:
+                await asyncio.wait_for(asyncio.shield(readers), timeout)
+                result.returncode = await process.wait()
+            except asyncio.TimeoutError:
+                result.timed_out = True
+                process.kill()
+                result.returncode = await process.wait()
+                _, pending = await asyncio.wait({readers}, timeout=1.0)
+                for reader in pending: # Grandchildren may keep the pipes open.
+                    reader.cancel()
+            except asyncio.CancelledError:
+                process.kill()
+                await process.wait()
+                readers.cancel()
+                raise
+            result.stdout = ''.join(stdout)
+            result.stderr = ''.join(stderr)
+            result.seconds = perf_counter() - start_time
+            return result
+
+        @staticmethod
+        async def group(jobs: list, limit: int = None, stream_output: bool = True,
+                        fail_fast: bool = False):
+            """
+            Run several 'Command.Job's concurrently, at most 'limit' at a time.
+
+            Output is streamed with every line prefixed by the name of its job.
+            A job that cannot be started (e.g. a missing executable) gets a failed result
+            without an exit code and with the error as its stderr.
+            If 'fail_fast' is set, the remaining jobs are cancelled as soon as one fails
+            (cancelled jobs are missing from the results).
+            Returns a dictionary of job name to 'Command.Result', in the order of 'jobs'.
+            """
+            semaphore = asyncio.Semaphore(limit or len(jobs) or 1)
+            results = {}
+
+            async def _run(job):
+                async with semaphore:
+                    try:
+                        result = await Command.Async.run(
+                            job.command, directory=job.directory, timeout=job.timeout,
+                            prefix=job.name, stream_output=stream_output, **job.kwargs)
+                    except Exception as e:
+                        print(f"[{job.name}] Failed to start '{' '.join(job.command)}': {e}")
+                        result = Command.Result(command=job.command, stderr=str(e))
+                results[job.name] = result
+                return result
+
+            tasks = [asyncio.create_task(_run(job)) for job in jobs]
+            try:
+                for task in asyncio.as_completed(tasks):
+                    result = await task
+                    if fail_fast and not result.ok:
+                        break
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+            return {job.name: results[job.name] for job in jobs if job.name in results}
+
+        @staticmethod
+        def run_group(jobs: list, limit: int = None, stream_output: bool = True,
+                      fail_fast: bool = False):
+            """Run 'Command.Async.group' from synchronous code."""
+            return asyncio.run(Command.Async.group(jobs, limit, stream_output, fail_fast))
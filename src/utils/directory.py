@@ -55,6 +55,11 @@ class Directory:
         """Get the local repositories directory."""
         return os.path.join(Directory.root(), Settings.Directory.local_repositories)
 
+    @staticmethod
+    def node_modules_cache():
+        """Get the directory of the cached node_modules."""
+        return os.path.join(Directory.root(), Settings.Directory.node_modules_cache)
+
     class Repo:
         """Class for handling the repository directories."""
         @staticmethod
@@ -4,24 +4,36 @@
 import os
 import platform
 import sys
-import time
 import shutil
 import yaml
 from .command import Command
 from .directory import Directory
+from .file import File
+from .node_modules import NodeModules
+from .readiness import Readiness
 
 ROOT_DIR = Directory.root()
 DOCKER_COMPOSE_FILENAME = "docker-compose.yml"
 DOCKER_COMPOSE_RESET_FILENAME = "docker-compose.reset.yml"
 DOCKER_COMPOSE_SIMULATION_FILENAME = "docker-compose.simulation.yml"
+DOCKER_COMPOSE_SIMULATION_RESET_FILENAME = "docker-compose.simulation.reset.yml"
+DOCKER_DESKTOP_TIMEOUT = 120
 
 class Docker:
     """Class to manage Docker commands."""
     class Compose:
         """Class to manage Docker Compose commands."""
         @staticmethod
-        def build(directory, npm=False, reinstall=False):
-            """Method to build the Docker image."""
+        def build(directory, npm=False, reinstall=False, services=None):
+            """
+            Method to build the Docker image (or the npm build, if 'npm' is set).
+            Only builds 'services' if given. Returns whether the build succeeded.
+
+            With 'npm', projects with a package-lock.json get their node_modules from
+            a cache keyed on the lockfile (see 'NodeModules'), so 'npm ci' only runs when
+            the lockfile changed. Other projects run 'npm install' if 'reinstall' is set
+            or there is no build yet.
+            """
             is_windows = platform.system() == "Windows"
             npm_filename = "npm.cmd" if is_windows else "npm"
             def _npm_exists():
@@ -33,7 +45,13 @@ class Docker:
             if npm:
                 if not _npm_exists():
                     raise Exception("NPM is not installed.")
-                if (reinstall or not os.path.exists(os.path.join(directory, 'build'))):
+                if NodeModules.has_lockfile(directory):
+                    try:
+                        NodeModules.restore(directory, npm_filename)
+                    except Exception as e:
+                        print(f"Failed to install node_modules: {e}")
+                        return False
+                elif (reinstall or not os.path.exists(os.path.join(directory, 'build'))):
                     try:
                         Command.run(
                             [npm_filename, "install"],
@@ -44,7 +62,7 @@ class Docker:
                     except Exception as e:
                         print(f"Failed to run NPM install: {e}")
                         print(f"/build exists: {os.path.exists(os.path.join(directory, 'build'))}")
-                        return
+                        return False
                 try:
                     print("Running npm run build...")
                     Command.run(
@@ -54,22 +72,48 @@ class Docker:
                         )
                 except Exception as e:
                     print(f"Failed to run NPM build: {e}")
-                    return
+                    return False
             if not npm:
                 try:
                     print("Building the Docker image...")
-                    Command.run(["docker-compose", "build"], directory=directory)
+                    Command.run(["docker-compose", "build", *(services or [])], directory=directory)
                     print("Docker image built successfully.")
                 except Exception as e:
                     print(f"Failed to build the Docker image: {e}")
+                    return False
+            return True
 
         @staticmethod
-        def up(directory, npm=False):
-            """Method to start the Docker containers."""
+        def builds(directory, filenames=(DOCKER_COMPOSE_FILENAME,)):
+            """
+            Get the services that are built from source in the Docker Compose files,
+            as a dictionary of service name to (build context directory, Dockerfile path).
+            """
+            builds = {}
+            for filename in filenames:
+                with open(os.path.join(directory, filename), 'r', encoding='utf-8') as file:
+                    docker_compose = yaml.safe_load(file) or {}
+                for name, service in (docker_compose.get('services') or {}).items():
+                    build = (service or {}).get('build')
+                    if not build:
+                        continue
+                    if isinstance(build, str):
+                        build = {'context': build}
+                    context = os.path.normpath(
+                        os.path.join(directory, build.get('context', '.')))
+                    builds[name] = (context, build.get('dockerfile', 'Dockerfile'))
+            return builds
+
+        @staticmethod
+        def up(directory, npm=False, build=True):
+            """
+            Method to start the Docker containers.
+            If 'build' is False, the images are not rebuilt before starting.
+            """
             Docker.Compose.down(directory)
             if not npm:
                 Command.run(
-                    ["docker-compose", "up", "-d", "--build"],
+                    ["docker-compose", "up", "-d", *(["--build"] if build else [])],
                     directory=directory
                     )
             if npm:
@@ -116,10 +160,17 @@ class Docker:
                 return ["docker-compose"] + compose_files + command
 
             @staticmethod
-            def build(directory, filenames):
-                """Method to build the Docker images."""
-                Command.run(Docker.Compose.Combined._combine_into_command(
-                    filenames, ["build"]), directory=directory, raise_exception=False)
+            def build(directory, filenames, services=None, wait=False):
+                """
+                Method to build the Docker images (only 'services' if given).
+                If 'wait' is set, waits for the build and exits if it fails.
+                """
+                command = Docker.Compose.Combined._combine_into_command(
+                    filenames, ["build", *(services or [])])
+                if wait:
+                    Command.run(command, directory=directory, asynchronous=False)
+                    return
+                Command.run(command, directory=directory, raise_exception=False)
 
             @staticmethod
             def up(directory, filenames):
@@ -145,37 +196,91 @@ class Docker:
                 Command.run(Docker.Compose.Combined._combine_into_command(
                     filenames, ["logs", "-f"]), directory=directory, raise_exception=False)
 
-        class Environment:
-            """Class to manage Docker Compose environment variables."""
-            @staticmethod
-            def set(service, variable, value):
-                """Set an environment variable for a Docker Compose service."""
-                if service == "simulation":
-                    docker_compose_file = os.path.join(ROOT_DIR, DOCKER_COMPOSE_SIMULATION_FILENAME)
-                else:
-                    docker_compose_file = os.path.join(ROOT_DIR, DOCKER_COMPOSE_FILENAME)
-                backup_file = docker_compose_file + ".backup"
-                if not os.path.exists(docker_compose_file):
-                    raise FileNotFoundError(f"{docker_compose_file} does not exist.")
-                shutil.copyfile(docker_compose_file, backup_file)
-                print(f"Backup created at {backup_file}.")
-                with open(docker_compose_file, 'r', encoding='utf-8') as file:
-                    docker_compose = yaml.safe_load(file)
-                services = docker_compose.get('services', {})
+        class Config:
+            """
+            In-memory model of a Docker Compose file.
+
+            The file is read once, changes are applied in memory, and 'save' writes the
+            file back once, atomically, and only if something changed.
+            """
+            def __init__(self, path):
+                if not os.path.exists(path):
+                    raise FileNotFoundError(f"{path} does not exist.")
+                self.path = path
+                with open(path, 'r', encoding='utf-8') as file:
+                    self.data = yaml.safe_load(file) or {}
+                self.changed = False
+
+            def environment(self, service):
+                """Get the environment variables of a service, as a key-value dictionary."""
+                services = self.data.get('services', {})
                 if service not in services:
                     raise ValueError(f"Service '{service}' not found.")
-                service = services[service]
-                environment = service.get('environment', {})
+                environment = services[service].get('environment', {})
                 if environment is None or isinstance(environment, list):
                     raise TypeError(
                         f"Environment for service '{service}' must be a key-value dictionary.")
+                services[service]['environment'] = environment
+                return environment
+
+            def set(self, service, variable, value):
+                """Set an environment variable of a service (in memory)."""
+                environment = self.environment(service)
+                if variable in environment and environment[variable] == value:
+                    return self
                 environment[variable] = value
-                service['environment'] = environment
-                with open(docker_compose_file, 'w', encoding='utf-8') as file:
-                    yaml.safe_dump(docker_compose, file, default_flow_style=False)
-                print(
-                    f"Updated '{variable}' for service '{service}' to \
-                        '{value}' in {docker_compose_file}.")
+                self.changed = True
+                print(f"Set '{variable}' for service '{service}' to '{value}' in {self.path}.")
+                return self
+
+            def save(self, backup=True):
+                """
+                Write the file atomically if anything changed, after backing up the old one.
+                Returns whether the file was written.
+                """
+                if not self.changed:
+                    print(f"No changes to {self.path}.")
+                    return False
+                if backup:
+                    backup_file = self.path + ".backup"
+                    shutil.copyfile(self.path, backup_file)
+                    print(f"Backup created at {backup_file}.")
+                content = yaml.safe_dump(self.data, default_flow_style=False)
+                File.Write.atomic(self.path, content.encode('utf-8'))
+                self.changed = False
+                return True
+
+        class Environment:
+            """Class to manage Docker Compose environment variables."""
+            @staticmethod
+            def _file(service):
+                """Get the Docker Compose file that defines a service."""
+                if service == "simulation":
+                    return os.path.join(ROOT_DIR, DOCKER_COMPOSE_SIMULATION_FILENAME)
+                return os.path.join(ROOT_DIR, DOCKER_COMPOSE_FILENAME)
+
+            @staticmethod
+            def set(service, variable, value):
+                """Set an environment variable for a Docker Compose service."""
+                Docker.Compose.Environment.set_many({service: {variable: value}})
+
+            @staticmethod
+            def set_many(overrides):
+                """
+                Set environment variables for several Docker Compose services at once.
+
+                'overrides' maps service names to dictionaries of variables and values.
+                Each Docker Compose file is read once and written at most once.
+                """
+                configs = {}
+                for service, variables in overrides.items():
+                    path = Docker.Compose.Environment._file(service)
+                    if path not in configs:
+                        configs[path] = Docker.Compose.Config(path)
+                    for variable, value in variables.items():
+                        configs[path].set(service, variable, value)
+                for config in configs.values():
+                    config.save()
 
             @staticmethod
             def reset(simulation=False):
@@ -189,7 +294,7 @@ class Docker:
                     print(f"Reset Docker Compose file to {reset_file}.")
                 if simulation:
                     docker_compose_file = os.path.join(ROOT_DIR, DOCKER_COMPOSE_SIMULATION_FILENAME)
-                    reset_file = os.path.join(ROOT_DIR, DOCKER_COMPOSE_RESET_FILENAME)
+                    reset_file = os.path.join(ROOT_DIR, DOCKER_COMPOSE_SIMULATION_RESET_FILENAME)
                     if not os.path.exists(reset_file):
                         raise FileNotFoundError(f"{reset_file} does not exist.")
                     shutil.copyfile(reset_file, docker_compose_file)
@@ -223,6 +328,17 @@ class Docker:
             except Exception as e:
                 print(f"Failed to delete container '{name}': {e}")
 
+        @staticmethod
+        def delete_all(names):
+            """Delete several Docker containers at once."""
+            results = Command.Async.run_group(
+                [Command.Job(name, ["docker", "rm", "-f", name]) for name in names])
+            for name, result in results.items():
+                if result.ok:
+                    print(f"Container '{name}' deleted successfully.")
+                else:
+                    print(f"Failed to delete container '{name}': {result.stderr.strip()}")
+
     class Network:
         """Class to manage Docker network commands."""
         @staticmethod
@@ -353,7 +469,9 @@ class Docker:
                     docker_desktop_executable = r'C:\Program Files\Docker\Docker\Docker Desktop.exe'
                     if os.path.exists(docker_desktop_executable):
                         Command.run([docker_desktop_executable], asynchronous=False)
-                        time.sleep(10)
+                        Readiness.wait_sync(
+                            [Readiness.Probes.command("docker", ["docker", "info"])],
+                            timeout=DOCKER_DESKTOP_TIMEOUT)
                 else:
                     print("Please start Docker Desktop manually.")
             except Exception as e:
@@ -1,6 +1,9 @@
 # pylint: disable=too-few-public-methods
 """Module to manage the extraction of data."""
 
+import numpy as np
+import shapely
+
 class Extract:
     """Class to manage the extraction of data."""
     class Bike:
@@ -13,10 +16,16 @@ class Extract:
         @staticmethod
         def positions(bikes):
             """Extracts the last position e.g. "POINT(13.06782 55.577859)" and converts to tuple."""
-            def _point_to_tuple(point):
-                point = point.replace("POINT(", "").replace(")", "")
-                return tuple(map(float, point.split()))
-            return [_point_to_tuple(bike['attributes']['last_position']) for bike in bikes]
+            return [tuple(position) for position in Extract.Bike.positions_array(bikes).tolist()]
+
+        @staticmethod
+        def positions_array(bikes):
+            """
+            Extracts the last positions of all bikes in one pass.
+            Returns a (number of bikes, 2) float array of (longitude, latitude).
+            """
+            points = shapely.from_wkt([bike['attributes']['last_position'] for bike in bikes])
+            return shapely.get_coordinates(points).reshape(-1, 2)
 
     class Bikes:
         """Class to manage the extraction of bikes data."""
@@ -52,10 +61,28 @@ class Extract:
             Extracts the route e.g. "LINESTRING(13.06782 55.57786,13.06787 55.57785)"
             and converts to list of tuples.
             """
-            def _linestring_to_list(linestring):
-                linestring = linestring.replace("LINESTRING(", "").replace(")", "")
-                return [tuple(map(float, point.split())) for point in linestring.split(",")]
-            return [_linestring_to_list(trip['attributes']['path_taken']) for trip in trips]
+            coordinates, offsets = Extract.Trip.routes_array(trips)
+            return Extract.Trip.routes_to_list(coordinates, offsets)
+
+        @staticmethod
+        def routes_array(trips):
+            """
+            Extracts the routes of all trips in one pass.
+            Returns a (number of points, 2) float array with the points of every route
+            packed after each other, and an int array of 'number of trips + 1' offsets
+            so that route i is 'coordinates[offsets[i]:offsets[i + 1]]'.
+            """
+            linestrings = shapely.from_wkt([trip['attributes']['path_taken'] for trip in trips])
+            coordinates, index = shapely.get_coordinates(linestrings, return_index=True)
+            offsets = np.zeros(len(trips) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(index, minlength=len(trips)), out=offsets[1:])
+            return coordinates, offsets
+
+        @staticmethod
+        def routes_to_list(coordinates, offsets):
+            """Converts packed route coordinates and offsets back to a list of lists of tuples."""
+            points = [tuple(point) for point in coordinates.tolist()]
+            return [points[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
 
     class Lines:
         """Class to manage the extraction of lines."""
@@ -1,23 +1,112 @@
-# pylint: disable=too-few-public-methods
+# pylint: disable=too-few-public-methods, no-member
 """Module to manage file operations."""
 
+import asyncio
+import csv
+import itertools
 import json
 import os
+import re
+import stat
+import tempfile
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+def _new_file_mode():
+    """
+    Get the mode 'open' gives new files (0o666 without the umask).
+    'os.umask' can only be read by setting it, so this runs once, at import time,
+    and never races with files written from other threads.
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+NEW_FILE_MODE = _new_file_mode()
+
+INT_PATTERN = re.compile(r'^-?(0|[1-9]\d*)$')
+FLOAT_PATTERN = re.compile(r'^-?(0|[1-9]\d*)(\.\d+)?([eE][-+]?\d+)?$')
 
 class File:
     """Class to manage file operations."""
     class Save:
         """Class to manage file saving operations."""
         @staticmethod
-        def to_json(data, folder, filename):
-            """Save data to a JSON file."""
+        def to_json(data, folder, filename, compact=False):
+            """
+            Save data to a JSON file, atomically.
+            Compact output is written with orjson if it is installed.
+            Returns the path of the saved file.
+            """
             filename = File.Change.extension(filename, '.json')
             path = os.path.join(folder, filename)
-            with open(file=path, mode='w', encoding='utf-8') as file:
-                json.dump(obj=data, fp=file, indent=4, ensure_ascii=False)
+            if compact and orjson is not None:
+                content = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+            elif compact:
+                content = json.dumps(
+                    data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+            else:
+                content = json.dumps(data, indent=4, ensure_ascii=False).encode('utf-8')
+            File.Write.atomic(path, content)
+            return path
+
+        @staticmethod
+        def to_msgpack(data, folder, filename):
+            """
+            Save data to a binary MessagePack file, atomically.
+            Falls back to a compact JSON file if msgpack is not installed.
+            Returns the path of the saved file.
+            """
+            if msgpack is None:
+                print("msgpack is not installed, saving as compact JSON instead.")
+                return File.Save.to_json(data, folder, filename, compact=True)
+            filename = File.Change.extension(filename, '.msgpack')
+            path = os.path.join(folder, filename)
+            File.Write.atomic(path, msgpack.packb(data, use_bin_type=True))
+            return path
+
+        @staticmethod
+        async def to_json_async(data, folder, filename, compact=True):
+            """Save data to a JSON file in a worker thread, without blocking the event loop."""
+            return await asyncio.to_thread(File.Save.to_json, data, folder, filename, compact)
+
+        @staticmethod
+        async def to_msgpack_async(data, folder, filename):
+            """Save data to a MessagePack file in a worker thread, without blocking the loop."""
+            return await asyncio.to_thread(File.Save.to_msgpack, data, folder, filename)
 
     class Load:
         """Class to manage file loading operations."""
+        @staticmethod
+        def from_json(folder, filename):
+            """Load data from a JSON file, with orjson if it is installed."""
+            path = os.path.join(folder, File.Change.extension(filename, '.json'))
+            with open(file=path, mode='rb') as file:
+                content = file.read()
+            if orjson is not None:
+                return orjson.loads(content)
+            return json.loads(content)
+
+        @staticmethod
+        def from_msgpack(folder, filename):
+            """
+            Load data from a MessagePack file.
+            Falls back to the compact JSON file written if msgpack is not installed.
+            """
+            if msgpack is None:
+                return File.Load.from_json(folder, filename)
+            path = os.path.join(folder, File.Change.extension(filename, '.msgpack'))
+            with open(file=path, mode='rb') as file:
+                return msgpack.unpackb(file.read(), raw=False, strict_map_key=False)
+
         @staticmethod
         def from_csv(folder, filename):
             """Load data from a CSV file."""
@@ -25,18 +114,84 @@ class File:
             with open(file=path, mode='r', encoding='utf-8') as file:
                 return file.read()
 
+    class Stream:
+        """Class to manage streaming file reading operations."""
+        @staticmethod
+        def csv(folder, filename, types=None, batch_size=None):
+            """
+            Stream rows from a CSV file as dicts, without reading the whole file.
+
+            Args:
+                folder (str):
+                    The folder of the CSV file.
+                filename (str):
+                    The name of the CSV file.
+                types (dict, optional):
+                    Column name to callable used to convert that column's values.
+                    Other columns are converted with 'File.Convert.value'.
+                batch_size (int, optional):
+                    If set, yield lists of up to 'batch_size' rows instead of single rows.
+            """
+            path = os.path.join(folder, filename)
+            types = types or {}
+            with open(file=path, mode='r', encoding='utf-8', newline='') as file:
+                reader = csv.DictReader(file)
+                # Raise the field size limit for long fields (e.g. WKT paths) while reading.
+                previous = csv.field_size_limit(max(csv.field_size_limit(), 2**31 - 1))
+                try:
+                    converters = {
+                        column: types.get(column, File.Convert.value)
+                        for column in reader.fieldnames or []}
+                    rows = (
+                        {column: converters[column](value) for column, value in row.items()}
+                        for row in reader)
+                    if not batch_size:
+                        yield from rows
+                        return
+                    while batch := list(itertools.islice(rows, batch_size)):
+                        yield batch
+                finally:
+                    csv.field_size_limit(previous)
+
     class Convert:
         """Class to manage file conversion operations."""
         @staticmethod
         def csv_to_json(csv_data):
             """Convert CSV data to JSON data."""
-            lines = csv_data.splitlines()
-            headers = lines[0].split(',')
-            data = []
-            for line in lines[1:]:
-                values = line.split(',')
-                data.append(dict(zip(headers, values)))
-            return data
+            reader = csv.DictReader(csv_data.splitlines())
+            return [dict(row) for row in reader]
+
+        @staticmethod
+        def value(text):
+            """
+            Convert a CSV value to None (empty), bool ('true'/'false'), int or float,
+            and leave it as a string if it is none of those. Only plain decimal numbers
+            are converted, so codes like '007' or '1_000' and 'nan' stay strings.
+            """
+            if text is None or text == '':
+                return None
+            lowered = text.lower()
+            if lowered in ('true', 'false'):
+                return lowered == 'true'
+            if INT_PATTERN.match(text):
+                return int(text)
+            if FLOAT_PATTERN.match(text):
+                return float(text)
+            return text
+
+        @staticmethod
+        def rows_to_columns(rows):
+            """Convert an iterable of row dicts to a dict of column lists."""
+            columns = {}
+            for count, row in enumerate(rows):
+                for column, value in row.items():
+                    if column not in columns:
+                        columns[column] = [None] * count
+                    columns[column].append(value)
+                for column, values in columns.items():
+                    if len(values) == count:
+                        values.append(None)
+            return columns
 
     class Change:
         """Class to manage file name changes."""
@@ -66,6 +221,35 @@ class File:
 
     class Write:
         """Class to manage file writing operations."""
+        @staticmethod
+        def mode(filepath):
+            """
+            Get the permission bits for writing 'filepath': those of the existing file,
+            or those a new file gets from 'open' (0o666 without the umask).
+            """
+            if os.path.exists(filepath):
+                return stat.S_IMODE(os.stat(filepath).st_mode)
+            return NEW_FILE_MODE
+
+        @staticmethod
+        def atomic(filepath, content: bytes):
+            """
+            Write bytes to a file through a temporary file and a rename,
+            so that readers never see a partially written file.
+            """
+            folder = os.path.dirname(filepath) or '.'
+            os.makedirs(folder, exist_ok=True)
+            descriptor, temporary_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+            try:
+                with os.fdopen(descriptor, mode='wb') as file:
+                    file.write(content)
+                # mkstemp creates the file owner-only; keep the mode a plain write would give.
+                os.chmod(temporary_path, File.Write.mode(filepath))
+                os.replace(temporary_path, filepath)
+            finally:
+                if os.path.exists(temporary_path):
+                    os.remove(temporary_path)
+
         @staticmethod
         def lines(filepath, lines):
             """Write lines to a file."""
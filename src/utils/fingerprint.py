@@ -0,0 +1,120 @@
+# pylint: disable=too-few-public-methods
+"""Module to fingerprint the inputs of builds, so unchanged builds can be skipped."""
+
+import hashlib
+import os
+import threading
+from .command import Command
+from .directory import Directory
+from .file import File
+
+FINGERPRINTS_FILENAME = "build_fingerprints.json"
+INPUT_FILENAMES = (
+    ".env", "package.json", "package-lock.json", "requirements.txt",
+    "pyproject.toml", "poetry.lock", "Pipfile.lock", "uv.lock")
+
+class Fingerprint:
+    """
+    Class to decide which builds have to run, based on fingerprints of their inputs.
+
+    The inputs of a build are its directory as of git HEAD (the tree hash, so commits that
+    only touch other directories do not count), the uncommitted changes and untracked
+    (not ignored) files in it and the hashes of its Dockerfile, lockfiles and '.env' file.
+    The fingerprints of the last successful builds are stored in the logs folder.
+    """
+    def __init__(self, folder=None, filename=FINGERPRINTS_FILENAME):
+        self.folder = folder or Directory.logs()
+        self.filename = filename
+        self.fingerprints = self._load()
+        self.report = {}
+        self._lock = threading.Lock()
+
+    def _load(self):
+        """Load the stored fingerprints, or nothing if there are none (or they are unreadable)."""
+        if not os.path.exists(os.path.join(self.folder, self.filename)):
+            return {}
+        try:
+            return File.Load.from_json(self.folder, self.filename)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _hash(content):
+        """Get the sha256 hash of some bytes."""
+        return hashlib.sha256(content).hexdigest()
+
+    @staticmethod
+    def _hash_file(path):
+        """Get the sha256 hash of a file, or None if it does not exist."""
+        if not os.path.isfile(path):
+            return None
+        with open(path, 'rb') as file:
+            return Fingerprint._hash(file.read())
+
+    @staticmethod
+    def _git(directory):
+        """
+        Get the tree hash of a directory at git HEAD and a hash of its uncommitted changes,
+        including the names and contents of its untracked files.
+        """
+        results = Command.Async.run_group([
+            Command.Job("HEAD", ["git", "-C", directory, "rev-parse", "HEAD:./"]),
+            Command.Job("diff", ["git", "-C", directory, "diff", "HEAD", "--", "."]),
+            Command.Job(
+                "untracked",
+                ["git", "-C", directory, "ls-files", "--others", "--exclude-standard", "-z"]),
+        ], stream_output=False)
+        head, diff, untracked = (
+            result.stdout.strip() if result.ok else None for result in results.values())
+        changes = [diff] if diff else []
+        for path in sorted(filter(None, (untracked or "").split("\0"))):
+            changes.append(f"{path}\0{Fingerprint._hash_file(os.path.join(directory, path))}")
+        return head, Fingerprint._hash("\n".join(changes).encode('utf-8')) if changes else None
+
+    @staticmethod
+    def inputs(directory, filenames=INPUT_FILENAMES):
+        """Get the inputs of a build in 'directory' (git state and file hashes)."""
+        inputs = {"HEAD": None, "changes": None}
+        if os.path.isdir(directory):
+            inputs["HEAD"], inputs["changes"] = Fingerprint._git(directory)
+        for filename in filenames:
+            inputs[filename] = Fingerprint._hash_file(os.path.join(directory, filename))
+        return inputs
+
+    def changes(self, name, inputs):
+        """Get the names of the inputs that changed since the last successful build of 'name'."""
+        previous = self.fingerprints.get(name)
+        if previous is None:
+            return None
+        return [key for key in inputs if previous.get(key) != inputs[key]]
+
+    def check(self, name, inputs, force=False, output=None):
+        """
+        Check if 'name' has to be built, and record why (or why not) in the report.
+        If 'output' is given, 'name' is also built when that path does not exist.
+        """
+        changes = self.changes(name, inputs)
+        if force:
+            self.report[name] = "rebuilt (forced)"
+        elif output is not None and not os.path.exists(output):
+            self.report[name] = "rebuilt (output missing)"
+        elif changes is None:
+            self.report[name] = "rebuilt (no previous build)"
+        elif changes:
+            self.report[name] = f"rebuilt ({', '.join(changes)} changed)"
+        else:
+            self.report[name] = "skipped (unchanged)"
+            return False
+        return True
+
+    def update(self, name, inputs):
+        """Store the inputs of a successful build of 'name'."""
+        with self._lock:
+            self.fingerprints[name] = inputs
+            File.Save.to_json(self.fingerprints, self.folder, self.filename)
+
+    def print_report(self):
+        """Print what was rebuilt and why."""
+        print("Build report:")
+        for name, reason in self.report.items():
+            print(f"  {name}: {reason}")
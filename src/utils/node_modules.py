@@ -0,0 +1,91 @@
+# pylint: disable=too-few-public-methods
+"""Module to reuse installed node_modules across builds, keyed on the package-lock.json."""
+
+import hashlib
+import os
+import shutil
+from .command import Command
+from .directory import Directory
+
+LOCKFILE_FILENAME = "package-lock.json"
+MARKER_FILENAME = ".package-lock.sha256"
+
+class NodeModules:
+    """
+    Class to install node_modules once per package-lock.json.
+
+    Dependencies are installed with 'npm ci' into a cache folder named after the hash
+    of the lockfile, and the project's 'node_modules' is a symlink to it (or a copy,
+    where symlinks are not allowed). A new install only happens when the lockfile changes.
+    """
+    @staticmethod
+    def has_lockfile(directory):
+        """Check if the project in 'directory' has a package-lock.json."""
+        return os.path.isfile(os.path.join(directory, LOCKFILE_FILENAME))
+
+    @staticmethod
+    def key(directory):
+        """Get the sha256 hash of the project's package-lock.json."""
+        with open(os.path.join(directory, LOCKFILE_FILENAME), 'rb') as file:
+            return hashlib.sha256(file.read()).hexdigest()
+
+    @staticmethod
+    def _is_restored(target, cached, key):
+        """Check if 'target' already is (a link to or a copy of) the cached node_modules."""
+        if os.path.islink(target):
+            return os.path.realpath(target) == os.path.realpath(cached)
+        marker = os.path.join(target, MARKER_FILENAME)
+        if not os.path.isfile(marker):
+            return False
+        with open(marker, 'r', encoding='utf-8') as file:
+            return file.read().strip() == key
+
+    @staticmethod
+    def _remove(target):
+        """Remove a node_modules symlink or folder."""
+        if os.path.islink(target):
+            os.unlink(target)
+        elif os.path.isdir(target):
+            shutil.rmtree(target)
+
+    @staticmethod
+    def _link(cached, target, key):
+        """Link 'target' to the cached node_modules, or copy it if symlinks are not allowed."""
+        try:
+            os.symlink(os.path.abspath(cached), target, target_is_directory=True)
+        except OSError:
+            shutil.copytree(cached, target, symlinks=True)
+            with open(os.path.join(target, MARKER_FILENAME), 'w', encoding='utf-8') as file:
+                file.write(key)
+
+    @staticmethod
+    def restore(directory, npm_filename="npm", cache_folder=None):
+        """
+        Make sure the project's node_modules match its package-lock.json.
+
+        Returns True if 'npm ci' had to run (the lockfile is new), False if the
+        node_modules were restored from (or already linked to) the cache.
+        """
+        cache_folder = cache_folder or Directory.node_modules_cache()
+        key = NodeModules.key(directory)
+        cached = os.path.join(cache_folder, key, "node_modules")
+        target = os.path.join(directory, "node_modules")
+        if os.path.isdir(cached) and NodeModules._is_restored(target, cached, key):
+            print(f"node_modules are up to date with {LOCKFILE_FILENAME} ({key[:12]}).")
+            return False
+        installed = False
+        if not os.path.isdir(cached):
+            print(f"Running npm ci for new {LOCKFILE_FILENAME} ({key[:12]})...")
+            NodeModules._remove(target)
+            Command.run([npm_filename, "ci"], directory=directory, inherit_environment=True)
+            os.makedirs(os.path.dirname(cached), exist_ok=True)
+            if os.path.isdir(cached):
+                print("node_modules were cached by another build in the meantime.")
+            else:
+                shutil.move(target, cached)
+            installed = True
+        else:
+            print(f"Restoring cached node_modules for {LOCKFILE_FILENAME} ({key[:12]})...")
+        NodeModules._remove(target)
+        NodeModules._link(cached, target, key)
+        return installed
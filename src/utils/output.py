@@ -0,0 +1,98 @@
+# pylint: disable=too-few-public-methods, protected-access
+"""Module to capture the console output of individual threads."""
+
+import io
+import sys
+import threading
+from contextlib import contextmanager
+
+class Output:
+    """
+    Class to capture the console output of individual threads.
+
+    While at least one thread is capturing, 'sys.stdout' is replaced by a router that
+    sends each thread's writes to that thread's buffer (or to the real stdout for
+    threads that are not capturing). 'Command.run' checks 'Output.capturing' and pipes
+    subprocess output into the buffer as well, line by line.
+    """
+    _local = threading.local()
+    _lock = threading.Lock()
+    _router = None
+    _retired = None # 'print' may still hold a borrowed reference to the last router.
+    _users = 0
+
+    class _Router(io.TextIOBase):
+        """File-like object that routes writes to the current thread's buffer."""
+        def __init__(self, stdout):
+            super().__init__()
+            self.stdout = stdout
+
+        def write(self, text):
+            buffer = getattr(Output._local, 'buffer', None)
+            if buffer is not None:
+                return buffer.write(text)
+            return self.stdout.write(text)
+
+        def flush(self):
+            self.stdout.flush()
+
+    class _Buffer(io.StringIO):
+        """
+        Buffer that also prints every complete line to 'stdout' as soon as it is written,
+        prefixed with '[prefix] ', if a prefix is set.
+        """
+        def __init__(self, stdout, prefix=None):
+            super().__init__()
+            self.stdout = stdout
+            self.prefix = prefix
+            self.pending = ''
+
+        def write(self, text):
+            if self.prefix is not None:
+                *lines, self.pending = (self.pending + text).split('\n')
+                for line in lines:
+                    self._print(line)
+            return super().write(text)
+
+        def _print(self, line):
+            """Print a line, prefixed, to the real stdout."""
+            with Output._lock:
+                self.stdout.write(f"[{self.prefix}] {line}\n")
+                self.stdout.flush()
+
+        def close_lines(self):
+            """Print what is left of an unfinished last line."""
+            if self.prefix is not None and self.pending:
+                self._print(self.pending)
+                self.pending = ''
+
+    @staticmethod
+    def capturing():
+        """Check if the current thread is capturing its output."""
+        return getattr(Output._local, 'buffer', None) is not None
+
+    @staticmethod
+    @contextmanager
+    def capture(prefix=None):
+        """
+        Capture everything the current thread prints into a 'StringIO' buffer.
+        If 'prefix' is set, every line is also printed as it arrives, as '[prefix] line'.
+        """
+        with Output._lock:
+            if Output._users == 0:
+                Output._router = Output._Router(sys.stdout)
+                sys.stdout = Output._router
+            Output._users += 1
+            router = Output._router
+        buffer = Output._Buffer(router.stdout, prefix)
+        Output._local.buffer = buffer
+        try:
+            yield buffer
+        finally:
+            del Output._local.buffer
+            buffer.close_lines()
+            with Output._lock:
+                Output._users -= 1
+                if Output._users == 0:
+                    sys.stdout = Output._router.stdout
+                    Output._retired, Output._router = Output._router, None
@@ -0,0 +1,138 @@
+# pylint: disable=too-few-public-methods, broad-exception-caught
+"""Module to wait until services are ready, instead of sleeping for a fixed time."""
+
+import asyncio
+import os
+from dataclasses import dataclass
+from time import perf_counter
+import httpx
+from .command import Command
+
+TIMEOUT = float(os.getenv("READINESS_TIMEOUT", "300"))
+INITIAL_DELAY = float(os.getenv("READINESS_INITIAL_DELAY", "0.25"))
+MAX_DELAY = float(os.getenv("READINESS_MAX_DELAY", "5.0"))
+PROBE_TIMEOUT = 5.0
+
+@dataclass
+class Probe:
+    """A named check that returns True once its service is ready."""
+    name: str
+    check: callable
+    target: str = ''
+
+class Readiness:
+    """
+    Class to wait until services are ready.
+
+    Every service is polled by its own probe, all probes concurrently, with an
+    exponentially growing delay between attempts. Waiting ends as soon as every
+    service is ready, and the time to ready is recorded per service.
+    """
+    class Probes:
+        """Class to create probes."""
+        @staticmethod
+        def http(name, url):
+            """Ready once a GET of 'url' returns a status code below 400."""
+            async def _check():
+                async with httpx.AsyncClient(timeout=PROBE_TIMEOUT) as client:
+                    response = await client.get(url)
+                return response.status_code < 400
+            return Probe(name=name, check=_check, target=url)
+
+        @staticmethod
+        def tcp(name, host, port):
+            """Ready once a TCP connection to 'host':'port' is accepted."""
+            async def _check():
+                _, writer = await asyncio.wait_for(
+                    asyncio.open_connection(host, int(port)), PROBE_TIMEOUT)
+                writer.close()
+                await writer.wait_closed()
+                return True
+            return Probe(name=name, check=_check, target=f"{host}:{port}")
+
+        @staticmethod
+        def container(name, container):
+            """
+            Ready once the container is healthy, or running if it has no health check.
+            """
+            status_format = (
+                "{{if .State.Health}}{{.State.Health.Status}}{{else}}{{.State.Status}}{{end}}")
+            async def _check():
+                result = await Command.Async.run(
+                    ["docker", "inspect", "--format", status_format, container],
+                    timeout=PROBE_TIMEOUT, stream_output=False)
+                return result.ok and result.stdout.strip() in ("healthy", "running")
+            return Probe(name=name, check=_check, target=f"container {container}")
+
+        @staticmethod
+        def command(name, command):
+            """Ready once 'command' exits with exit code 0."""
+            async def _check():
+                result = await Command.Async.run(
+                    command, timeout=PROBE_TIMEOUT, stream_output=False)
+                return result.ok
+            return Probe(name=name, check=_check, target=' '.join(command))
+
+        @staticmethod
+        def stack(inside_network=False):
+            """
+            Get the probes of the api, the bike hivemind and the database.
+            From the host by default, or by service name from inside the Docker network.
+            """
+            if inside_network:
+                backend_url = os.getenv("BACKEND_URL", "http://api:8000/")
+                bike_url = os.getenv("BIKE_URL", "http://bike_hivemind:8001/")
+                return [
+                    Readiness.Probes.http("api", backend_url),
+                    Readiness.Probes.http("bike_hivemind", f"{bike_url.rstrip('/')}/docs"),
+                    Readiness.Probes.tcp("db", "db", 5432),
+                ]
+            backend_port = os.getenv("BACKEND_PORT", "8000")
+            bikes_port = os.getenv("BIKES_PORT", "8001")
+            return [
+                Readiness.Probes.http("api", f"http://localhost:{backend_port}/"),
+                Readiness.Probes.http("bike_hivemind", f"http://localhost:{bikes_port}/docs"),
+                Readiness.Probes.container(
+                    "db", os.getenv("DATABASE_CONTAINER", "database-db-1")),
+            ]
+
+    @staticmethod
+    async def _wait_for(probe, start_time, deadline, initial_delay, max_delay):
+        """Poll a probe until it is ready and return the seconds it took."""
+        delay = initial_delay
+        while True:
+            try:
+                if await probe.check():
+                    seconds = perf_counter() - start_time
+                    print(f"{probe.name} is ready after {seconds:.2f} seconds.")
+                    return seconds
+            except Exception:
+                pass
+            if perf_counter() + delay > deadline:
+                raise TimeoutError(f"{probe.name} ({probe.target}) is not ready.")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
+
+    @staticmethod
+    async def wait(probes, timeout=TIMEOUT, initial_delay=INITIAL_DELAY, max_delay=MAX_DELAY):
+        """
+        Wait until every probe is ready, or raise a TimeoutError after 'timeout' seconds.
+        Returns a dictionary of probe name to seconds until it was ready.
+        """
+        start_time = perf_counter()
+        deadline = start_time + timeout
+        print(f"Waiting for {', '.join(probe.name for probe in probes)} to be ready...")
+        results = await asyncio.gather(
+            *(Readiness._wait_for(probe, start_time, deadline, initial_delay, max_delay)
+              for probe in probes),
+            return_exceptions=True)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            raise TimeoutError(
+                f"Not ready after {timeout} seconds: {'; '.join(str(e) for e in errors)}")
+        return {probe.name: seconds for probe, seconds in zip(probes, results)}
+
+    @staticmethod
+    def wait_sync(probes, timeout=TIMEOUT, initial_delay=INITIAL_DELAY, max_delay=MAX_DELAY):
+        """Run 'Readiness.wait' from synchronous code."""
+        return asyncio.run(Readiness.wait(probes, timeout, initial_delay, max_delay))
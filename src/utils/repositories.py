@@ -1,10 +1,14 @@
-# pylint: disable=too-few-public-methods
+# pylint: disable=too-few-public-methods, broad-exception-caught
 """Module to manage the repositories of the project."""
 
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from .directory import Directory
 from ..utils.command import Command
+from .output import Output
 from .repository import Repository
+from .settings import Settings
 
 LOCAL_REPOSITORIES_DIR = Directory.local_repositories()
 
@@ -32,24 +36,32 @@ class _Local:
         def __init__(self, repositories): # pylint: disable=redefined-outer-name
             self.repositories = dict(repositories)
 
-        def _get_repository(self, name, branch=None, force=False, commit=None):
-            """Get a specific repository."""
+        def _get_repository(self, name, branch=None, force=False, commit=None): # pylint: disable=too-many-branches
+            """Get a specific repository and return its commit info."""
             repository_url = self.repositories.get(name)
             repository_path = os.path.join(LOCAL_REPOSITORIES_DIR, name)
+            git = Settings.Git
             if not repository_url:
                 raise ValueError(f"Unknown repository: {name}")
             if os.path.isdir(repository_path):
                 print(f"Repository {name} already exists locally.")
-                if branch:
+                shallow = Repository.is_shallow(repository_path)
+                if commit and shallow:
+                    print(f"Fetching only commit {commit} in shallow clone of {name}...")
+                    Repository.fetch_commit(
+                        repository_path, commit, git.clone_depth, git.clone_filter, force=force)
+                elif branch:
                     print(f"Switching to branch '{branch}' in {name}...")
-                    Repository.fetch(repository_path)
+                    if shallow:
+                        Repository.fetch(repository_path, branch, git.clone_depth)
+                    else:
+                        Repository.fetch(repository_path)
                     Repository.checkout(repository_path, branch)
                     if commit:
                         print(f"Resetting to commit {commit} in {name} on branch '{branch}'...")
                         Repository.pull(repository_path, force=force, branch=branch, commit=commit)
                     else:
                         Repository.pull(repository_path, force=force, branch=branch)
-                    Repository.Print.commit(repository_path)
                 else:
                     if commit:
                         print(f"Resetting to commit {commit} in {name} on the current branch...")
@@ -57,17 +69,20 @@ class _Local:
                     else:
                         print(f"Pulling latest changes in {name} on the current branch...")
                         Repository.pull(repository_path, force=force)
-                    Repository.Print.commit(repository_path)
             else:
                 print(f"Cloning {name}...")
-                Repository.clone(repository_url, repository_path, branch)
-                if branch:
+                fetch_only_commit = commit if git.clone_depth or git.clone_filter else None
+                Repository.clone(
+                    repository_url, repository_path, branch, commit=fetch_only_commit,
+                    depth=git.clone_depth, filter_spec=git.clone_filter,
+                    single_branch=git.single_branch, reference=git.reference_directory)
+                if branch and not fetch_only_commit:
                     print(f"Switching to branch '{branch}' in {name}...")
                     Repository.checkout(repository_path, branch)
-                if commit:
+                if commit and not fetch_only_commit:
                     print(f"Resetting to commit {commit} in {name}...")
                     Repository.pull(repository_path, commit=commit)
-                Repository.Print.commit(repository_path)
+            return Repository.Print.commit(repository_path)
 
         def backend(self, branch=None, commit=None):
             """Get the backend repository."""
@@ -81,19 +96,58 @@ class _Local:
             """Get the bike repository."""
             self._get_repository("bike", branch=branch, commit=commit)
 
-        def all(self, branch=None):
-            """Get all repositories."""
-            def _print_commits():
-                """Print the commits for all repositories."""
-                print("Printing commits for all repositories...")
-                for name in self.repositories.keys():
-                    repository_path = os.path.join(LOCAL_REPOSITORIES_DIR, name)
-                    Repository.Print.commit(repository_path)
-            self._get_repository("backend", branch)
-            self._get_repository("frontend", branch, force=True)
-            self._get_repository("bike", branch)
-            _print_commits()
-
+        def _sync(self, name, branch=None, commit=None, force=False):
+            """
+            Get a repository with all of its output captured, for running in a worker thread.
+            Returns the name, the captured output, the commit info and the error (if any).
+            """
+            commit_info = None
+            error = None
+            with Output.capture() as output:
+                try:
+                    commit_info = self._get_repository(
+                        name, branch=branch, force=force, commit=commit)
+                except (Exception, SystemExit) as e:
+                    error = e
+            return name, output.getvalue(), commit_info, error
+
+        def all(self, branch=None, refs=None, force=False):
+            """
+            Get all repositories at once, each in its own thread.
+
+            Args:
+                branch (str, optional):
+                    The branch to use for every repository.
+                refs (dict, optional):
+                    Repository name to a (branch, commit) tuple, overriding 'branch'.
+                force (bool, optional):
+                    Whether to discard local changes in every repository.
+
+            The output of each repository is printed as one block, prefixed with its name,
+            as soon as it is done, followed by a summary of commits and failures.
+            Exits if any repository failed, like a failing command would.
+            """
+            refs = refs or {}
+            results = {}
+            with ThreadPoolExecutor(max_workers=len(self.repositories)) as executor:
+                futures = [
+                    executor.submit(
+                        self._sync, name, *refs.get(name, (branch, None)), force=force)
+                    for name in self.repositories]
+                for future in as_completed(futures):
+                    name, output, commit_info, error = future.result()
+                    results[name] = (commit_info, error)
+                    for line in output.splitlines():
+                        print(f"[{name}] {line}")
+            print("Summary of all repositories:")
+            for name in self.repositories:
+                commit_info, error = results[name]
+                if error is None:
+                    print(f"  {name}: {commit_info}")
+                else:
+                    print(f"  {name}: FAILED ({error!r})")
+            if any(error is not None for _, error in results.values()):
+                sys.exit(1)
 
 class _Submodules:
     """Class to manage the submodules of the project."""
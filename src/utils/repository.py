@@ -1,6 +1,8 @@
-# pylint: disable=too-few-public-methods, broad-exception-caught
+# pylint: disable=too-few-public-methods, broad-exception-caught, too-many-arguments, too-many-positional-arguments
 """Module to manage the repository."""
 
+import os
+import re
 from ..utils.command import Command
 
 class Repository:
@@ -23,10 +25,21 @@ class Repository:
                 raise e
 
     @staticmethod
-    def fetch(repository_path):
-        """Fetch the latest changes from the remote repository."""
+    def fetch(repository_path, branch=None, depth=None):
+        """
+        Fetch the latest changes from the remote repository.
+
+        If 'branch' is set, the branch is fetched explicitly into its remote-tracking ref,
+        which also works for single-branch and shallow clones that do not track it yet.
+        """
+        if not branch:
+            Command.run(
+                ["git", "-C", repository_path, "fetch"],
+                raise_exception=True)
+            return
         Command.run(
-            ["git", "-C", repository_path, "fetch"],
+            ["git", "-C", repository_path, "fetch", *Repository._options(depth), "origin",
+             f"+refs/heads/{branch}:refs/remotes/origin/{branch}"],
             raise_exception=True)
 
     @staticmethod
@@ -83,9 +96,124 @@ class Repository:
                     raise_exception=True)
 
     @staticmethod
-    def clone(repository_url, repository_path, branch=None):
-        """Clone the repository from the specified URL."""
-        clone_command = ["git", "clone", repository_url, repository_path]
+    def _options(depth=None, filter_spec=None):
+        """Get the git options for a shallow and/or partial clone or fetch."""
+        options = []
+        if depth:
+            options.append(f"--depth={depth}")
+        if filter_spec:
+            options.append(f"--filter={filter_spec}")
+        return options
+
+    @staticmethod
+    def is_shallow(repository_path):
+        """Check if the repository is a shallow clone."""
+        return os.path.isfile(os.path.join(repository_path, ".git", "shallow"))
+
+    @staticmethod
+    def mirror(repository_url, reference_directory, filter_spec=None):
+        """
+        Create or update a bare mirror of the repository in the reference directory.
+
+        The mirror is shared by every workspace that clones with 'reference', so the
+        objects are only downloaded (and stored) once. Returns the path of the mirror.
+        """
+        mirror_path = os.path.join(
+            reference_directory, os.path.basename(repository_url.rstrip("/")))
+        if os.path.isdir(mirror_path):
+            Command.run(
+                ["git", "-C", mirror_path, "fetch", "--prune", "origin"],
+                raise_exception=True)
+        else:
+            os.makedirs(reference_directory, exist_ok=True)
+            Command.run(
+                ["git", "clone", "--mirror", *Repository._options(filter_spec=filter_spec),
+                 repository_url, mirror_path],
+                raise_exception=True)
+        return mirror_path
+
+    @staticmethod
+    def fetch_commit(repository_path, commit, depth=None, filter_spec=None, force=False):
+        """
+        Fetch only the specified commit from the remote and check it out (detached).
+
+        The remote can only serve a full commit hash by id. Anything else (e.g. a short
+        hash) is resolved locally after fetching the full history of every branch.
+        """
+        if Repository.is_full_hash(commit):
+            Command.run(
+                ["git", "-C", repository_path, "fetch",
+                 *Repository._options(depth, filter_spec), "origin", commit],
+                raise_exception=True)
+            target = "FETCH_HEAD"
+        else:
+            print(f"Commit {commit} is not a full hash, fetching the full history to resolve it...")
+            fetch_command = ["git", "-C", repository_path, "fetch"]
+            fetch_command.extend(Repository._options(filter_spec=filter_spec))
+            if Repository.is_shallow(repository_path):
+                fetch_command.append("--unshallow")
+            Command.run(
+                [*fetch_command, "origin", "+refs/heads/*:refs/remotes/origin/*"],
+                raise_exception=True)
+            target = Command.run(
+                ["git", "-C", repository_path, "rev-parse", "--verify", f"{commit}^{{commit}}"],
+                raise_exception=True, return_output=True)
+        checkout_command = ["git", "-C", repository_path, "checkout", "--detach"]
+        if force:
+            checkout_command.append("--force")
+        Command.run([*checkout_command, target], raise_exception=True)
+
+    @staticmethod
+    def is_full_hash(commit):
+        """Check if a commit is a full (SHA-1 or SHA-256) commit hash."""
+        return re.fullmatch(r"[0-9a-f]{40}|[0-9a-f]{64}", commit.lower()) is not None
+
+    @staticmethod
+    def clone(repository_url, repository_path, branch=None, commit=None, depth=None,
+              filter_spec=None, single_branch=False, reference=None):
+        """
+        Clone the repository from the specified URL.
+
+        Args:
+            repository_url (str):
+                The URL of the remote repository.
+            repository_path (str):
+                The path to clone the repository to.
+            branch (str, optional):
+                The branch to clone. Defaults to the default branch of the remote.
+            commit (str, optional):
+                A commit hash. If set, only this commit is fetched and checked out
+                (the full history if it is a short hash).
+            depth (int, optional):
+                The number of commits of history to fetch (shallow clone).
+            filter_spec (str, optional):
+                A partial clone filter, e.g. 'blob:none' to fetch file contents on demand.
+            single_branch (bool, optional):
+                Whether to only fetch the history of the cloned branch.
+            reference (str, optional):
+                A directory of shared mirrors to borrow objects from (see 'Repository.mirror').
+        """
+        mirror_path = None
+        if reference:
+            mirror_path = Repository.mirror(repository_url, reference, filter_spec)
+        if commit:
+            Command.run(["git", "init", "-q", repository_path], raise_exception=True)
+            Command.run(
+                ["git", "-C", repository_path, "remote", "add", "origin", repository_url],
+                raise_exception=True)
+            if mirror_path:
+                alternates = os.path.join(repository_path, ".git", "objects", "info", "alternates")
+                os.makedirs(os.path.dirname(alternates), exist_ok=True)
+                with open(alternates, "w", encoding="utf-8") as file:
+                    file.write(os.path.join(os.path.abspath(mirror_path), "objects") + "\n")
+            Repository.fetch_commit(repository_path, commit, depth, filter_spec)
+            return
+        clone_command = ["git", "clone", *Repository._options(depth, filter_spec)]
+        if single_branch:
+            clone_command.append("--single-branch")
+        if mirror_path:
+            clone_command.extend(["--reference-if-able", mirror_path])
+        clone_command.extend([repository_url, repository_path])
         if branch:
             clone_command.extend(["-b", branch])
         Command.run(clone_command, raise_exception=True)
@@ -94,12 +222,14 @@ class Repository:
         """Class to manage the printing of the repository."""
         @staticmethod
         def commit(repository_path):
-            """Print the commit info of the repository."""
+            """Print (and return) the commit info of the repository."""
             try:
                 commit_info = Command.run(
                     ["git", "-C", repository_path, "log", "-1", "--pretty=format:%h - %s"],
-                    raise_exception=True
+                    raise_exception=True, return_output=True
                 )
                 print(f"Commit after pull in {repository_path}: {commit_info}")
+                return commit_info
             except Exception as e:
                 print(f"Error retrieving commit info after pull: {e}")
+                return None
@@ -13,6 +13,8 @@ class Settings:
         logs = 'logs'
         repositories = os.getenv("REPOSITORIES_DIRECTORY", 'repositories')
         local_repositories = 'repositories'
+        node_modules_cache = os.getenv(
+            "NODE_MODULES_CACHE_DIRECTORY", os.path.join('data', 'node_modules'))
         class Name:
             """Class to manage the names of the directories of the project."""
             backend = 'backend'
@@ -22,6 +24,13 @@ class Settings:
             venv = '.venv'
             submodules = 'submodules'
 
+    class Git:
+        """Class to manage how the repositories are cloned."""
+        clone_depth = os.getenv("GIT_CLONE_DEPTH") or None # e.g. 1 for shallow clones
+        clone_filter = os.getenv("GIT_CLONE_FILTER") or None # e.g. blob:none for partial clones
+        single_branch = os.getenv("GIT_SINGLE_BRANCH", "false").lower() == "true"
+        reference_directory = os.getenv("GIT_REFERENCE_DIRECTORY") or None # Shared mirror cache
+
     class Filenames:
         """Class to manage the filenames of the project."""
         class Mocked:
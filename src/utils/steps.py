@@ -0,0 +1,133 @@
+# pylint: disable=broad-exception-caught
+"""Module to run setup steps concurrently, in the order given by their dependencies."""
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from time import perf_counter
+from .output import Output
+
+@dataclass
+class Step:
+    """A named function to run once the steps it comes 'after' are done."""
+    name: str
+    function: callable
+    after: tuple = ()
+    start: float = None
+    end: float = None
+    output: str = field(default='', repr=False)
+
+    @property
+    def seconds(self):
+        """The wall time of the step."""
+        return self.end - self.start
+
+class Steps:
+    """
+    Class to run steps as a dependency graph.
+
+    Every step runs in its own thread as soon as all of the steps it comes after are
+    done, so independent steps run concurrently. Every line a step prints is printed as
+    it arrives, prefixed with the name of the step. If a step fails, no new steps are
+    started and the error is raised once the running steps are done.
+    """
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.steps = {}
+
+    def add(self, name, function, after=()):
+        """Add a step that runs 'function' after the steps named in 'after'."""
+        if name in self.steps:
+            raise ValueError(f"Step '{name}' already exists.")
+        self.steps[name] = Step(name=name, function=function, after=tuple(after))
+
+    def _validate(self):
+        """Raise a ValueError for unknown dependencies or dependency cycles."""
+        for step in self.steps.values():
+            for name in step.after:
+                if name not in self.steps:
+                    raise ValueError(f"Step '{step.name}' comes after unknown step '{name}'.")
+        visited, visiting = set(), set()
+
+        def _visit(name):
+            if name in visiting:
+                raise ValueError(f"Steps have a dependency cycle through '{name}'.")
+            if name in visited:
+                return
+            visiting.add(name)
+            for dependency in self.steps[name].after:
+                _visit(dependency)
+            visiting.remove(name)
+            visited.add(name)
+
+        for name in self.steps:
+            _visit(name)
+
+    def _run_step(self, step, start_time):
+        """Run a step with its output captured and printed, prefixed, as it arrives."""
+        step.start = perf_counter() - start_time
+        try:
+            with Output.capture(prefix=step.name) as output:
+                try:
+                    step.function()
+                finally:
+                    step.output = output.getvalue()
+        finally:
+            step.end = perf_counter() - start_time
+
+    def run(self):
+        """Run all steps and return the total wall time in seconds."""
+        self._validate()
+        start_time = perf_counter()
+        done, running, error = set(), {}, None
+        workers = self.limit or max(1, len(self.steps))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while len(done) < len(self.steps) and (running or error is None):
+                if error is None:
+                    for step in self.steps.values():
+                        if (step.name not in done and step.name not in running.values()
+                                and all(name in done for name in step.after)):
+                            future = executor.submit(self._run_step, step, start_time)
+                            running[future] = step.name
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        future.result()
+                        done.add(name)
+                    except (Exception, SystemExit) as e:
+                        print(f"Step '{name}' failed: {e!r}")
+                        error = error or e
+        if error is not None:
+            raise error
+        return perf_counter() - start_time
+
+    def critical_path(self):
+        """
+        Get the chain of steps that determined the total wall time, as a list of names.
+        Each step is preceded by the dependency that finished last before it started.
+        """
+        finished = [step for step in self.steps.values() if step.end is not None]
+        if not finished:
+            return []
+        step = max(finished, key=lambda step: step.end)
+        path = [step.name]
+        while step.after:
+            step = max((self.steps[name] for name in step.after), key=lambda step: step.end)
+            path.append(step.name)
+        return path[::-1]
+
+    def print_report(self):
+        """Print the start time and duration of every step, and the critical path."""
+        print("Setup timing report:")
+        steps = sorted(
+            (step for step in self.steps.values() if step.end is not None),
+            key=lambda step: step.start)
+        for step in steps:
+            print(f"  {step.name}: started at {step.start:.2f}s, took {step.seconds:.2f}s")
+        path = self.critical_path()
+        if path:
+            total = self.steps[path[-1]].end
+            busy = sum(self.steps[name].seconds for name in path)
+            print(f"Critical path ({total:.2f}s, {busy:.2f}s of it in steps): {' -> '.join(path)}")
@@ -0,0 +1,54 @@
+"""Tests for the Concurrency class."""
+
+import asyncio
+import pytest
+from simulation.src._concurrency import Concurrency
+
+@pytest.mark.asyncio
+async def test_map_keeps_order():
+    """Test that results are returned in the order of the items, not of completion."""
+    async def _worker(item):
+        await asyncio.sleep(0.01 * (5 - item))
+        return item * 10
+    results = await Concurrency.map(_worker, range(5), limit=5)
+    assert results == [0, 10, 20, 30, 40]
+
+@pytest.mark.asyncio
+async def test_map_limit():
+    """Test that at most 'limit' calls are in flight at a time."""
+    in_flight = 0
+    max_in_flight = 0
+
+    async def _worker(item):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        in_flight -= 1
+        return item
+    results = await Concurrency.map(_worker, range(20), limit=3)
+    assert results == list(range(20))
+    assert max_in_flight == 3
+
+@pytest.mark.asyncio
+async def test_map_errors_and_timeouts():
+    """Test that errors and timeouts are returned in place of their results."""
+    async def _worker(item):
+        if item == 1:
+            raise ValueError("bad item")
+        if item == 2:
+            await asyncio.sleep(10)
+        return item
+    results = await Concurrency.map(_worker, [0, 1, 2, 3], limit=2, timeout=0.05)
+    assert results[0] == 0
+    assert isinstance(results[1], ValueError)
+    assert isinstance(results[2], asyncio.TimeoutError)
+    assert results[3] == 3
+
+@pytest.mark.asyncio
+async def test_map_no_items():
+    """Test that mapping no items returns no results."""
+    async def _worker(item):
+        return item
+    assert await Concurrency.map(_worker, [], limit=5) == []
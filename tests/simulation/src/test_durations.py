@@ -0,0 +1,56 @@
+"""Tests for the Durations class."""
+
+import math
+import numpy as np
+import pytest
+from simulation.src._durations import Durations, EARTH_RADIUS_KM
+from src.utils.extract import Extract
+
+DEGREE_KM = math.pi / 180 * EARTH_RADIUS_KM
+
+def test_pack():
+    """Test that routes are packed into one array of points with offsets."""
+    coordinates, offsets = Durations.pack([[(0, 0), (1, 1)], [], [(2, 2)]])
+    assert coordinates.tolist() == [[0, 0], [1, 1], [2, 2]]
+    assert offsets.tolist() == [0, 2, 2, 3]
+
+def test_lengths_haversine():
+    """Test the haversine lengths of routes along a meridian and the equator."""
+    lengths = Durations.lengths(*Durations.pack([
+        [(13.0, 55.0), (13.0, 56.0)],
+        [(0.0, 0.0), (1.0, 0.0), (2.0, 0.0)],
+    ]))
+    assert lengths == pytest.approx([DEGREE_KM, 2 * DEGREE_KM])
+
+def test_lengths_do_not_join_routes():
+    """Test that the gap between two packed routes is not part of either route."""
+    lengths = Durations.lengths(*Durations.pack([
+        [(0.0, 0.0), (0.0, 1.0)],
+        [(50.0, 50.0), (50.0, 51.0)],
+    ]))
+    assert lengths == pytest.approx([DEGREE_KM, DEGREE_KM])
+
+def test_seconds_speed_scaling():
+    """Test that durations follow the speed, and that the speed must be positive."""
+    coordinates, offsets = Durations.pack([[(13.0, 55.0), (13.0, 56.0)]])
+    seconds = Durations.seconds(coordinates, offsets, speed_kmh=20.0)
+    assert seconds == pytest.approx([DEGREE_KM / 20.0 * 3600])
+    assert Durations.seconds(coordinates, offsets, speed_kmh=40.0) == pytest.approx(seconds / 2)
+    with pytest.raises(ValueError):
+        Durations.seconds(coordinates, offsets, speed_kmh=0)
+
+def test_seconds_empty_and_one_point_routes():
+    """Test that no routes give no durations, and one-point or empty routes take no time."""
+    assert len(Durations.seconds(*Durations.pack([]))) == 0
+    seconds = Durations.seconds(*Durations.pack([[(13.0, 55.0)], [], [(13.0, 55.0)]]))
+    assert seconds.tolist() == [0.0, 0.0, 0.0]
+
+def test_seconds_of_extracted_routes():
+    """Test that the packed routes of trips give the same durations as packed lists."""
+    trips = [
+        {"attributes": {"path_taken": "LINESTRING(13.0 55.0, 13.0 56.0)"}},
+        {"attributes": {"path_taken": "LINESTRING(0 0, 1 0, 2 0)"}},
+    ]
+    coordinates, offsets = Extract.Trip.routes_array(trips)
+    expected = Durations.seconds(*Durations.pack(Extract.Trip.routes(trips)))
+    assert np.allclose(Durations.seconds(coordinates, offsets), expected)
@@ -0,0 +1,113 @@
+"""Tests for the Latencies, Endpoint and Metrics classes."""
+
+import json
+import os
+import httpx
+import pytest
+from simulation.src._metrics import Endpoint, Latencies, Metrics, LOGS_DIR, METRICS_FILE
+
+def test_percentile_nearest_rank():
+    """Test that percentiles are the nearest-rank samples, not interpolated."""
+    latencies = Latencies()
+    assert latencies.percentile(50) is None
+    for seconds in (0.4, 0.1, 0.3, 0.2, 0.5):
+        latencies.record(seconds)
+    assert latencies.percentile(0) == 0.1
+    assert latencies.percentile(20) == 0.1
+    assert latencies.percentile(21) == 0.2
+    assert latencies.percentile(50) == 0.3
+    assert latencies.percentile(99) == 0.5
+    assert latencies.percentile(100) == 0.5
+    assert latencies.summary() == "p50=300.0ms, p90=500.0ms, p99=500.0ms, max=500.0ms"
+
+def test_endpoint_record_and_throughput():
+    """Test the requests, errors and throughput of an endpoint."""
+    endpoint = Endpoint("start")
+    assert endpoint.throughput == 0.0
+    endpoint.record(10.0, 10.5)
+    endpoint.record(10.5, 12.0, error="HTTP 500")
+    assert endpoint.requests == 2
+    assert endpoint.errors == {"HTTP 500": 1}
+    assert endpoint.throughput == 1.0
+    assert endpoint.to_dict() == {
+        "endpoint": "start", "requests": 2, "errors": {"HTTP 500": 1}, "throughput": 1.0,
+        "latency_seconds": {"p50": 0.5, "p90": 1.5, "p99": 1.5, "max": 1.5}}
+
+def test_endpoint_merge():
+    """Test that merging endpoints adds their requests and spans both time ranges."""
+    endpoint, other, empty = Endpoint("move"), Endpoint("move"), Endpoint("move")
+    endpoint.record(0.0, 1.0, error="Timeout")
+    other.record(2.0, 4.0, error="Timeout")
+    other.record(3.0, 3.5, error="HTTP 404")
+    endpoint.merge(other)
+    endpoint.merge(empty)
+    assert endpoint.requests == 3
+    assert endpoint.errors == {"Timeout": 2, "HTTP 404": 1}
+    assert sorted(endpoint.latencies.samples) == [0.5, 1.0, 2.0]
+    assert (endpoint.first_start, endpoint.last_end) == (0.0, 4.0)
+    empty.merge(other)
+    assert (empty.first_start, empty.last_end) == (2.0, 4.0)
+
+def test_metrics_merge():
+    """Test that merging metrics merges endpoints and keeps the slowest phase."""
+    metrics, other = Metrics(), Metrics()
+    metrics.endpoint("start").record(0.0, 1.0)
+    metrics.phases = {"load": 2.0, "start": 0.0}
+    other.endpoint("start").record(0.5, 1.0)
+    other.endpoint("end").record(1.0, 2.0)
+    other.phases = {"load": 1.0, "start": 3.0, "end": 0.5}
+    metrics.merge(other)
+    assert metrics.endpoint("start").requests == 2
+    assert metrics.endpoint("end").requests == 1
+    assert metrics.phases == {"load": 2.0, "start": 3.0, "end": 0.5}
+
+def test_request_records_errors():
+    """Test that failed requests are recorded with their error class and re-raised."""
+    metrics = Metrics()
+    response = httpx.Response(503, request=httpx.Request("GET", "http://api"))
+    with pytest.raises(httpx.HTTPStatusError):
+        with metrics.request("start"):
+            response.raise_for_status()
+    with pytest.raises(ValueError):
+        with metrics.request("start"):
+            raise ValueError("bad")
+    with metrics.request("start"):
+        pass
+    assert metrics.endpoint("start").requests == 3
+    assert metrics.endpoint("start").errors == {"HTTP 503": 1, "ValueError": 1}
+
+def test_prometheus():
+    """Test the Prometheus text exposition of the metrics."""
+    metrics = Metrics()
+    metrics.endpoint("start").record(0.0, 0.25)
+    metrics.endpoint("start").record(0.0, 0.5, error="HTTP 500")
+    metrics.phases["load"] = 1.5
+    lines = metrics.prometheus().splitlines()
+    assert 'simulation_requests_total{endpoint="start"} 2' in lines
+    assert 'simulation_request_errors_total{endpoint="start",error="HTTP 500"} 1' in lines
+    assert 'simulation_request_duration_seconds{endpoint="start",quantile="0.5"} 0.25' in lines
+    assert 'simulation_request_duration_seconds{endpoint="start",quantile="0.99"} 0.5' in lines
+    assert 'simulation_request_duration_seconds_sum{endpoint="start"} 0.75' in lines
+    assert 'simulation_request_duration_seconds_count{endpoint="start"} 2' in lines
+    assert 'simulation_phase_seconds{phase="load"} 1.5' in lines
+    assert lines.count("# TYPE simulation_requests_total counter") == 1
+
+def test_export(tmp_path):
+    """Test that every run is appended to the metrics file, creating its folder."""
+    path = str(tmp_path / "logs" / "metrics.jsonl")
+    metrics = Metrics()
+    metrics.endpoint("start").record(0.0, 0.25)
+    metrics.phases["load"] = 1.5
+    metrics.export(path)
+    metrics.export(path)
+    with open(path, encoding="utf-8") as file:
+        records = [json.loads(line) for line in file]
+    assert [record["type"] for record in records] == ["endpoint", "phase"] * 2
+    assert records[0]["requests"] == 1
+
+def test_metrics_file_default():
+    """Test that the metrics file defaults to the logs folder, which is mounted."""
+    if os.getenv("SIM_METRICS_FILE"):
+        pytest.skip("SIM_METRICS_FILE is set")
+    assert os.path.dirname(METRICS_FILE) == LOGS_DIR
+    assert os.path.basename(LOGS_DIR) == "logs"
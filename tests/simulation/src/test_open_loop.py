@@ -0,0 +1,100 @@
+# pylint: disable=too-few-public-methods
+"""Tests for the OpenLoop class."""
+
+import random
+from types import SimpleNamespace
+import pytest
+from simulation.src._metrics import Metrics
+from simulation.src._open_loop import OpenLoop
+from simulation.src._plan import TripPlan
+
+class _Outgoing:
+    """An 'Outgoing' stand-in that records the calls and fails starts if asked to."""
+    def __init__(self, fail_start=False):
+        self.metrics = Metrics()
+        self.calls = []
+        self.fail_start = fail_start
+        self.trips = SimpleNamespace(start_trip=self._start_trip, end_trip=self._end_trip)
+        self.bikes = SimpleNamespace(move=self._move)
+
+    async def _start_trip(self, user_id, bike_id, token):
+        self.calls.append(("start", user_id, bike_id, token))
+        if self.fail_start:
+            raise ConnectionError("refused")
+        return {"data": {"id": f"trip-{user_id}-{len(self.calls)}"}}
+
+    async def _move(self, bike_id, position_or_linestring):
+        self.calls.append(("move", bike_id, position_or_linestring))
+
+    async def _end_trip(self, user_id, bike_id, trip_id, token):
+        self.calls.append(("end", user_id, bike_id, trip_id, token))
+
+def _plan(count, seconds=0.0):
+    """A trip plan of 'count' trips that each take 'seconds'."""
+    plan = TripPlan(
+        list(range(count)), [f"token{i}" for i in range(count)],
+        [f"bike{i}" for i in range(count)], [None] * count, [f"route{i}" for i in range(count)])
+    plan.durations[:] = seconds
+    return plan
+
+def test_invalid_arguments():
+    """Test that a non-positive rate and unknown arrival processes are rejected."""
+    with pytest.raises(ValueError):
+        OpenLoop(_Outgoing(), rate=0)
+    with pytest.raises(ValueError):
+        OpenLoop(_Outgoing(), arrivals="bursty")
+
+def test_seeded_poisson_schedule():
+    """Test that a seed fixes the exponentially distributed arrival intervals."""
+    first = OpenLoop(_Outgoing(), rate=5.0, seed=42)
+    second = OpenLoop(_Outgoing(), rate=5.0, seed=42)
+    expected = random.Random(42)
+    intervals = [first._interval() for _ in range(5)] # pylint: disable=protected-access
+    assert intervals == [second._interval() for _ in range(5)] # pylint: disable=protected-access
+    assert intervals == [expected.expovariate(5.0) for _ in range(5)]
+    constant = OpenLoop(_Outgoing(), rate=4.0, arrivals="constant")
+    assert constant._interval() == 0.25 # pylint: disable=protected-access
+
+@pytest.mark.asyncio
+async def test_run_poisson_arrivals_within_duration():
+    """Test that a seeded run has exactly the arrivals of its schedule within the duration."""
+    rate, duration, seed = 50.0, 0.3, 7
+    schedule = random.Random(seed)
+    expected, arrival = 0, schedule.expovariate(rate)
+    while arrival <= duration:
+        expected += 1
+        arrival += schedule.expovariate(rate)
+    outgoing = _Outgoing()
+    plan = _plan(expected)
+    open_loop = OpenLoop(
+        outgoing, rate=rate, duration=duration, seed=seed, margin=0.0)
+    counts = await open_loop.run(plan)
+    assert counts == {"arrived": expected, "dropped": 0, "completed": expected, "failed": 0}
+    assert plan.counts()["ended"] == expected
+    assert outgoing.metrics.endpoint("start (from intended start)").requests == expected
+
+@pytest.mark.asyncio
+async def test_run_constant_rate_and_dropped_arrivals():
+    """Test that arrivals keep the rate and are dropped while every trip is busy."""
+    outgoing = _Outgoing()
+    plan = _plan(1, seconds=0.5)
+    open_loop = OpenLoop(
+        outgoing, rate=10.0, duration=0.45, arrivals="constant", margin=0.0)
+    counts = await open_loop.run(plan)
+    assert counts == {"arrived": 4, "dropped": 3, "completed": 1, "failed": 0}
+    assert [call[0] for call in outgoing.calls] == ["start", "move", "end"]
+    assert outgoing.calls[2][3] == plan.trip_ids[0]
+    assert open_loop.elapsed >= 0.6
+
+@pytest.mark.asyncio
+async def test_run_failed_start_frees_the_trip():
+    """Test that a trip that failed to start is counted and reused for the next arrival."""
+    outgoing = _Outgoing(fail_start=True)
+    plan = _plan(1)
+    open_loop = OpenLoop(
+        outgoing, rate=10.0, duration=0.35, arrivals="constant", margin=0.0)
+    counts = await open_loop.run(plan)
+    assert counts == {"arrived": 3, "dropped": 0, "completed": 0, "failed": 3}
+    assert plan.counts()["failed"] == 1
+    assert outgoing.metrics.endpoint("start (from intended start)").errors == {
+        "ConnectionError": 3}
@@ -0,0 +1,36 @@
+"""Tests for the Outgoing class."""
+
+from unittest.mock import patch
+import httpx
+import pytest
+from simulation.src._outgoing import Outgoing
+
+def _handler(requests):
+    """A 'MockTransport' handler that records every request and answers like the upstreams."""
+    def _handle(request):
+        requests.append((request.url.host, request.method, request.url.path))
+        return httpx.Response(200, json={"data": {"id": len(requests)}})
+    return _handle
+
+@pytest.mark.asyncio
+async def test_one_pooled_client_per_upstream():
+    """Test that one client per upstream serves every request and is closed on exit."""
+    requests = []
+    with patch("httpx.AsyncClient", wraps=httpx.AsyncClient) as mock_client:
+        async with Outgoing(token="token",
+                            transport=httpx.MockTransport(_handler(requests))) as outgoing:
+            backend, hivemind = outgoing.backend_client, outgoing.hivemind_client
+            for user_id in range(3):
+                await outgoing.trips.start_trip(user_id=user_id, bike_id=user_id, token="t")
+                await outgoing.bikes.move(bike_id=user_id, position_or_linestring=[13.0, 55.0])
+                await outgoing.trips.end_trip(user_id=user_id, bike_id=user_id, trip_id=1,
+                                              token="t")
+            assert not backend.is_closed and not hivemind.is_closed
+            assert (outgoing.backend_client, outgoing.hivemind_client) == (backend, hivemind)
+        assert mock_client.call_count == 2
+    assert backend is not hivemind
+    assert outgoing.trips.client is backend and outgoing.bikes.client is hivemind
+    assert [host for host, _, _ in requests].count("api") == 6
+    assert [host for host, _, _ in requests].count("bike_hivemind") == 3
+    assert backend.is_closed and hivemind.is_closed
+    assert outgoing.metrics.endpoint("POST /move").requests == 3
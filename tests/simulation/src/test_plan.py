@@ -0,0 +1,55 @@
+"""Tests for the TripPlan class."""
+
+import numpy as np
+import pytest
+from simulation.src._plan import TripPlan, PLANNED, STARTED, MOVED, ENDED, FAILED
+
+def _plan(count=4, durations=None):
+    """A trip plan of 'count' trips."""
+    return TripPlan(
+        [f"user{i}" for i in range(count)], [f"token{i}" for i in range(count)],
+        [f"bike{i}" for i in range(count)], list(range(count)),
+        [[(i, i), (i + 1, i + 1)] for i in range(count)], durations)
+
+def test_columns():
+    """Test that a plan keeps its columns and starts with every trip planned."""
+    plan = _plan(3)
+    assert len(plan) == 3
+    assert plan.bike_ids == ["bike0", "bike1", "bike2"]
+    assert plan.durations.tolist() == [0.0, 0.0, 0.0]
+    assert plan.indexes(PLANNED) == [0, 1, 2]
+    assert _plan(2, durations=[1.5, 2.5]).durations.tolist() == [1.5, 2.5]
+
+def test_columns_must_have_the_same_length():
+    """Test that columns of different lengths are rejected."""
+    with pytest.raises(ValueError):
+        TripPlan([1, 2], ["token"], ["bike1", "bike2"], [1, 2], [[], []])
+    with pytest.raises(ValueError):
+        _plan(2, durations=[1.0])
+
+def test_mark_in_place():
+    """Test that marking trips updates their states in place, one trip or several."""
+    plan = _plan(4)
+    states = plan.states
+    plan.mark([0, 1, 2], STARTED)
+    plan.mark(3, FAILED)
+    plan.mark([0, 2], MOVED)
+    plan.mark(np.array([0]), ENDED)
+    plan.mark([], ENDED)
+    assert plan.states is states
+    assert plan.states.tolist() == [ENDED, STARTED, MOVED, FAILED]
+    assert plan.indexes(MOVED) == [2]
+    assert plan.indexes(PLANNED) == []
+    plan.durations[plan.indexes(STARTED)] = 12.0
+    assert plan.durations.tolist() == [0.0, 12.0, 0.0, 0.0]
+
+def test_counts():
+    """Test that counts have every state, in state order, as plain integers."""
+    plan = _plan(5)
+    plan.mark([0, 1], ENDED)
+    plan.mark(2, FAILED)
+    counts = plan.counts()
+    assert counts == {"planned": 2, "started": 0, "moved": 0, "ended": 2, "failed": 1}
+    assert list(counts) == ["planned", "started", "moved", "ended", "failed"]
+    assert all(isinstance(count, int) for count in counts.values())
+    assert _plan(0).counts() == dict.fromkeys(counts, 0)
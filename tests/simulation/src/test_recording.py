@@ -0,0 +1,152 @@
+# pylint: disable=too-few-public-methods
+"""Tests for the Recorder and Replay classes."""
+
+import json
+from types import SimpleNamespace
+import httpx
+import pytest
+from simulation.src._recording import Recorder, Replay
+
+class _Tokens:
+    """A 'TokenPool' stand-in."""
+    def token(self, user_id):
+        """Get the token of a user."""
+        return f"token{user_id}"
+
+class _Outgoing:
+    """An 'Outgoing' stand-in that generates new trip ids and fails starts for some users."""
+    def __init__(self, failing_users=()):
+        self.calls = []
+        self.failing_users = failing_users
+        self.trips = SimpleNamespace(start_trip=self._start_trip, end_trip=self._end_trip)
+        self.bikes = SimpleNamespace(move=self._move)
+
+    async def _start_trip(self, user_id, bike_id, token):
+        self.calls.append(("start_trip", user_id, bike_id, token))
+        if user_id in self.failing_users:
+            raise ConnectionError("refused")
+        return {"data": {"id": f"new-{user_id}"}}
+
+    async def _move(self, bike_id, position_or_linestring):
+        self.calls.append(("move", bike_id, position_or_linestring))
+
+    async def _end_trip(self, user_id, bike_id, trip_id, token):
+        self.calls.append(("end_trip", user_id, bike_id, trip_id, token))
+
+def _record(t, call, args, status=200, trip_id=None):
+    """A recorded request."""
+    return {"t": t, "call": call, "endpoint": call, "args": args,
+            "status": status, "latency": 0.01, "id": trip_id}
+
+def _write(path, records):
+    """Write records to a recording."""
+    with open(path, "w", encoding="utf-8") as file:
+        file.writelines(json.dumps(record) + "\n" for record in records)
+
+def test_record_and_load_round_trip(tmp_path):
+    """Test that recorded requests, failed or not, load back as they were sent."""
+    path = str(tmp_path / "recording.jsonl")
+    recorder = Recorder(path)
+    with recorder.request("start_trip", "POST /trips", {"user_id": 1, "bike_id": 2}) as record:
+        record["status"], record["id"] = 201, "trip-1"
+    response = httpx.Response(404, request=httpx.Request("POST", "http://api/move"))
+    with pytest.raises(httpx.HTTPStatusError):
+        with recorder.request("move", "POST /move", {"bike_id": 2, "position_or_linestring": [
+                [13.0, 55.0]]}):
+            response.raise_for_status()
+    with pytest.raises(ConnectionError):
+        with recorder.request("end_trip", "PATCH /trips", {
+                "user_id": 1, "bike_id": 2, "trip_id": "trip-1"}):
+            raise ConnectionError("refused")
+    recorder.close()
+    recorder.close()
+    records = Replay.load(path)
+    assert [record["call"] for record in records] == ["start_trip", "move", "end_trip"]
+    assert [record["status"] for record in records] == [201, 404, None]
+    assert records[0]["id"] == "trip-1"
+    assert records[1]["args"]["position_or_linestring"] == [[13.0, 55.0]]
+    assert all(record["latency"] >= 0 for record in records)
+    assert records[0]["t"] <= records[1]["t"] <= records[2]["t"]
+
+def test_recorder_without_path():
+    """Test that nothing is recorded without a path."""
+    recorder = Recorder(None)
+    with recorder.request("move", "POST /move", {}) as record:
+        record["status"] = 200
+    assert recorder.file is None
+    recorder.close()
+
+def test_load_filters_and_sorts(tmp_path):
+    """Test that ends of trips started before the recording are dropped and records sorted."""
+    path = str(tmp_path / "recording.jsonl")
+    _write(path, [
+        _record(3.0, "end_trip", {"user_id": 1, "bike_id": 1, "trip_id": "a"}),
+        _record(1.0, "start_trip", {"user_id": 1, "bike_id": 1}, trip_id="a"),
+        _record(2.0, "end_trip", {"user_id": 2, "bike_id": 2, "trip_id": "unknown"}),
+        _record(2.5, "move", {"bike_id": 1, "position_or_linestring": [0, 0]}),
+    ])
+    with open(path, "a", encoding="utf-8") as file:
+        file.write("\n")
+    records = Replay.load(path)
+    assert [(record["t"], record["call"]) for record in records] == [
+        (1.0, "start_trip"), (2.5, "move"), (3.0, "end_trip")]
+
+def test_replay_speed_must_be_positive(tmp_path):
+    """Test that a replay speed of zero is rejected."""
+    path = str(tmp_path / "recording.jsonl")
+    _write(path, [])
+    with pytest.raises(ValueError):
+        Replay(_Outgoing(), _Tokens(), path, speed=0)
+
+@pytest.mark.asyncio
+async def test_replay_remaps_trip_ids(tmp_path):
+    """Test that trips are ended with the ids generated now, and skipped if their start fails."""
+    path = str(tmp_path / "recording.jsonl")
+    _write(path, [
+        _record(100.0, "start_trip", {"user_id": 1, "bike_id": 10}, trip_id="old-1"),
+        _record(100.0, "start_trip", {"user_id": 2, "bike_id": 20}, trip_id="old-2"),
+        _record(100.01, "move", {"bike_id": 10, "position_or_linestring": [[0, 0], [1, 1]]}),
+        _record(100.02, "end_trip", {"user_id": 2, "bike_id": 20, "trip_id": "old-2"}),
+        _record(100.02, "end_trip", {"user_id": 1, "bike_id": 10, "trip_id": "old-1"},
+                status=500),
+    ])
+    outgoing = _Outgoing(failing_users=(2,))
+    replay = Replay(outgoing, _Tokens(), path, speed=10.0)
+    counts = await replay.run()
+    assert counts == {"sent": 4, "failed": 1, "skipped": 1, "outcome changed": 2}
+    assert ("end_trip", 1, 10, "new-1", "token1") in outgoing.calls
+    assert not any(call[0] == "end_trip" and call[1] == 2 for call in outgoing.calls)
+    assert ("move", 10, [[0, 0], [1, 1]]) in outgoing.calls
+    assert set(replay.latencies) == {"start_trip", "move", "end_trip"}
+
+def test_merge_shard_recordings(tmp_path):
+    """Test that the last runs of the shard recordings are merged into one run and deleted."""
+    path = str(tmp_path / "recording.jsonl")
+    _write(path, [_record(1.0, "move", {"bike_id": 1, "position_or_linestring": [0, 0]})])
+    shard_path = Recorder.shard_path(path, 1)
+    _write(shard_path, [
+        {"run": 1.5}, _record(1.5, "move", {"bike_id": 9, "position_or_linestring": [0, 0]}),
+        {"run": 2.0}, _record(2.0, "move", {"bike_id": 2, "position_or_linestring": [0, 0]})])
+    Recorder.merge(path, 2)
+    Recorder.merge(None, 2)
+    assert Recorder.shard_path(None, 0) is None
+    assert [record["t"] for record in Replay.load(path)] == [2.0]
+    assert [record["t"] for record in Replay.load(path, run=0)] == [1.0]
+    assert [file.name for file in tmp_path.iterdir()] == ["recording.jsonl"]
+
+def test_load_replays_one_run(tmp_path):
+    """Test that every recorder starts a new run and that only one run is loaded."""
+    path = str(tmp_path / "recording.jsonl")
+    for user_id in (1, 2):
+        recorder = Recorder(path)
+        with recorder.request("start_trip", "POST /trips", {"user_id": user_id, "bike_id": 1}):
+            pass
+        recorder.close()
+    Recorder(path).close()
+    assert Replay.load(path) == []
+    assert [record["args"]["user_id"] for record in Replay.load(path, run=-2)] == [2]
+    assert [record["args"]["user_id"] for record in Replay.load(path, run=0)] == [1]
+    with pytest.raises(ValueError):
+        Replay.load(path, run=3)
+    _write(path, [])
+    assert Replay.load(path) == []
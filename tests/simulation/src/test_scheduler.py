@@ -0,0 +1,70 @@
+"""Tests for the TripEndScheduler class."""
+
+import asyncio
+import pytest
+from simulation.src._scheduler import TripEndScheduler
+
+@pytest.mark.asyncio
+async def test_run_ends_trips_in_due_order():
+    """Test that trips are ended in the order of their due times, not of scheduling."""
+    ended = []
+
+    async def _end_trip(trip):
+        ended.append(trip)
+    scheduler = TripEndScheduler(_end_trip, concurrency=1)
+    for trip, delay in (("c", 0.06), ("a", 0.0), ("b", 0.03)):
+        scheduler.schedule(trip, delay=delay)
+    ended_trips, failed_trips = await scheduler.run()
+    assert ended == ["a", "b", "c"]
+    assert ended_trips == ["a", "b", "c"]
+    assert not failed_trips
+
+@pytest.mark.asyncio
+async def test_run_waits_until_due():
+    """Test that a trip is not ended before its due time."""
+    loop = asyncio.get_running_loop()
+    times = {}
+
+    async def _end_trip(trip):
+        times[trip] = loop.time()
+    scheduler = TripEndScheduler(_end_trip)
+    scheduler.schedule("trip", delay=0.05)
+    start_time = loop.time()
+    await scheduler.run()
+    assert times["trip"] - start_time >= 0.04
+
+@pytest.mark.asyncio
+async def test_run_retries_with_backoff():
+    """Test that a failed trip is retried with a growing delay until it succeeds."""
+    loop = asyncio.get_running_loop()
+    attempts = []
+
+    async def _end_trip(trip):
+        attempts.append(loop.time())
+        if len(attempts) < 3:
+            raise RuntimeError(f"{trip} not ready")
+    scheduler = TripEndScheduler(_end_trip, max_attempts=5, backoff=0.02, max_backoff=1.0)
+    scheduler.schedule("trip", delay=0.0)
+    ended_trips, failed_trips = await scheduler.run()
+    assert ended_trips == ["trip"]
+    assert not failed_trips
+    assert len(attempts) == 3
+    first_delay = attempts[1] - attempts[0]
+    second_delay = attempts[2] - attempts[1]
+    assert first_delay >= 0.015
+    assert second_delay >= 0.035
+
+@pytest.mark.asyncio
+async def test_run_gives_up_after_max_attempts():
+    """Test that a trip that keeps failing ends up in the failed trips."""
+    attempts = []
+
+    async def _end_trip(trip):
+        attempts.append(trip)
+        raise RuntimeError("down")
+    scheduler = TripEndScheduler(_end_trip, max_attempts=3, backoff=0.001)
+    scheduler.schedule("trip", delay=0.0)
+    ended_trips, failed_trips = await scheduler.run()
+    assert not ended_trips
+    assert failed_trips == ["trip"]
+    assert len(attempts) == 3
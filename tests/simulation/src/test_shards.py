@@ -0,0 +1,101 @@
+"""Tests for the Shards class."""
+
+import functools
+import os
+import numpy as np
+import pytest
+from simulation.src._metrics import Metrics
+from simulation.src._recording import Recorder, Replay
+from simulation.src._shards import Shards
+
+async def _worker(columns, shards, _index):
+    """A shard worker that records one request per trip, failing every third one."""
+    user_ids, durations = columns
+    metrics = Metrics()
+    for user_id, duration in zip(user_ids, durations):
+        error = "HTTP 500" if user_id % 3 == 0 else None
+        metrics.endpoint("start").record(float(user_id), float(user_id + duration), error)
+    metrics.phases["start"] = float(len(user_ids))
+    return metrics, {"trips": len(user_ids), "shards": shards}
+
+async def _failing_worker(columns, _shards, _index):
+    """A shard worker that fails for the shard with user 0."""
+    if 0 in columns[0]:
+        raise ValueError("shard failed")
+    return len(columns[0])
+
+async def _recording_worker(path, columns, _shards, index):
+    """A shard worker that records a few requests per trip to its own recording."""
+    recorder = Recorder(Recorder.shard_path(path, index))
+    for user_id in columns[0]:
+        for _ in range(50):
+            with recorder.request("move", "POST /move", {
+                    "bike_id": user_id, "position_or_linestring": [[13.0, 55.0]] * 20}):
+                pass
+    recorder.close()
+    return index
+
+def _columns(count):
+    """Columns of 'count' trips."""
+    return list(range(count)), np.linspace(0.1, 1.0, count)
+
+@pytest.mark.parametrize("count, shards", [(10, 3), (10, 4), (9, 3), (2, 5), (7, 1), (5, 0)])
+def test_split(count, shards):
+    """Test that shards are contiguous, do not overlap and add up to all trips."""
+    columns = _columns(count)
+    parts = Shards.split(columns, shards)
+    assert 0 < len(parts) <= min(count, max(1, shards))
+    assert all(len(part[0]) == len(part[1]) > 0 for part in parts)
+    assert [user_id for part in parts for user_id in part[0]] == columns[0]
+    assert np.array_equal(np.concatenate([part[1] for part in parts]), columns[1])
+    assert sum(len(part[0]) for part in parts) == count
+
+def test_split_one_shard_and_no_trips():
+    """Test that one shard holds every trip and that no trips give no shards."""
+    columns = _columns(4)
+    [part] = Shards.split(columns, 1)
+    assert part[0] == columns[0]
+    assert not Shards.split(([], []), 3)
+    assert not Shards.split((), 3)
+
+@pytest.mark.asyncio
+async def test_run_merged_metrics_match_one_process():
+    """Test that the merged metrics of the shards match those of one process."""
+    columns = _columns(10)
+    single, _ = await _worker(columns, 1, 0)
+    results = await Shards.run(_worker, columns, shards=3)
+    assert [counts for _, counts in results] == [
+        {"trips": 4, "shards": 3}, {"trips": 4, "shards": 3}, {"trips": 2, "shards": 3}]
+    merged = Metrics()
+    for metrics, _ in results:
+        merged.merge(metrics)
+    expected, actual = single.endpoint("start"), merged.endpoint("start")
+    assert actual.requests == expected.requests == 10
+    assert actual.errors == expected.errors == {"HTTP 500": 4}
+    assert sorted(actual.latencies.samples) == pytest.approx(sorted(expected.latencies.samples))
+    assert (actual.first_start, actual.last_end) == (expected.first_start, expected.last_end)
+    assert actual.throughput == pytest.approx(expected.throughput)
+    for percent in (50, 90, 99):
+        assert actual.latencies.percentile(percent) == expected.latencies.percentile(percent)
+    assert merged.phases == {"start": 4.0}
+
+@pytest.mark.asyncio
+async def test_run_returns_exceptions_in_shard_order():
+    """Test that a failing shard returns its exception without losing the other shards."""
+    results = await Shards.run(_failing_worker, _columns(6), shards=3)
+    assert isinstance(results[0], ValueError)
+    assert results[1:] == [2, 2]
+    assert await Shards.run(_failing_worker, ([], []), shards=3) == []
+
+@pytest.mark.asyncio
+async def test_run_shards_record_to_their_own_files(tmp_path):
+    """Test that every shard records to its own file and that these merge into one."""
+    path = str(tmp_path / "recording.jsonl")
+    results = await Shards.run(functools.partial(_recording_worker, path), _columns(4), 2)
+    assert results == [0, 1]
+    assert sorted(os.listdir(tmp_path)) == ["recording.jsonl.0", "recording.jsonl.1"]
+    Recorder.merge(path, len(results))
+    assert os.listdir(tmp_path) == ["recording.jsonl"]
+    records = Replay.load(path)
+    assert len(records) == 4 * 50
+    assert sorted({record["args"]["bike_id"] for record in records}) == [0, 1, 2, 3]
@@ -0,0 +1,71 @@
+"""Tests for the TokenPool class."""
+
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import patch
+import jwt
+import pytest
+from simulation.src._tokens import TokenPool, _encode
+
+SECRET = "a-secret-of-at-least-32-bytes-long"
+
+def _decode(token):
+    """Decode a token without checking its expiry (or its integer subject)."""
+    return jwt.decode(
+        token, SECRET, algorithms=["HS256"], options={"verify_exp": False, "verify_sub": False})
+
+@pytest.mark.asyncio
+async def test_get_reuses_tokens_by_user_id(capsys):
+    """Test that tokens are minted once per user and reused, in the order asked for."""
+    pool = TokenPool(SECRET, ttl=None)
+    first = await pool.get([1, 2, 1])
+    assert first[0] == first[2]
+    assert [_decode(token)["sub"] for token in first] == [1, 2, 1]
+    assert "exp" not in _decode(first[0])
+    assert "Minted 2 tokens, reused 1." in capsys.readouterr().out
+    with patch("simulation.src._tokens._encode", wraps=_encode) as mock_encode:
+        second = await pool.get([2, 1, 3])
+        assert pool.token(1) == first[0]
+    assert second[:2] == [first[1], first[0]]
+    mock_encode.assert_called_once_with([3], SECRET, None, mock_encode.call_args.args[3])
+
+@pytest.mark.asyncio
+async def test_tokens_expire_and_are_minted_again():
+    """Test that a token is minted again once it is within the margin of its expiry."""
+    pool = TokenPool(SECRET, ttl=100.0, margin=10.0)
+    with patch("simulation.src._tokens.time", return_value=1000.0):
+        token = pool.token(7)
+    assert _decode(token)["exp"] == 1100
+    assert pool.tokens[7] == (token, 1100.0)
+    with patch("simulation.src._tokens.time", return_value=1089.0):
+        assert pool.token(7) == token
+        assert await pool.get([7]) == [token]
+    with patch("simulation.src._tokens.time", return_value=1090.0):
+        [renewed] = await pool.get([7])
+    assert renewed != token
+    assert _decode(renewed)["exp"] == 1190
+    assert pool.tokens[7] == (renewed, 1190.0)
+
+@pytest.mark.asyncio
+async def test_get_mints_in_a_process_pool():
+    """Test that large sets of missing tokens are minted in a process pool, in order."""
+    executors = []
+
+    def _executor(**kwargs):
+        executors.append(kwargs)
+        return ProcessPoolExecutor(**kwargs)
+
+    user_ids = list(range(5))
+    pool = TokenPool(SECRET, ttl=None, process_threshold=5, processes=2)
+    with patch("simulation.src._tokens.ProcessPoolExecutor", side_effect=_executor):
+        tokens = await pool.get(user_ids)
+        assert await pool.get(user_ids) == tokens
+    assert executors == [{"max_workers": 2}]
+    assert tokens == _encode(user_ids, SECRET, None, 0)
+
+@pytest.mark.asyncio
+async def test_get_below_threshold_stays_in_process():
+    """Test that small sets of missing tokens, or one process, do not use a process pool."""
+    with patch("simulation.src._tokens.ProcessPoolExecutor") as mock_executor:
+        await TokenPool(SECRET, process_threshold=5, processes=4).get([1, 2, 3, 4])
+        await TokenPool(SECRET, process_threshold=5, processes=1).get(list(range(10)))
+    mock_executor.assert_not_called()
@@ -0,0 +1,48 @@
+"""Tests for the Cache class"""
+
+import os
+import time
+from tempfile import TemporaryDirectory
+from src.data.cache import Cache
+
+def test_key_ignores_parameter_order():
+    """Test that the cache key does not depend on the order of the parameters."""
+    key = Cache.key('url', {"limit": 1, "offset": 0})
+    assert key == Cache.key('url', {"offset": 0, "limit": 1})
+    assert Cache.key('url', {"limit": 1}) != Cache.key('url', {"limit": 2})
+
+def test_write_and_read():
+    """Test writing and reading a snapshot."""
+    with TemporaryDirectory() as tmpdir:
+        cache = Cache(folder=os.path.join(tmpdir, 'cache'), ttl=60)
+        cache.write('url', {"limit": 1}, [{'id': 1}], etag='"abc"', last_modified=None)
+        snapshot = cache.read('url', {"limit": 1})
+        assert snapshot['data'] == [{'id': 1}]
+        assert snapshot['etag'] == '"abc"'
+        assert cache.is_fresh(snapshot)
+        assert not os.listdir(os.path.join(tmpdir, 'cache'))[0].endswith('.tmp')
+
+def test_read_missing():
+    """Test reading a snapshot that does not exist."""
+    with TemporaryDirectory() as tmpdir:
+        cache = Cache(folder=tmpdir, ttl=60)
+        assert cache.read('url', {}) is None
+
+def test_stale_snapshot_and_touch():
+    """Test that a snapshot older than the ttl is stale until it is touched."""
+    with TemporaryDirectory() as tmpdir:
+        cache = Cache(folder=tmpdir, ttl=60)
+        cache.write('url', {}, [])
+        path = os.path.join(tmpdir, f"{Cache.key('url', {})}.json")
+        os.utime(path, (time.time() - 120, time.time() - 120))
+        assert not cache.is_fresh(cache.read('url', {}))
+        cache.touch('url', {})
+        assert cache.is_fresh(cache.read('url', {}))
+
+def test_conditional_headers():
+    """Test the revalidation headers of a snapshot."""
+    snapshot = {'etag': '"abc"', 'last_modified': 'Wed, 01 Jan 2025 00:00:00 GMT'}
+    assert Cache.conditional_headers(snapshot) == {
+        'If-None-Match': '"abc"',
+        'If-Modified-Since': 'Wed, 01 Jan 2025 00:00:00 GMT'}
+    assert not Cache.conditional_headers({'etag': None, 'last_modified': None})
@@ -3,7 +3,7 @@
 from unittest.mock import AsyncMock, Mock, patch
 import pytest
 import httpx
-from src.data.get import Get
+from src.data.get import Get, Bundle, PAGE_SIZE
 
 @pytest.mark.asyncio
 class TestGet:
@@ -27,7 +27,7 @@ class TestGet:
     @pytest.fixture
     def _mock_file(self):
         """Mock the File.Save class."""
-        with patch('src.data.get.File.Save.to_json', new_callable=AsyncMock) as mock_save:
+        with patch('src.data.get.File.Save.to_json_async', new_callable=AsyncMock) as mock_save:
             yield mock_save
 
     @pytest.fixture
@@ -56,7 +56,7 @@ class TestGet:
         get_instance = Get()
         get_method = getattr(get_instance, method)
         result = await get_method()
-        expected_params = {"limit": 9999}
+        expected_params = {"limit": PAGE_SIZE, "offset": 0}
         if method == 'users':
             expected_params["is_eligable"] = True
         mock_httpx.get.assert_awaited_once_with(
@@ -87,3 +87,97 @@ class TestGet:
         with pytest.raises(httpx.RequestError) as exc_info:
             await get_instance.users()
         assert "Failed to request" in str(exc_info.value)
+
+    @staticmethod
+    def _paged_response(items, page_size):
+        """Build a mocked 'client.get' side effect that serves 'items' page by page."""
+        def _get(_url, params, **_kwargs):
+            offset, limit = params["offset"], params["limit"]
+            response = Mock()
+            page = items[offset:offset + min(limit, page_size)]
+            response.json = Mock(return_value={'data': page})
+            response.raise_for_status = Mock()
+            return response
+        return _get
+
+    async def test_pages_follows_offsets(self, _mock_settings, mock_httpx):
+        """Test that pages are requested by offset until a short page is returned."""
+        items = [{'id': i} for i in range(5)]
+        mock_httpx.get.side_effect = self._paged_response(items, page_size=2)
+        get_instance = Get()
+        pages = [page async for page in get_instance.pages('bikes', page_size=2)]
+        assert pages == [items[0:2], items[2:4], items[4:5]]
+        offsets = [call.kwargs['params']['offset'] for call in mock_httpx.get.await_args_list]
+        assert offsets == [0, 2, 4]
+
+    @pytest.mark.parametrize("prefetch", [True, False])
+    async def test_pages_respects_limit(self, _mock_settings, mock_httpx, prefetch):
+        """Test that no more than 'limit' items are requested in total."""
+        items = [{'id': i} for i in range(10)]
+        mock_httpx.get.side_effect = self._paged_response(items, page_size=4)
+        get_instance = Get()
+        pages = [page async for page in get_instance.pages(
+            'trips', limit=6, page_size=4, prefetch=prefetch)]
+        assert pages == [items[0:4], items[4:6]]
+        limits = [call.kwargs['params']['limit'] for call in mock_httpx.get.await_args_list]
+        assert limits == [4, 2]
+
+    async def test_pages_stops_if_offset_is_ignored(self, _mock_settings, mock_httpx):
+        """Test that pagination stops if the backend keeps returning the same page."""
+        mock_httpx.get.return_value.json = Mock(return_value={'data': [{'id': 1}, {'id': 2}]})
+        get_instance = Get()
+        pages = [page async for page in get_instance.pages('users', page_size=2)]
+        assert pages == [[{'id': 1}, {'id': 2}]]
+
+    async def test_load(self, _mock_settings, _mock_file, mock_httpx):
+        """Test loading several collections concurrently into a bundle."""
+        get_instance = Get()
+        bundle = await get_instance.load(collections=('bikes', 'users', 'trips'))
+        assert isinstance(bundle, Bundle)
+        assert bundle.bikes == bundle.users == bundle.trips == [{'id': 1, 'name': 'test'}]
+        assert bundle.zones == []
+        assert set(bundle.timings) == {'bikes', 'users', 'trips'}
+        assert mock_httpx.get.await_count == 3
+        _mock_file.assert_not_awaited()
+
+    async def test_load_request_error(self, _mock_settings, _mock_file, mock_httpx):
+        """Test that a failing collection is named in the raised error."""
+        mock_httpx.get.side_effect = httpx.RequestError("Request failed")
+        get_instance = Get()
+        with pytest.raises(httpx.RequestError) as exc_info:
+            await get_instance.load(collections=('trips',))
+        assert "Failed to request trips" in str(exc_info.value)
+
+    @pytest.fixture
+    def _cached_get(self, _mock_settings, tmp_path):
+        """A Get instance with the snapshot cache enabled in a temporary folder."""
+        _mock_settings.Directory.data = str(tmp_path)
+        return Get(cache_ttl=60)
+
+    async def test_cache_fresh_snapshot_skips_request(self, _cached_get, mock_httpx):
+        """Test that a fresh snapshot is used without requesting the backend."""
+        mock_httpx.get.return_value.headers = {'ETag': '"v1"'}
+        first = await _cached_get.bikes(save_to_json=False)
+        second = await _cached_get.bikes(save_to_json=False)
+        assert first == second == [{'id': 1, 'name': 'test'}]
+        assert mock_httpx.get.await_count == 1
+
+    async def test_cache_stale_snapshot_is_revalidated(self, _cached_get, mock_httpx):
+        """Test that a stale snapshot is revalidated and reused on 304 Not Modified."""
+        mock_httpx.get.return_value.headers = {'ETag': '"v1"'}
+        await _cached_get.bikes(save_to_json=False)
+        _cached_get.cache.ttl = 0
+        mock_httpx.get.return_value.status_code = 304
+        mock_httpx.get.return_value.json = Mock(side_effect=AssertionError("Body was parsed"))
+        result = await _cached_get.bikes(save_to_json=False)
+        assert result == [{'id': 1, 'name': 'test'}]
+        headers = mock_httpx.get.await_args.kwargs['headers']
+        assert headers['If-None-Match'] == '"v1"'
+
+    async def test_cache_refresh_ignores_snapshot(self, _cached_get, mock_httpx):
+        """Test that refresh=True requests the backend even with a fresh snapshot."""
+        mock_httpx.get.return_value.headers = {}
+        await _cached_get.bikes(save_to_json=False)
+        await _cached_get.bikes(save_to_json=False, refresh=True)
+        assert mock_httpx.get.await_count == 2
+        assert 'If-None-Match' not in mock_httpx.get.await_args.kwargs['headers']
@@ -2,7 +2,7 @@
 """Tests for the Main class."""
 
 import os
-from unittest.mock import patch, MagicMock, call
+from unittest.mock import patch, MagicMock
 import pytest
 from src.main import Main
 
@@ -129,7 +129,7 @@ class TestRunMethod:
     @patch("src.main.Main._setup_master")
     @patch("src.main.Main._open_chrome_tabs")
     @patch("src.main.Docker.Compose.Environment.reset")
-    @patch("src.main.Docker.Compose.Environment.set")
+    @patch("src.main.Docker.Compose.Environment.set_many")
     def test_run_default(
         self, mock_env_set, mock_env_reset, mock_open_tabs, mock_setup_master):
         """Test running the system with default parameters."""
@@ -147,26 +147,38 @@ class TestRunMethod:
     @patch("src.main.Main._setup_master")
     @patch("src.main.Main._open_chrome_tabs")
     @patch("src.main.Docker.Compose.Environment.reset")
-    @patch("src.main.Docker.Compose.Environment.set")
+    @patch("src.main.Docker.Compose.Environment.set_many")
     def test_run_custom_speed_and_bike_limit(
         self, mock_env_set, mock_env_reset, mock_open_tabs, mock_setup_master, *_):
         """Test running the system with custom speed and bike limit."""
         main = Main(use_submodules=False)
         main._run(simulation_speed_factor=2.0, bike_limit=100)
-        mock_env_reset.assert_not_called()
-        expected_calls = [
-            call("bike_hivemind", "DEFAULT_SPEED", 40),
-            call("bike_hivemind", "BIKE_LIMIT", 100),
-            call("simulation", "BIKE_LIMIT", 100),]
-        assert mock_env_set.call_count == 3
-        mock_env_set.assert_has_calls(expected_calls, any_order=True)
+        mock_env_reset.assert_any_call(simulation=False)
+        mock_env_reset.assert_any_call(simulation=True)
+        mock_env_set.assert_called_once_with({
+            "bike_hivemind": {"DEFAULT_SPEED": 40, "BIKE_LIMIT": 100},
+            "simulation": {"DEFAULT_SPEED": 40, "BIKE_LIMIT": 100}})
         mock_setup_master.assert_called_once_with(True, False)
         mock_open_tabs.assert_not_called()
 
+    @patch("src.main.BIKE_SERVICE_NAME", "bike_hivemind")
+    @patch("src.main.SIMULATION_SERVICE_NAME", "simulation")
+    @patch("src.main.Main._setup_master")
+    @patch("src.main.Main._open_chrome_tabs")
+    @patch("src.main.Docker.Compose.Environment.reset")
+    @patch("src.main.Docker.Compose.Environment.set_many")
+    def test_run_custom_speed(self, mock_env_set, mock_env_reset, *_):
+        """Test that a custom speed resets and sets both services, with the default limit."""
+        main = Main(use_submodules=False)
+        main._run(simulation_speed_factor=0.5)
+        assert mock_env_reset.call_count == 2
+        mock_env_set.assert_called_once_with({
+            "bike_hivemind": {"DEFAULT_SPEED": 10}, "simulation": {"DEFAULT_SPEED": 10}})
+
     @patch("src.main.Main._setup_master")
     @patch("src.main.Main._open_chrome_tabs")
     @patch("src.main.Docker.Compose.Environment.reset")
-    @patch("src.main.Docker.Compose.Environment.set")
+    @patch("src.main.Docker.Compose.Environment.set_many")
     def test_run_open_chrome_tabs(
         self, mock_env_set, mock_env_reset, mock_open_tabs, mock_setup_master):
         """Test running the system with open_chrome_tabs=True."""
@@ -10,8 +10,8 @@ from src.setup._backend import Backend
 @patch("src.setup._backend.Docker.Compose.down")
 @patch("src.setup._backend.Docker.Compose.status")
 @patch("src.setup._backend.Docker.Compose.logs")
-@patch("src.setup._backend.Docker.Container.delete")
-def test_backend_docker(mock_delete, mock_logs, mock_status, mock_down, mock_up, mock_build):
+@patch("src.setup._backend.Docker.Container.delete_all")
+def test_backend_docker(mock_delete_all, mock_logs, mock_status, mock_down, mock_up, mock_build):
     """Test the backend Docker setup."""
     Backend.Docker._build()
     mock_build.assert_called_once()
@@ -24,7 +24,7 @@ def test_backend_docker(mock_delete, mock_logs, mock_status, mock_down, mock_up,
     Backend.Docker.logs()
     mock_logs.assert_called_once()
     Backend.Docker._clear()
-    assert mock_delete.call_count == 3
+    assert len(mock_delete_all.call_args.args[0]) == 3
 
 @patch("src.setup._backend.Docker.Compose.down", side_effect=Exception("Docker down failed"))
 def test_backend_docker_down_failure(mock_down):
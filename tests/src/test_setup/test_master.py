@@ -1,15 +1,17 @@
 # pylint: disable = too-many-arguments, too-many-positional-arguments
 """Module to test the setup of the master repository."""
 
+import time
 from unittest.mock import patch
 from src.setup._master import Master
 from src.utils.directory import Directory
 
-@patch("src.setup._master.Docker.Container.delete")
-def test_master_docker_clear(mock_delete):
+@patch("src.setup._master.Docker.Container.delete_all")
+def test_master_docker_clear(mock_delete_all):
     """Test the master Docker clear method."""
     Master.Docker.clear(simulation=True)
-    assert mock_delete.call_count == 5
+    mock_delete_all.assert_called_once()
+    assert len(mock_delete_all.call_args.args[0]) == 5
 
 @patch("src.setup._master.Docker.Compose.up")
 @patch("src.setup._master.Docker.Compose.Combined.up")
@@ -48,58 +50,163 @@ def test_master_docker_logs(mock_combined_logs, mock_logs):
 @patch("src.setup._master.Master.Docker.build")
 @patch("src.setup._master.Master.Docker.up")
 @patch("src.setup._master.Master.Docker.status")
-@patch("src.setup._master.Master.Docker.logs")
-def test_master_docker_restart(mock_logs, mock_status, mock_up, mock_build, mock_clear, mock_down):
+@patch("src.setup._master.Master.Docker.wait")
+def test_master_docker_restart(mock_wait, mock_status, mock_up, mock_build, mock_clear, mock_down):
     """Test the master Docker restart method."""
     Master.Docker.restart(simulation=False, rebuild=True)
     mock_down.assert_called_once()
     mock_clear.assert_called_once()
     mock_build.assert_called_once()
     mock_up.assert_called_once()
+    mock_wait.assert_called_once()
     mock_status.assert_called_once()
-    mock_logs.assert_called_once()
 
+@patch("src.setup._master.Readiness.wait_sync", return_value={"api": 1.5, "db": 0.5})
+def test_master_docker_wait(mock_wait_sync, capsys):
+    """Test waiting for the services and reporting their time to ready."""
+    assert Master.Docker.wait() == {"api": 1.5, "db": 0.5}
+    mock_wait_sync.assert_called_once()
+    captured = capsys.readouterr().out
+    assert "  api: 1.50s" in captured
+
+@patch("src.setup._master.Master.Docker.wait")
+@patch("src.setup._master.Master.Docker.status")
+@patch("src.setup._master.Master.Docker.up")
+@patch("src.setup._master.Master.Docker.build_services")
+@patch("src.setup._master.Master.Docker.build_frontend")
+@patch("src.setup._master.Master.Docker.clear")
+@patch("src.setup._master.Master.Docker.down")
 @patch("src.setup._master.Docker.Desktop.start")
 @patch("src.setup._master.Environment.Files.generate")
-@patch("src.setup._master.Master.Docker.restart")
-def test_master_setup(mock_restart, mock_generate, mock_docker_start):
+def test_master_setup(mock_generate, mock_docker_start, mock_down, mock_clear,
+                      mock_build_frontend, mock_build_services, mock_up, mock_status, mock_wait):
     """Test the master setup method."""
-    Master.setup(simulation=True, rebuild=False, start_docker_desktop=True)
+    events = []
+    mock_build_services.side_effect = lambda *args: events.append(("build", args[1][0]))
+    mock_up.side_effect = lambda *args: events.append(("up", None))
+    Master.setup(simulation=True, rebuild=True, start_docker_desktop=True)
     mock_docker_start.assert_called_once()
     mock_generate.assert_called_once()
-    mock_restart.assert_called_once_with(True, False)
+    mock_down.assert_called_once_with(True)
+    mock_clear.assert_called_once_with(True)
+    mock_build_frontend.assert_called_once()
+    assert mock_build_services.call_count == 4
+    assert events[-1] == ("up", None), "Containers should start after every image is built"
+    assert {service for _, service in events[:-1]} == {
+        "api", "bike_hivemind", "webclient-prod", "simulation"}
+    mock_wait.assert_called_once()
+    mock_status.assert_called_once_with(True)
+
+@patch("src.setup._master.Master.Docker.wait")
+@patch("src.setup._master.Master.Docker.status")
+@patch("src.setup._master.Master.Docker.up")
+@patch("src.setup._master.Master.Docker.build_services")
+@patch("src.setup._master.Master.Docker.build_frontend")
+@patch("src.setup._master.Master.Docker.clear")
+@patch("src.setup._master.Master.Docker.down")
+@patch("src.setup._master.Environment.Files.generate")
+def test_master_setup_frontend_image_after_npm_build(
+        _mock_generate, _mock_down, _mock_clear, mock_build_frontend, mock_build_services, *_):
+    """Test that the frontend image waits for the npm build and the other images do not."""
+    events = []
+
+    def _build_frontend(*_args):
+        time.sleep(0.3)
+        events.append("npm build")
+    mock_build_frontend.side_effect = _build_frontend
+    mock_build_services.side_effect = lambda *args: events.append(f"image {args[1][0]}")
+    Master.setup(simulation=False, rebuild=True)
+    assert Master.Docker.frontend_services() == ["webclient-prod"]
+    assert events.index("npm build") < events.index("image webclient-prod")
+    assert events.index("image api") < events.index("npm build")
+    assert events.index("image bike_hivemind") < events.index("npm build")
+
+@patch("src.setup._master.Master.Docker.wait")
+@patch("src.setup._master.Master.Docker.status")
+@patch("src.setup._master.Master.Docker.up")
+@patch("src.setup._master.Master.Docker.build_services")
+@patch("src.setup._master.Master.Docker.build_frontend")
+@patch("src.setup._master.Master.Docker.clear")
+@patch("src.setup._master.Master.Docker.down")
+@patch("src.setup._master.Environment.Files.generate")
+def test_master_setup_no_rebuild(_mock_generate, _mock_down, _mock_clear,
+                                 mock_build_frontend, mock_build_services, mock_up, *_):
+    """Test that the master setup builds no images without rebuild."""
+    Master.setup(simulation=False, rebuild=False)
+    mock_build_frontend.assert_called_once()
+    mock_build_services.assert_not_called()
+    mock_up.assert_called_once()
+    assert mock_up.call_args.args[0] is False
 
+@patch("src.utils.fingerprint.Directory.logs")
 @patch("src.setup._master.Docker.Compose.build")
 @patch("src.setup._master.Docker.Compose.Combined.build")
-def test_master_docker_build(mock_combined_build, mock_build):
+def test_master_docker_build(mock_combined_build, mock_build, mock_logs, tmp_path):
     """Test the master Docker build method."""
+    mock_logs.return_value = str(tmp_path)
     Master.Docker.build(simulation=True, rebuild=True)
     mock_combined_build.assert_called_once()
+    assert set(mock_combined_build.call_args.kwargs["services"]) == {
+        "api", "bike_hivemind", "webclient-prod", "simulation"}
     mock_build.assert_called_once_with(Directory.Repo.frontend(), npm=True, reinstall=True)
 
+@patch("src.utils.fingerprint.Directory.logs")
 @patch("src.setup._master.Docker.Compose.build")
-def test_master_docker_build_no_rebuild(mock_build):
+@patch("src.setup._master.Docker.Compose.Combined.build")
+def test_master_docker_build_unchanged(mock_combined_build, mock_build, mock_logs, tmp_path):
+    """Test that builds with unchanged inputs are skipped the second time."""
+    mock_logs.return_value = str(tmp_path)
+    frontend_dir = tmp_path / "frontend"
+    (frontend_dir / "build").mkdir(parents=True)
+    with patch("src.setup._master.FRONTEND_DIR", str(frontend_dir)):
+        Master.Docker.build(simulation=False, rebuild=True)
+        Master.Docker.build(simulation=False, rebuild=True)
+    assert mock_build.call_count == 2
+    mock_build.assert_any_call(str(frontend_dir), npm=True, reinstall=True)
+    mock_build.assert_any_call(
+        Directory.root(), services=["api", "bike_hivemind", "webclient-prod"])
+    mock_combined_build.assert_not_called()
+
+@patch("src.utils.fingerprint.Directory.logs")
+@patch("src.setup._master.Docker.Compose.build")
+def test_master_docker_build_no_rebuild(mock_build, mock_logs, tmp_path):
     """Test the master Docker build method with no rebuild."""
+    mock_logs.return_value = str(tmp_path)
     Master.Docker.build(simulation=False, rebuild=False)
     mock_build.assert_called_once_with(Directory.Repo.frontend(), npm=True, reinstall=False)
 
+@patch("src.utils.fingerprint.Directory.logs")
 @patch("src.setup._master.Docker.Compose.build")
 @patch("src.setup._master.Docker.Compose.Combined.build")
-def test_master_docker_build_no_simulation(mock_combined_build, mock_build):
+def test_master_docker_build_no_simulation(mock_combined_build, mock_build, mock_logs, tmp_path):
     """Test the master Docker build method with no simulation."""
+    mock_logs.return_value = str(tmp_path)
     Master.Docker.build(simulation=False, rebuild=True)
     mock_build.assert_any_call(Directory.Repo.frontend(), npm=True, reinstall=True)
-    mock_build.assert_any_call(Directory.root())
+    mock_build.assert_any_call(
+        Directory.root(), services=["api", "bike_hivemind", "webclient-prod"])
     mock_combined_build.assert_not_called()
 
+@patch("src.utils.fingerprint.Directory.logs")
 @patch("src.setup._master.Docker.Compose.up")
 @patch("src.setup._master.Docker.Compose.Combined.up")
-def test_master_docker_up_not_simulation(mock_combined_up, mock_up):
+def test_master_docker_up_not_simulation(mock_combined_up, mock_up, mock_logs, tmp_path):
     """Test the master Docker up method with no simulation."""
+    mock_logs.return_value = str(tmp_path)
     Master.Docker.up(simulation=False)
-    mock_up.assert_called_once()
+    mock_up.assert_called_once_with(Directory.root(), build=True)
     mock_combined_up.assert_not_called()
 
+@patch("src.utils.fingerprint.Directory.logs")
+@patch("src.setup._master.Docker.Compose.build")
+@patch("src.setup._master.Docker.Compose.up")
+def test_master_docker_up_unchanged(mock_up, _mock_build, mock_logs, tmp_path):
+    """Test that images are not rebuilt on start when their inputs are unchanged."""
+    mock_logs.return_value = str(tmp_path)
+    Master.Docker.build(simulation=False, rebuild=True)
+    Master.Docker.up(simulation=False)
+    mock_up.assert_called_once_with(Directory.root(), build=False)
+
 @patch("src.setup._master.Docker.Compose.Combined.down")
 @patch("src.setup._master.Docker.Compose.down")
 def test_master_docker_down_simulation(mock_down, mock_combined_down):
@@ -1,7 +1,9 @@
 """Test cases for the Command class."""
 
+import asyncio
 import subprocess
 import sys
+import time
 from unittest.mock import patch
 import pytest
 from src.utils.command import Command
@@ -112,3 +114,101 @@ def test_run_with_return_output():
             stderr=subprocess.PIPE,
             env=None
         )
+
+def test_run_return_output_returns_stdout():
+    """Test that return_output returns the stripped output of the command."""
+    with patch("subprocess.run") as mock_run:
+        mock_run.return_value = subprocess.CompletedProcess(
+            args=[], returncode=0, stdout=b"a1b2c3 - Commit\n", stderr=b"")
+        output = Command.run(["git", "log", "-1"], return_output=True)
+        assert output == "a1b2c3 - Commit"
+
+def _python(code):
+    """A command that runs a snippet of Python."""
+    return [sys.executable, "-c", code]
+
+@pytest.mark.asyncio
+async def test_async_run_result(capsys):
+    """Test that an asynchronous command returns its exit code, output and wall time."""
+    result = await Command.Async.run(
+        _python("import sys; print('out'); print('err', file=sys.stderr); sys.exit(3)"),
+        prefix="job")
+    assert result.returncode == 3
+    assert result.stdout == "out\n"
+    assert result.stderr == "err\n"
+    assert result.seconds > 0
+    assert not result.ok
+    with pytest.raises(subprocess.CalledProcessError):
+        result.check()
+    captured = capsys.readouterr()
+    assert "[job] out" in captured.out
+    assert "[job] err" in captured.err
+
+@pytest.mark.asyncio
+async def test_async_run_timeout():
+    """Test that a command is killed after its timeout."""
+    result = await Command.Async.run(
+        _python("import time; print('started', flush=True); time.sleep(30)"),
+        timeout=0.5, stream_output=False)
+    assert result.timed_out
+    assert not result.ok
+    assert result.stdout == "started\n"
+    assert result.seconds < 10
+
+@pytest.mark.asyncio
+async def test_async_run_cancelled():
+    """Test that cancelling a command kills it."""
+    task = asyncio.create_task(Command.Async.run(
+        _python("import time; time.sleep(30)"), stream_output=False))
+    await asyncio.sleep(0.5)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await asyncio.wait_for(task, 10)
+
+def test_async_group_limit(capsys):
+    """Test that a group runs its jobs concurrently, at most 'limit' at a time."""
+    running = []
+    peak = []
+
+    async def _run(command, **kwargs):
+        running.append(command)
+        peak.append(len(running))
+        await asyncio.sleep(0.05)
+        running.remove(command)
+        return Command.Result(command=command, returncode=0, stdout=kwargs["prefix"])
+
+    jobs = [Command.Job(name=f"job{number}", command=[str(number)]) for number in range(4)]
+    with patch("src.utils.command.Command.Async.run", side_effect=_run):
+        results = Command.Async.run_group(jobs, limit=2)
+    assert list(results) == ["job0", "job1", "job2", "job3"]
+    assert all(result.ok for result in results.values())
+    assert max(peak) == 2
+    results = Command.Async.run_group(
+        [Command.Job(name="job3", command=_python("print(3)"))])
+    assert "[job3] 3" in capsys.readouterr().out
+
+def test_async_group_spawn_failure():
+    """Test that a job that cannot be started fails alone, without losing the others."""
+    jobs = [
+        Command.Job(name="missing", command=["this-command-does-not-exist"]),
+        Command.Job(name="works", command=_python("print('ok')")),
+    ]
+    results = Command.Async.run_group(jobs, stream_output=False)
+    assert list(results) == ["missing", "works"]
+    assert not results["missing"].ok
+    assert results["missing"].returncode is None
+    assert results["missing"].stderr
+    assert results["works"].ok
+    assert results["works"].stdout == "ok\n"
+
+def test_async_group_fail_fast():
+    """Test that the remaining jobs are cancelled when one fails with 'fail_fast'."""
+    jobs = [
+        Command.Job(name="fails", command=_python("import sys; sys.exit(1)")),
+        Command.Job(name="slow", command=_python("import time; time.sleep(30)")),
+    ]
+    start_time = time.perf_counter()
+    results = Command.Async.run_group(jobs, stream_output=False, fail_fast=True)
+    assert time.perf_counter() - start_time < 10
+    assert list(results) == ["fails"]
+    assert results["fails"].returncode == 1
@@ -1,7 +1,11 @@
 """Tests for the Docker class."""
 
+import os
 from unittest.mock import patch, call, mock_open
 import pytest
+import yaml
+from src.utils import docker as docker_module
+from src.utils.command import Command
 from src.utils.docker import Docker
 
 ### DOCKER COMPOSE ###
@@ -35,6 +39,12 @@ def test_compose_build_with_npm_installed_and_reinstall_false(
     mock_run.assert_has_calls(expected_calls)
     assert mock_run.call_count == 2
 
+@patch("src.utils.docker.Command.run")
+def test_compose_up_without_build(mock_run):
+    """Test starting a Docker Compose service without rebuilding its images."""
+    Docker.Compose.up("my/backend", build=False)
+    mock_run.assert_called_with(["docker-compose", "up", "-d"], directory="my/backend")
+
 @patch("src.utils.docker.platform.system", return_value="Windows")
 @patch("src.utils.docker.Command.run", side_effect=Exception("NPM not installed"))
 def test_compose_build_with_npm_not_installed(mock_run, _mock_platform):
@@ -313,11 +323,12 @@ def test_environment_set_simulation_success(
 ):
     """Test setting an environment variable for the 'simulation' service."""
     mocked_open = mock_open(read_data="some_yaml_content")
-    with patch("builtins.open", mocked_open):
+    with patch("builtins.open", mocked_open), \
+            patch("src.utils.docker.File.Write.atomic") as mock_atomic:
         Docker.Compose.Environment.set("simulation", "NEW_SIM_VAR", "12345")
     assert mock_copyfile.call_count == 1
-    write_calls = [c for c in mocked_open.mock_calls if c[0] == '().write']
-    assert len(write_calls) > 0, "Expected to write updated YAML to file."
+    assert mock_atomic.call_count == 1, "Expected to write updated YAML to file."
+    assert mock_atomic.call_args[0][0].endswith("docker-compose.simulation.yml")
 
 @patch("src.utils.docker.os.path.exists", return_value=False)
 def test_environment_set_file_not_found(_mock_exists):
@@ -342,14 +353,52 @@ def test_environment_set_env_update_success(
             environment:
             OLD_ENV: OLD_VAL
         """)
-    with patch("builtins.open", mocked_open):
+    with patch("builtins.open", mocked_open), \
+            patch("src.utils.docker.File.Write.atomic") as mock_atomic:
         Docker.Compose.Environment.set("my_service", "NEW_ENV", "NEW_VAL")
     assert mock_copyfile.call_count == 1, "A backup file should be created."
-    write_calls = [call for call in mocked_open.mock_calls if call[0] == '().write']
-    assert len(write_calls) > 0, "Expected a write call for updated YAML."
-    written_data = write_calls[0][1][0]
+    assert mock_atomic.call_count == 1, "Expected a write call for updated YAML."
+    written_data = mock_atomic.call_args[0][1].decode('utf-8')
     assert "services" in written_data, \
         "Should contain at least a 'services' key in the written YAML."
+    assert "NEW_ENV: NEW_VAL" in written_data
+
+def test_environment_set_many_writes_each_file_once(tmp_path):
+    """Test that several variables for several services are written in one go per file."""
+    main_file = tmp_path / "docker-compose.yml"
+    main_file.write_text(
+        "services:\n  bike_hivemind:\n    environment:\n      BIKE_LIMIT: 1\n"
+        "  api:\n    environment:\n      OTHER: x\n", encoding='utf-8')
+    simulation_file = tmp_path / "docker-compose.simulation.yml"
+    simulation_file.write_text(
+        "services:\n  simulation:\n    environment:\n      BIKE_LIMIT: 1\n", encoding='utf-8')
+    with patch("src.utils.docker.ROOT_DIR", str(tmp_path)), \
+            patch("src.utils.docker.File.Write.atomic",
+                  wraps=docker_module.File.Write.atomic) as mock_atomic:
+        Docker.Compose.Environment.set_many({
+            "bike_hivemind": {"DEFAULT_SPEED": 40, "BIKE_LIMIT": 100},
+            "api": {"OTHER": "y"},
+            "simulation": {"BIKE_LIMIT": 100}})
+    assert mock_atomic.call_count == 2
+    main = yaml.safe_load(main_file.read_text(encoding='utf-8'))
+    assert main["services"]["bike_hivemind"]["environment"] == {
+        "BIKE_LIMIT": 100, "DEFAULT_SPEED": 40}
+    assert main["services"]["api"]["environment"] == {"OTHER": "y"}
+    simulation = yaml.safe_load(simulation_file.read_text(encoding='utf-8'))
+    assert simulation["services"]["simulation"]["environment"] == {"BIKE_LIMIT": 100}
+    assert (tmp_path / "docker-compose.yml.backup").exists()
+
+def test_environment_set_unchanged_value_skips_write(tmp_path):
+    """Test that setting a variable to its current value does not rewrite the file."""
+    main_file = tmp_path / "docker-compose.yml"
+    main_file.write_text(
+        "services:\n  bike_hivemind:\n    environment:\n      BIKE_LIMIT: 100\n",
+        encoding='utf-8')
+    with patch("src.utils.docker.ROOT_DIR", str(tmp_path)), \
+            patch("src.utils.docker.File.Write.atomic") as mock_atomic:
+        Docker.Compose.Environment.set("bike_hivemind", "BIKE_LIMIT", 100)
+    mock_atomic.assert_not_called()
+    assert not (tmp_path / "docker-compose.yml.backup").exists()
 
 @patch("src.utils.docker.shutil.copyfile")
 @patch("src.utils.docker.os.path.exists", return_value=True)
@@ -364,6 +413,8 @@ def test_environment_reset_simulation_success(_mock_exists, mock_copy):
     """Test resetting the environment with simulation=True."""
     Docker.Compose.Environment.reset(simulation=True)
     assert mock_copy.call_count == 1
+    assert mock_copy.call_args.args[0].endswith("docker-compose.simulation.reset.yml")
+    assert mock_copy.call_args.args[1].endswith("docker-compose.simulation.yml")
 
 @patch("src.utils.docker.Directory.root", return_value="/mock/root")
 @patch("src.utils.docker.os.path.exists")
@@ -371,11 +422,11 @@ def test_environment_reset_simulation_reset_file_not_found(mock_exists, _mock_ro
     """Test resetting the environment with a missing reset file."""
     def side_effect(path):
         """Simulate a missing reset file."""
-        return not path.endswith("docker-compose.reset.yml")
+        return not path.endswith("docker-compose.simulation.reset.yml")
     mock_exists.side_effect = side_effect
     with pytest.raises(FileNotFoundError) as exc_info:
         Docker.Compose.Environment.reset(simulation=True)
-    assert "docker-compose.reset.yml does not exist." in str(exc_info.value)
+    assert "docker-compose.simulation.reset.yml does not exist." in str(exc_info.value)
 
 ### DOCKER CONTAINER ###
 
@@ -424,6 +475,20 @@ def test_container_delete_exception(mock_run):
         mock_print.assert_called_once_with(
             "Failed to delete container 'my_container': Delete failed")
 
+@patch("src.utils.docker.Command.Async.run_group")
+def test_container_delete_all(mock_run_group, capsys):
+    """Test deleting several Docker containers at once."""
+    mock_run_group.return_value = {
+        "db": Command.Result(["docker", "rm", "-f", "db"], returncode=0),
+        "api": Command.Result(["docker", "rm", "-f", "api"], returncode=1, stderr="No such\n")}
+    Docker.Container.delete_all(["db", "api"])
+    jobs = mock_run_group.call_args.args[0]
+    assert [job.command for job in jobs] == [
+        ["docker", "rm", "-f", "db"], ["docker", "rm", "-f", "api"]]
+    captured = capsys.readouterr().out
+    assert "Container 'db' deleted successfully." in captured
+    assert "Failed to delete container 'api': No such" in captured
+
 ### DOCKER NETWORK ###
 
 @patch("src.utils.docker.Command.run")
@@ -647,7 +712,9 @@ def test_docker_desktop_already_running(_mock_is_running):
 @patch("src.utils.docker.platform.system", return_value="Windows")
 @patch("src.utils.docker.os.path.exists", return_value=True)
 @patch("src.utils.docker.Command.run")
-def test_docker_desktop_start_windows(mock_run, _mock_exists, _mock_platform, _mock_is_running):
+@patch("src.utils.docker.Readiness.wait_sync")
+def test_docker_desktop_start_windows(
+    mock_wait_sync, mock_run, _mock_exists, _mock_platform, _mock_is_running):
     """Test starting Docker Desktop on Windows."""
     with patch("builtins.print") as mock_print:
         Docker.Desktop.start()
@@ -655,6 +722,8 @@ def test_docker_desktop_start_windows(mock_run, _mock_exists, _mock_platform, _m
         mock_run.assert_called_once_with(
             [r'C:\Program Files\Docker\Docker\Docker Desktop.exe'],
             asynchronous=False)
+        mock_wait_sync.assert_called_once()
+        assert mock_wait_sync.call_args.args[0][0].target == "docker info"
 
 @patch("src.utils.docker.Docker.Desktop.is_running", return_value=False)
 @patch("src.utils.docker.platform.system", return_value="Linux")
@@ -674,3 +743,22 @@ def test_docker_desktop_start_failure(_mock_run, _mock_exists, _mock_platform, _
         with pytest.raises(SystemExit):
             Docker.Desktop.start()
         mock_print.assert_any_call("Failed to start the Docker Desktop application: Start failed")
+
+@patch("src.utils.docker.Command.run")
+def test_compose_build_services(mock_run):
+    """Test building only some Docker Compose services."""
+    assert Docker.Compose.build("my/backend", services=["api", "bike_hivemind"])
+    mock_run.assert_called_once_with(
+        ["docker-compose", "build", "api", "bike_hivemind"], directory="my/backend")
+
+def test_compose_builds(tmp_path):
+    """Test getting the build contexts of the Docker Compose services."""
+    (tmp_path / "docker-compose.yml").write_text(
+        "services:\n"
+        "  api:\n    build:\n      context: ./backend\n      dockerfile: Dockerfile\n"
+        "  web:\n    build: ./frontend\n"
+        "  db:\n    image: postgres\n", encoding="utf-8")
+    builds = Docker.Compose.builds(str(tmp_path))
+    assert builds == {
+        "api": (os.path.join(str(tmp_path), "backend"), "Dockerfile"),
+        "web": (os.path.join(str(tmp_path), "frontend"), "Dockerfile")}
@@ -84,3 +84,30 @@ def test_trip_routes():
     result = Extract.Trip.routes(trips)
     assert result == [[(13.0, 55.0), (14.0, 56.0)], [(14.1, 55.1), (15.1, 56.1)]], \
         "Should convert LINESTRING to list of tuples correctly"
+
+def test_bike_positions_array():
+    """Test extracting bike positions as a coordinate array."""
+    bikes = [
+        {"id": 101, "attributes": {"last_position": "POINT(13.06782 55.577859)"}},
+        {"id": 102, "attributes": {"last_position": "POINT(14.12345 55.67890)"}}
+    ]
+    result = Extract.Bike.positions_array(bikes)
+    assert result.shape == (2, 2)
+    assert result.tolist() == [[13.06782, 55.577859], [14.12345, 55.67890]]
+
+def test_trip_routes_array():
+    """Test extracting trip routes as packed coordinates with offsets."""
+    trips = [
+        {"id": 201, "attributes": {"path_taken": "LINESTRING(13.0 55.0,14.0 56.0,15.0 57.0)"}},
+        {"id": 202, "attributes": {"path_taken": "LINESTRING(14.1 55.1,15.1 56.1)"}}
+    ]
+    coordinates, offsets = Extract.Trip.routes_array(trips)
+    assert coordinates.shape == (5, 2)
+    assert offsets.tolist() == [0, 3, 5], "Route i should be coordinates[offsets[i]:offsets[i + 1]]"
+    assert coordinates[offsets[1]:offsets[2]].tolist() == [[14.1, 55.1], [15.1, 56.1]]
+
+def test_trip_routes_array_empty():
+    """Test extracting trip routes from no trips."""
+    coordinates, offsets = Extract.Trip.routes_array([])
+    assert coordinates.shape == (0, 2)
+    assert offsets.tolist() == [0]
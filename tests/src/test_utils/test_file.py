@@ -1,8 +1,12 @@
 """Tests for the File class."""
 
+import csv
 import os
 import json
+import stat
 from tempfile import TemporaryDirectory
+from unittest.mock import patch
+import pytest
 from src.utils.file import File
 
 def test_csv_to_json():
@@ -73,3 +77,135 @@ def test_write_lines():
         with open(file_path, "r", encoding="utf-8") as f:
             written_content = f.read().splitlines()
         assert written_content == lines_to_write, "Should write all lines correctly to the file"
+
+def test_save_to_json_compact():
+    """Test saving compact JSON and loading it back."""
+    with TemporaryDirectory() as tmpdir:
+        data = [{"id": 1, "name": "Frodo"}, {"id": 2, "name": "Sam"}]
+        path = File.Save.to_json(data, tmpdir, "compact.json", compact=True)
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+        assert "\n" not in content and ": " not in content, "Compact JSON should have no whitespace"
+        assert File.Load.from_json(tmpdir, "compact.json") == data
+        assert os.listdir(tmpdir) == ["compact.json"], "No temporary files should be left"
+
+def test_save_to_json_compact_without_orjson():
+    """Test saving compact JSON with the standard library fallback."""
+    with TemporaryDirectory() as tmpdir, patch("src.utils.file.orjson", None):
+        data = {"name": "Gandalf", "color": "grå"}
+        File.Save.to_json(data, tmpdir, "fallback.json", compact=True)
+        assert File.Load.from_json(tmpdir, "fallback.json") == data
+
+def test_write_atomic_keeps_old_file_on_failure():
+    """Test that a failed atomic write leaves the previous file untouched."""
+    with TemporaryDirectory() as tmpdir:
+        file_path = os.path.join(tmpdir, "data.json")
+        File.Write.atomic(file_path, b"old")
+        with patch("src.utils.file.os.replace", side_effect=OSError("disk full")):
+            with pytest.raises(OSError):
+                File.Write.atomic(file_path, b"new")
+        with open(file_path, "rb") as f:
+            assert f.read() == b"old"
+        assert os.listdir(tmpdir) == ["data.json"], "No temporary files should be left"
+
+def test_write_atomic_file_mode():
+    """Test that an atomic write gives new files the same mode as open and keeps existing modes."""
+    with TemporaryDirectory() as tmpdir:
+        plain_path = os.path.join(tmpdir, "plain.json")
+        with open(plain_path, "wb") as f:
+            f.write(b"plain")
+        atomic_path = os.path.join(tmpdir, "atomic.json")
+        File.Write.atomic(atomic_path, b"atomic")
+        assert os.stat(atomic_path).st_mode == os.stat(plain_path).st_mode
+        os.chmod(atomic_path, 0o640)
+        File.Write.atomic(atomic_path, b"again")
+        assert stat.S_IMODE(os.stat(atomic_path).st_mode) == 0o640
+
+def test_write_atomic_leaves_umask_alone():
+    """Test that an atomic write never changes the process umask, which other threads share."""
+    with TemporaryDirectory() as tmpdir, patch("os.umask") as mock_umask:
+        File.Write.atomic(os.path.join(tmpdir, "data.json"), b"data")
+    mock_umask.assert_not_called()
+
+def test_save_to_msgpack_without_msgpack():
+    """Test that saving MessagePack falls back to compact JSON without msgpack."""
+    with TemporaryDirectory() as tmpdir, patch("src.utils.file.msgpack", None):
+        data = {"key": [1, 2, 3]}
+        path = File.Save.to_msgpack(data, tmpdir, "data.msgpack")
+        assert path.endswith("data.json")
+        assert File.Load.from_msgpack(tmpdir, "data.msgpack") == data
+
+@pytest.mark.asyncio
+async def test_save_to_json_async():
+    """Test saving JSON without blocking the event loop."""
+    with TemporaryDirectory() as tmpdir:
+        data = {"key": "value"}
+        path = await File.Save.to_json_async(data, tmpdir, "async.json")
+        assert os.path.exists(path)
+        assert File.Load.from_json(tmpdir, "async.json") == data
+
+def test_csv_to_json_quoted_fields():
+    """Test converting CSV data with quoted fields that contain commas."""
+    csv_data = 'id,path\n1,"LINESTRING(13.0 55.0,14.0 56.0)"'
+    result = File.Convert.csv_to_json(csv_data)
+    assert result == [{"id": "1", "path": "LINESTRING(13.0 55.0,14.0 56.0)"}]
+
+def test_convert_value():
+    """Test converting CSV values to Python types."""
+    assert File.Convert.value("") is None
+    assert File.Convert.value("True") is True
+    assert File.Convert.value("false") is False
+    assert File.Convert.value("42") == 42
+    assert File.Convert.value("4.2") == 4.2
+    assert File.Convert.value("-7") == -7
+    assert File.Convert.value("0") == 0
+    assert File.Convert.value("-0.5") == -0.5
+    assert File.Convert.value("1e3") == 1000.0
+    assert File.Convert.value("nan") == "nan"
+    assert File.Convert.value("inf") == "inf"
+
+def test_convert_value_keeps_codes():
+    """Test that values which are not plain decimal numbers stay strings."""
+    for text in ("007", "1_000", "00.5", ".5", "1.", " 42", "+42", "0x1F"):
+        assert File.Convert.value(text) == text
+    assert File.Convert.value("POINT(13.0 55.0)") == "POINT(13.0 55.0)"
+
+def test_stream_csv():
+    """Test streaming rows with converted values from a CSV file."""
+    with TemporaryDirectory() as tmpdir:
+        with open(os.path.join(tmpdir, "trips.csv"), "w", encoding="utf-8") as f:
+            f.write('id,user_id,path,code\n'
+                    '1,7,"LINESTRING(1 2,3 4)",007\n'
+                    '2,8,"LINESTRING(5 6,7 8)",008\n')
+        rows = list(File.Stream.csv(tmpdir, "trips.csv", types={"code": str}))
+        assert rows == [
+            {"id": 1, "user_id": 7, "path": "LINESTRING(1 2,3 4)", "code": "007"},
+            {"id": 2, "user_id": 8, "path": "LINESTRING(5 6,7 8)", "code": "008"}]
+
+def test_stream_csv_batches():
+    """Test streaming rows from a CSV file in batches."""
+    with TemporaryDirectory() as tmpdir:
+        with open(os.path.join(tmpdir, "ids.csv"), "w", encoding="utf-8") as f:
+            f.write("id\n" + "\n".join(str(i) for i in range(5)) + "\n")
+        batches = list(File.Stream.csv(tmpdir, "ids.csv", batch_size=2))
+        assert [[row["id"] for row in batch] for batch in batches] == [[0, 1], [2, 3], [4]]
+
+def test_stream_csv_restores_field_size_limit():
+    """Test that the field size limit is restored when a CSV stream ends or is closed."""
+    previous = csv.field_size_limit()
+    with TemporaryDirectory() as tmpdir:
+        with open(os.path.join(tmpdir, "paths.csv"), "w", encoding="utf-8") as f:
+            f.write('id,path\n1,"' + "x" * (previous + 1) + '"\n2,"y"\n')
+        rows = File.Stream.csv(tmpdir, "paths.csv")
+        assert len(next(rows)["path"]) == previous + 1
+        assert len(list(rows)) == 1
+        assert csv.field_size_limit() == previous
+        rows = File.Stream.csv(tmpdir, "paths.csv")
+        next(rows)
+        rows.close()
+        assert csv.field_size_limit() == previous
+
+def test_rows_to_columns():
+    """Test converting rows to columns."""
+    rows = [{"id": 1, "name": "Frodo"}, {"id": 2, "name": "Sam"}]
+    assert File.Convert.rows_to_columns(rows) == {"id": [1, 2], "name": ["Frodo", "Sam"]}
@@ -0,0 +1,94 @@
+"""Tests for the Fingerprint class."""
+
+import os
+from unittest.mock import patch
+from src.utils.command import Command
+from src.utils.fingerprint import Fingerprint
+
+def _write(path, content):
+    """Write a text file."""
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(content)
+
+def test_inputs_hash_files(tmp_path):
+    """Test that the inputs contain a hash per existing file and None for missing files."""
+    _write(tmp_path / "package-lock.json", "{}")
+    inputs = Fingerprint.inputs(str(tmp_path), ("package-lock.json", ".env"))
+    assert inputs["package-lock.json"] is not None
+    assert inputs[".env"] is None
+
+def test_inputs_git(tmp_path):
+    """Test that the inputs follow the committed tree and the uncommitted changes."""
+    repository = str(tmp_path)
+    Command.run(["git", "init", "-q", repository], asynchronous=False)
+    _write(tmp_path / "Dockerfile", "FROM python")
+    Command.run(["git", "-C", repository, "add", "Dockerfile"], asynchronous=False)
+    Command.run(
+        ["git", "-C", repository, "-c", "user.name=test", "-c", "user.email=test@test",
+         "commit", "-q", "-m", "first"], asynchronous=False)
+    committed = Fingerprint.inputs(repository, ("Dockerfile",))
+    assert committed["HEAD"] is not None
+    assert committed["changes"] is None
+    _write(tmp_path / "Dockerfile", "FROM node")
+    changed = Fingerprint.inputs(repository, ("Dockerfile",))
+    assert changed["HEAD"] == committed["HEAD"]
+    assert changed["changes"] is not None
+    assert changed["Dockerfile"] != committed["Dockerfile"]
+
+def test_inputs_git_untracked(tmp_path):
+    """Test that the inputs follow the names and contents of untracked files."""
+    repository = str(tmp_path)
+    Command.run(["git", "init", "-q", repository], asynchronous=False)
+    _write(tmp_path / ".gitignore", "ignored.txt\n")
+    Command.run(["git", "-C", repository, "add", ".gitignore"], asynchronous=False)
+    Command.run(
+        ["git", "-C", repository, "-c", "user.name=test", "-c", "user.email=test@test",
+         "commit", "-q", "-m", "first"], asynchronous=False)
+    assert Fingerprint.inputs(repository, ())["changes"] is None
+    (tmp_path / "src").mkdir()
+    _write(tmp_path / "src" / "new.py", "print('new')")
+    untracked = Fingerprint.inputs(repository, ())["changes"]
+    assert untracked is not None
+    _write(tmp_path / "src" / "new.py", "print('newer')")
+    assert Fingerprint.inputs(repository, ())["changes"] not in (None, untracked)
+    _write(tmp_path / "src" / "new.py", "print('new')")
+    _write(tmp_path / "ignored.txt", "ignored")
+    assert Fingerprint.inputs(repository, ())["changes"] == untracked
+
+def test_check_and_update(tmp_path):
+    """Test that builds are only needed when their inputs changed."""
+    fingerprint = Fingerprint(folder=str(tmp_path))
+    inputs = {"HEAD": "abc", ".env": "123"}
+    assert fingerprint.check("api", inputs)
+    assert fingerprint.report["api"] == "rebuilt (no previous build)"
+    fingerprint.update("api", inputs)
+    fingerprint = Fingerprint(folder=str(tmp_path))
+    assert not fingerprint.check("api", inputs)
+    assert fingerprint.report["api"] == "skipped (unchanged)"
+    assert fingerprint.check("api", {**inputs, ".env": "456"})
+    assert fingerprint.report["api"] == "rebuilt (.env changed)"
+    assert fingerprint.check("api", inputs, force=True)
+    assert fingerprint.report["api"] == "rebuilt (forced)"
+
+def test_check_output_missing(tmp_path):
+    """Test that a build is needed when its output is missing, even if unchanged."""
+    fingerprint = Fingerprint(folder=str(tmp_path))
+    fingerprint.update("npm", {})
+    assert fingerprint.check("npm", {}, output=os.path.join(str(tmp_path), "build"))
+    assert fingerprint.report["npm"] == "rebuilt (output missing)"
+
+def test_load_unreadable(tmp_path):
+    """Test that unreadable fingerprints are ignored."""
+    _write(tmp_path / "build_fingerprints.json", "{not json")
+    assert not Fingerprint(folder=str(tmp_path)).fingerprints
+
+def test_print_report(tmp_path, capsys):
+    """Test printing the build report."""
+    fingerprint = Fingerprint(folder=str(tmp_path))
+    fingerprint.check("bike_hivemind", {})
+    with patch.dict(fingerprint.report, {"api": "skipped (unchanged)"}):
+        fingerprint.print_report()
+    captured = capsys.readouterr().out
+    assert "Build report:" in captured
+    assert "  bike_hivemind: rebuilt (no previous build)" in captured
+    assert "  api: skipped (unchanged)" in captured
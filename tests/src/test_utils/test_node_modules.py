@@ -0,0 +1,75 @@
+"""Tests for the NodeModules class."""
+
+import os
+from unittest.mock import patch
+import pytest
+from src.utils.docker import Docker
+from src.utils.node_modules import NodeModules
+
+@pytest.fixture(name="project")
+def fixture_project(tmp_path):
+    """A frontend project with a package-lock.json."""
+    project = tmp_path / "frontend"
+    project.mkdir()
+    (project / "package-lock.json").write_text('{"lockfileVersion": 3}', encoding="utf-8")
+    return project
+
+def _npm_ci(command, directory, **_kwargs):
+    """Fake 'npm ci' that installs one package."""
+    assert command[-1] == "ci"
+    os.makedirs(os.path.join(directory, "node_modules", "react"))
+
+@patch("src.utils.node_modules.Command.run", side_effect=_npm_ci)
+def test_restore_installs_once(mock_run, project, tmp_path):
+    """Test that 'npm ci' only runs the first time for a lockfile."""
+    cache = str(tmp_path / "cache")
+    assert NodeModules.restore(str(project), cache_folder=cache)
+    assert not NodeModules.restore(str(project), cache_folder=cache)
+    mock_run.assert_called_once()
+    key = NodeModules.key(str(project))
+    assert os.path.isdir(os.path.join(cache, key, "node_modules", "react"))
+    assert os.path.isdir(project / "node_modules" / "react")
+
+@patch("src.utils.node_modules.Command.run", side_effect=_npm_ci)
+def test_restore_shared_cache(mock_run, project, tmp_path):
+    """Test that another checkout with the same lockfile reuses the cached node_modules."""
+    cache = str(tmp_path / "cache")
+    NodeModules.restore(str(project), cache_folder=cache)
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "package-lock.json").write_bytes((project / "package-lock.json").read_bytes())
+    assert not NodeModules.restore(str(other), cache_folder=cache)
+    mock_run.assert_called_once()
+    assert os.path.isdir(other / "node_modules" / "react")
+
+@patch("src.utils.node_modules.Command.run", side_effect=_npm_ci)
+def test_restore_lockfile_changed(mock_run, project, tmp_path):
+    """Test that a changed lockfile installs again into a new cache folder."""
+    cache = str(tmp_path / "cache")
+    NodeModules.restore(str(project), cache_folder=cache)
+    (project / "package-lock.json").write_text('{"lockfileVersion": 2}', encoding="utf-8")
+    assert NodeModules.restore(str(project), cache_folder=cache)
+    assert mock_run.call_count == 2
+    assert len(os.listdir(cache)) == 2
+
+@patch("src.utils.node_modules.os.symlink", side_effect=OSError("Symlinks not allowed"))
+@patch("src.utils.node_modules.Command.run", side_effect=_npm_ci)
+def test_restore_copy_without_symlinks(mock_run, _mock_symlink, project, tmp_path):
+    """Test that node_modules are copied (and recognized) when symlinks are not allowed."""
+    cache = str(tmp_path / "cache")
+    NodeModules.restore(str(project), cache_folder=cache)
+    assert not os.path.islink(project / "node_modules")
+    assert os.path.isdir(project / "node_modules" / "react")
+    assert not NodeModules.restore(str(project), cache_folder=cache)
+    mock_run.assert_called_once()
+
+@patch("src.utils.docker.NodeModules.restore")
+@patch("src.utils.docker.Command.run")
+def test_compose_build_npm_with_lockfile(mock_run, mock_restore, project):
+    """Test that the npm build restores node_modules instead of running 'npm install'."""
+    with patch("src.utils.docker.platform.system", return_value="Linux"):
+        assert Docker.Compose.build(str(project), npm=True, reinstall=True)
+    mock_restore.assert_called_once_with(str(project), "npm")
+    commands = [call.args[0] for call in mock_run.call_args_list]
+    assert ["npm", "install"] not in commands
+    assert ["npm", "run", "build"] in commands
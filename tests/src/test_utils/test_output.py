@@ -0,0 +1,73 @@
+# pylint: disable=protected-access
+"""Tests for the Output class."""
+
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from unittest.mock import patch
+from src.utils.output import Output
+from src.utils.command import Command
+
+def test_capture_print():
+    """Test capturing printed output."""
+    original_stdout = sys.stdout
+    with Output.capture() as output:
+        assert Output.capturing()
+        print("captured")
+    assert output.getvalue() == "captured\n"
+    assert not Output.capturing()
+    assert sys.stdout is original_stdout, "stdout should be restored"
+
+def test_capture_per_thread():
+    """Test that each thread captures only its own output."""
+    def _work(number):
+        with Output.capture() as output:
+            print(f"thread {number}")
+        return output.getvalue()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(_work, range(4)))
+    assert results == [f"thread {number}\n" for number in range(4)]
+
+def test_capture_command_output():
+    """Test that the output of a command is captured too."""
+    with Output.capture() as output:
+        Command.run([sys.executable, "-c", "print('from subprocess')"], asynchronous=False)
+    assert "from subprocess" in output.getvalue()
+
+def test_capture_cleanup():
+    """Test that a capture leaves no thread-local entry or router behind."""
+    for _ in range(3):
+        with Output.capture():
+            print("captured")
+        assert not hasattr(Output._local, 'buffer')
+        assert Output._router is None
+    assert isinstance(Output._retired, Output._Router)
+
+def test_capture_prefix_streams_lines():
+    """Test that captured lines are printed, prefixed, as soon as they are complete."""
+    class _Stdout(io.StringIO):
+        def __init__(self):
+            super().__init__()
+            self.lines = []
+
+        def write(self, text):
+            self.lines.append((perf_counter(), text))
+            return super().write(text)
+
+    stdout = _Stdout()
+    with patch("sys.stdout", stdout):
+        with Output.capture(prefix="job") as output:
+            print("partial", end="")
+            assert not stdout.lines
+            print(" line")
+            assert stdout.getvalue() == "[job] partial line\n"
+            Command.run(
+                [sys.executable, "-c",
+                 "import time; print('first', flush=True); time.sleep(0.5); print('second')"],
+                asynchronous=False)
+            print("unfinished", end="")
+    assert "first\nsecond\n" in output.getvalue()
+    times = {text: time for time, text in stdout.lines}
+    assert times["[job] second\n"] - times["[job] first\n"] >= 0.4, "Lines should stream"
+    assert stdout.getvalue().endswith("[job] unfinished\n")
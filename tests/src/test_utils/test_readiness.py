@@ -0,0 +1,88 @@
+"""Tests for the Readiness class."""
+
+import asyncio
+import sys
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from unittest.mock import patch
+import pytest
+from src.utils.readiness import Readiness, Probe
+
+class _Handler(BaseHTTPRequestHandler):
+    """Handler that answers 200 on '/docs' and 503 elsewhere."""
+    def do_GET(self): # pylint: disable=invalid-name
+        """Answer a GET request."""
+        self.send_response(200 if self.path == "/docs" else 503)
+        self.end_headers()
+
+    def log_message(self, *_args): # pylint: disable=arguments-differ
+        """Do not log requests."""
+
+@pytest.fixture(name="server")
+def fixture_server():
+    """A local HTTP server."""
+    server = HTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+def _ready_after(attempts):
+    """A probe that is ready on the given attempt."""
+    calls = []
+    async def _check():
+        calls.append(None)
+        return len(calls) >= attempts
+    return Probe(name=f"after {attempts}", check=_check), calls
+
+@pytest.mark.asyncio
+async def test_wait_backoff():
+    """Test that probes are polled with exponential backoff until ready."""
+    probe, calls = _ready_after(3)
+    with patch("src.utils.readiness.asyncio.sleep") as mock_sleep:
+        seconds = await Readiness.wait([probe], timeout=60, initial_delay=0.1, max_delay=0.3)
+    assert len(calls) == 3
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [0.1, 0.2]
+    assert list(seconds) == ["after 3"]
+
+@pytest.mark.asyncio
+async def test_wait_timeout():
+    """Test that a service that never gets ready raises a TimeoutError."""
+    ready, _ = _ready_after(1)
+    never, _ = _ready_after(1000)
+    with pytest.raises(TimeoutError) as exc_info:
+        await Readiness.wait([ready, never], timeout=0.3, initial_delay=0.05, max_delay=0.1)
+    assert "after 1000" in str(exc_info.value)
+
+@pytest.mark.asyncio
+async def test_http_probe(server):
+    """Test that an HTTP probe is only ready for status codes below 400."""
+    assert await Readiness.Probes.http("docs", f"{server}/docs").check()
+    assert not await Readiness.Probes.http("root", f"{server}/").check()
+
+@pytest.mark.asyncio
+async def test_tcp_probe():
+    """Test that a TCP probe is ready once connections are accepted."""
+    tcp_server = await asyncio.start_server(lambda _reader, writer: writer.close(), "127.0.0.1", 0)
+    port = tcp_server.sockets[0].getsockname()[1]
+    async with tcp_server:
+        assert await Readiness.Probes.tcp("db", "127.0.0.1", port).check()
+    with pytest.raises(OSError):
+        await Readiness.Probes.tcp("db", "127.0.0.1", port).check()
+
+@pytest.mark.asyncio
+async def test_command_probe():
+    """Test that a command probe is ready when the command succeeds."""
+    assert await Readiness.Probes.command("ok", [sys.executable, "-c", "pass"]).check()
+    failing = [sys.executable, "-c", "import sys; sys.exit(1)"]
+    assert not await Readiness.Probes.command("fails", failing).check()
+
+def test_stack_probes():
+    """Test the probes of the stack from the host and from inside the Docker network."""
+    assert [probe.name for probe in Readiness.Probes.stack()] == ["api", "bike_hivemind", "db"]
+    with patch.dict("os.environ", {
+            "BACKEND_URL": "http://api:8000/", "BIKE_URL": "http://bike_hivemind:8001/"}):
+        probes = Readiness.Probes.stack(inside_network=True)
+    assert [probe.target for probe in probes] == [
+        "http://api:8000/", "http://bike_hivemind:8001/docs", "db:5432"]
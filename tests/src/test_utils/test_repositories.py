@@ -18,18 +18,67 @@ def test_local_get_backend(mock_commit, mock_pull, mock_checkout, _mock_clone, _
     mock_pull.assert_called_once()
     mock_commit.assert_called_once()
 
+@patch("src.utils.repositories.os.path.isdir", return_value=True)
+@patch("src.utils.repositories.Repository.fetch")
 @patch("src.utils.repositories.Repository.clone")
 @patch("src.utils.repositories.Repository.checkout")
 @patch("src.utils.repositories.Repository.pull")
 @patch("src.utils.repositories.Repository.Print.commit")
-def test_local_get_all(mock_commit, mock_pull, mock_checkout, mock_clone):
+def test_local_get_all(mock_commit, mock_pull, mock_checkout, mock_clone, *_):
     """Test getting all local repositories."""
     repos = Repositories()
     repos.local.get.all(branch="main")
     assert mock_clone.call_count == 0
     assert mock_checkout.call_count == 3
     assert mock_pull.call_count == 3
-    assert mock_commit.call_count == 6
+    assert mock_commit.call_count == 3
+
+@patch("src.utils.repositories.os.path.isdir", return_value=True)
+@patch("src.utils.repositories.Repository.fetch")
+@patch("src.utils.repositories.Repository.checkout")
+@patch("src.utils.repositories.Repository.pull")
+@patch("src.utils.repositories.Repository.Print.commit")
+def test_local_get_all_refs(mock_commit, mock_pull, mock_checkout, *_):
+    """Test getting all local repositories with a branch and commit per repository."""
+    mock_commit.side_effect = lambda path: f"commit of {path.split('/')[-1]}"
+    repos = Repositories()
+    repos.local.get.all(refs={"backend": ("dev", "abc123")})
+    mock_checkout.assert_called_once()
+    assert mock_checkout.call_args.args[1] == "dev"
+    backend_pulls = [c for c in mock_pull.call_args_list if c.args[0].endswith("backend")]
+    assert backend_pulls[0].kwargs["commit"] == "abc123"
+
+@patch("src.utils.repositories.os.path.isdir", return_value=True)
+@patch("src.utils.repositories.Repository.fetch")
+@patch("src.utils.repositories.Repository.pull")
+@patch("src.utils.repositories.Repository.Print.commit")
+def test_local_get_all_force(_mock_commit, mock_pull, *_):
+    """Test that all repositories are only forced when asked to."""
+    repos = Repositories()
+    repos.local.get.all()
+    assert [c.kwargs["force"] for c in mock_pull.call_args_list] == [False] * 3
+    mock_pull.reset_mock()
+    repos.local.get.all(force=True)
+    assert [c.kwargs["force"] for c in mock_pull.call_args_list] == [True] * 3
+
+@patch("src.utils.repositories.os.path.isdir", return_value=True)
+@patch("src.utils.repositories.Repository.Print.commit", return_value="a1b2c3 - Commit")
+@patch("src.utils.repositories.Repository.pull")
+def test_local_get_all_output_and_failures(mock_pull, _mock_commit, _mock_isdir, capsys):
+    """Test that output is prefixed per repository and failures are summarized."""
+    def _pull(path, **_kwargs):
+        print(f"pulling {path.split('/')[-1]}")
+        if path.endswith("bike"):
+            raise SystemExit(1)
+    mock_pull.side_effect = _pull
+    repos = Repositories()
+    with pytest.raises(SystemExit):
+        repos.local.get.all()
+    captured = capsys.readouterr().out
+    assert "[backend] pulling backend" in captured
+    assert "[frontend] pulling frontend" in captured
+    assert "  backend: a1b2c3 - Commit" in captured
+    assert "  bike: FAILED" in captured
 
 @patch("src.utils.repositories.Command.run")
 def test_submodules_get_all(mock_run):
@@ -123,3 +172,32 @@ def test_local_get_unknown_repository():
     repos = Repositories()
     with pytest.raises(ValueError, match="Unknown repository: unknown_repo"):
         repos.local.get._get_repository("unknown_repo")
+
+def test_local_get_repository_not_exists_shallow_commit():
+    """Test that a shallow clone of a commit fetches only that commit."""
+    with patch("src.utils.repositories.os.path.isdir", return_value=False), \
+         patch("src.utils.repositories.os.makedirs"), \
+         patch("src.utils.repositories.Settings.Git.clone_depth", "1"), \
+         patch("src.utils.repositories.Repository.clone") as mock_clone, \
+         patch("src.utils.repositories.Repository.checkout") as mock_checkout, \
+         patch("src.utils.repositories.Repository.pull") as mock_pull, \
+         patch("src.utils.repositories.Repository.Print.commit"):
+        repos = Repositories()
+        repos.local.get.backend(branch="main", commit="67890")
+        assert mock_clone.call_args.kwargs["commit"] == "67890"
+        assert mock_clone.call_args.kwargs["depth"] == "1"
+        mock_checkout.assert_not_called()
+        mock_pull.assert_not_called()
+
+def test_local_get_repository_exists_shallow_commit():
+    """Test that an existing shallow clone fetches only the requested commit."""
+    with patch("src.utils.repositories.os.path.isdir", return_value=True), \
+         patch("src.utils.repositories.Repository.is_shallow", return_value=True), \
+         patch("src.utils.repositories.Repository.fetch_commit") as mock_fetch_commit, \
+         patch("src.utils.repositories.Repository.pull") as mock_pull, \
+         patch("src.utils.repositories.Repository.Print.commit"):
+        repos = Repositories()
+        repos.local.get.frontend(branch="main", commit="67890")
+        mock_fetch_commit.assert_called_once()
+        assert mock_fetch_commit.call_args.kwargs["force"] is True
+        mock_pull.assert_not_called()
@@ -1,7 +1,9 @@
 """Tests for the Repository class."""
 
+import os
 from unittest.mock import patch
 import pytest
+from src.utils.command import Command
 from src.utils.repository import Repository
 
 @patch("src.utils.command.Command.run")
@@ -113,7 +115,7 @@ def test_repository_print_commit_success(mock_run, capfd):
     Repository.Print.commit("/path/to/repo")
     mock_run.assert_called_once_with([
         "git", "-C", "/path/to/repo", "log", "-1", "--pretty=format:%h - %s"
-    ], raise_exception=True)
+    ], raise_exception=True, return_output=True)
     captured = capfd.readouterr()
     assert "Commit after pull in /path/to/repo: a1b2c3 - Fixing bug" in captured.out
 
@@ -123,3 +125,82 @@ def test_repository_print_commit_exception(_mock_run, capfd):
     Repository.Print.commit("/path/to/repo")
     captured = capfd.readouterr()
     assert "Error retrieving commit info after pull: Log error" in captured.out
+
+@patch("src.utils.command.Command.run")
+def test_repository_clone_shallow_partial(mock_run):
+    """Test a shallow, partial, single-branch clone."""
+    Repository.clone(
+        "https://myrepo.git", "/some/local/path", branch="main",
+        depth=1, filter_spec="blob:none", single_branch=True)
+    args = mock_run.call_args[0][0]
+    assert args == [
+        "git", "clone", "--depth=1", "--filter=blob:none", "--single-branch",
+        "https://myrepo.git", "/some/local/path", "-b", "main"]
+
+@patch("src.utils.command.Command.run")
+def test_repository_fetch_branch(mock_run):
+    """Test fetching a branch explicitly into its remote-tracking ref."""
+    Repository.fetch("/path/to/repo", branch="development", depth=1)
+    mock_run.assert_called_once_with(
+        ["git", "-C", "/path/to/repo", "fetch", "--depth=1", "origin",
+         "+refs/heads/development:refs/remotes/origin/development"],
+        raise_exception=True)
+
+@patch("src.utils.command.Command.run")
+def test_repository_clone_commit(mock_run):
+    """Test that cloning a commit fetches only that commit."""
+    commit = "abc123" * 6 + "abcd"
+    Repository.clone("https://myrepo.git", "/some/local/path", commit=commit, depth=1)
+    commands = [call[0][0] for call in mock_run.call_args_list]
+    assert commands == [
+        ["git", "init", "-q", "/some/local/path"],
+        ["git", "-C", "/some/local/path", "remote", "add", "origin", "https://myrepo.git"],
+        ["git", "-C", "/some/local/path", "fetch", "--depth=1", "origin", commit],
+        ["git", "-C", "/some/local/path", "checkout", "--detach", "FETCH_HEAD"]]
+
+@patch("src.utils.repository.Repository.is_shallow", return_value=True)
+@patch("src.utils.command.Command.run", return_value="f" * 40)
+def test_repository_fetch_commit_short_hash(mock_run, _mock_is_shallow):
+    """Test that a short commit hash is resolved after fetching the full history."""
+    Repository.fetch_commit("/path/to/repo", "abc123", depth=1, filter_spec="blob:none")
+    commands = [call[0][0] for call in mock_run.call_args_list]
+    assert commands == [
+        ["git", "-C", "/path/to/repo", "fetch", "--filter=blob:none", "--unshallow",
+         "origin", "+refs/heads/*:refs/remotes/origin/*"],
+        ["git", "-C", "/path/to/repo", "rev-parse", "--verify", "abc123^{commit}"],
+        ["git", "-C", "/path/to/repo", "checkout", "--detach", "f" * 40]]
+
+def test_repository_clone_commit_with_reference(tmp_path):
+    """Test cloning a single commit through a shared mirror, end to end with a local remote."""
+    remote = str(tmp_path / "remote")
+    Command.run(["git", "init", "-q", remote], asynchronous=False)
+    commits = []
+    for message in ("first", "second"):
+        Command.run(
+            ["git", "-C", remote, "-c", "user.name=test", "-c", "user.email=test@test",
+             "commit", "-q", "--allow-empty", "-m", message], asynchronous=False)
+        commits.append(Command.run(
+            ["git", "-C", remote, "rev-parse", "HEAD"], return_output=True))
+    reference = str(tmp_path / "mirrors")
+    clone = str(tmp_path / "clone")
+    Repository.clone(f"file://{remote}", clone, commit=commits[0], depth=1, reference=reference)
+    assert os.path.isdir(os.path.join(reference, "remote", "objects"))
+    assert Repository.is_shallow(clone)
+    head = Command.run(["git", "-C", clone, "rev-parse", "HEAD"], return_output=True)
+    assert head == commits[0]
+
+def test_repository_clone_short_commit(tmp_path):
+    """Test cloning a short commit hash shallowly, end to end with a local remote."""
+    remote = str(tmp_path / "remote")
+    Command.run(["git", "init", "-q", remote], asynchronous=False)
+    commits = []
+    for message in ("first", "second"):
+        Command.run(
+            ["git", "-C", remote, "-c", "user.name=test", "-c", "user.email=test@test",
+             "commit", "-q", "--allow-empty", "-m", message], asynchronous=False)
+        commits.append(Command.run(
+            ["git", "-C", remote, "rev-parse", "HEAD"], return_output=True))
+    clone = str(tmp_path / "clone")
+    Repository.clone(f"file://{remote}", clone, commit=commits[0][:7], depth=1)
+    head = Command.run(["git", "-C", clone, "rev-parse", "HEAD"], return_output=True)
+    assert head == commits[0]
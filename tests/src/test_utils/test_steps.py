@@ -0,0 +1,68 @@
+"""Tests for the Steps class."""
+
+import time
+import pytest
+from src.utils.steps import Steps
+
+def _sleep(seconds, events=None, name=None):
+    """A step that sleeps and records when it ran."""
+    def _step():
+        if events is not None:
+            events.append(name)
+        print(f"sleeping {seconds}s")
+        time.sleep(seconds)
+    return _step
+
+def test_run_order_and_concurrency():
+    """Test that independent steps run concurrently and dependent steps wait."""
+    events = []
+    steps = Steps()
+    steps.add("a", _sleep(0.3, events, "a"))
+    steps.add("b", _sleep(0.3, events, "b"))
+    steps.add("c", _sleep(0.1, events, "c"), after=("a", "b"))
+    steps.run()
+    a, b = steps.steps["a"], steps.steps["b"]
+    assert events[-1] == "c"
+    assert a.start < b.end and b.start < a.end, "Steps 'a' and 'b' should run at the same time"
+    assert steps.steps["c"].start >= max(steps.steps["a"].end, steps.steps["b"].end)
+
+def test_critical_path_and_report(capsys):
+    """Test the critical path and the timing report."""
+    steps = Steps()
+    steps.add("short", _sleep(0.05))
+    steps.add("long", _sleep(0.3))
+    steps.add("last", _sleep(0.05), after=("short", "long"))
+    steps.run()
+    assert steps.critical_path() == ["long", "last"]
+    steps.print_report()
+    captured = capsys.readouterr().out
+    assert "[long] sleeping 0.3s" in captured
+    assert "Setup timing report:" in captured
+    assert "long -> last" in captured
+
+def test_failure_stops_dependent_steps():
+    """Test that a failing step raises and its dependent steps do not run."""
+    events = []
+    def _fail():
+        raise SystemExit(1)
+    steps = Steps()
+    steps.add("fails", _fail)
+    steps.add("independent", _sleep(0.1, events, "independent"))
+    steps.add("dependent", _sleep(0, events, "dependent"), after=("fails",))
+    with pytest.raises(SystemExit):
+        steps.run()
+    assert "dependent" not in events
+
+def test_invalid_graphs():
+    """Test that unknown dependencies, cycles and duplicates are rejected."""
+    steps = Steps()
+    steps.add("a", _sleep(0), after=("missing",))
+    with pytest.raises(ValueError):
+        steps.run()
+    steps = Steps()
+    steps.add("a", _sleep(0), after=("b",))
+    steps.add("b", _sleep(0), after=("a",))
+    with pytest.raises(ValueError):
+        steps.run()
+    with pytest.raises(ValueError):
+        steps.add("a", _sleep(0))